@@ -31,7 +31,7 @@ from app.utils.db import (
 )
 
 # import higher-level helpers from their correct modules
-from app.utils.expenses import load_expenses, monthly_summary, yearly_summary, category_breakdown
+from app.utils.expenses import monthly_summary, yearly_summary, category_breakdown
 from app.utils.family_utils import load_family as family_load_df, family_monthly_income
 from app.utils.budget import load_budget, get_category_limit
 
@@ -36,17 +36,29 @@ def load_model(name: str):
         return joblib.load(path)
     return None
 
+def sum_amounts(df, by):
+    """
+    Group df by `by` and sum the spend into an 'amount' (rupees) column.
+    Frames from db.load_expenses_columnar(..., ['amount_paise', ...]) are
+    summed exactly as int64 paise and converted once at the end.
+    """
+    if 'amount_paise' in df.columns:
+        out = df.groupby(by, as_index=False, observed=True)['amount_paise'].sum()
+        out['amount'] = out.pop('amount_paise') / 100
+        return out
+    return df.groupby(by, as_index=False, observed=True)['amount'].sum()
+
 # -------------------------
 # 1) FUTURE EXPENSE (time-series, daily -> next-month total)
 # -------------------------
 def prepare_daily_series(trans_df):
     """
-    trans_df: DataFrame with columns ['date','amount']
+    trans_df: DataFrame with columns ['date','amount'] (or 'amount_paise')
     Returns aggregated daily DataFrame with 'date' as datetime and 'amount' summed per day.
     """
     df = trans_df.copy()
     df['date'] = pd.to_datetime(df['date'])
-    df = df.groupby('date', as_index=False)['amount'].sum().sort_values('date')
+    df = sum_amounts(df, 'date').sort_values('date')
     # fill missing dates with 0 to make series continuous
     idx = pd.date_range(df['date'].min(), df['date'].max(), freq='D')
     df = df.set_index('date').reindex(idx, fill_value=0).rename_axis('date').reset_index()
@@ -112,12 +124,12 @@ def predict_savings(model, income, expense):
 # -------------------------
 def analyze_spending_categories(trans_df, top_n=5):
     """
-    trans_df: DataFrame with ['category', 'amount']
+    trans_df: DataFrame with ['category', 'amount'] (or 'amount_paise')
     Returns category sums, percentages, sorted high to low
     """
     df = trans_df.copy()
-    df = df.dropna(subset=['category','amount'])
-    cat = df.groupby('category', as_index=False)['amount'].sum()
+    df = df.dropna(subset=['category', 'amount_paise' if 'amount_paise' in df.columns else 'amount'])
+    cat = sum_amounts(df, 'category')
     total = cat['amount'].sum() if not cat.empty else 0.0
     cat['percentage'] = (cat['amount'] / (total + 1e-9)) * 100
     cat = cat.sort_values('percentage', ascending=False).reset_index(drop=True)
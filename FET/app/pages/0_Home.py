@@ -1,50 +1,14 @@
 # pages/0_Home.py
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
 import streamlit as st
 from datetime import datetime
 
-# Try app.utils first (clean project layout), fallback to utils for backward compatibility
-try:
-    from app.utils.formatting import rupee, format_date
-except Exception:
-    from utils.formatting import rupee, format_date
-
-try:
-    from app.utils.expenses import monthly_summary, load_expenses
-except Exception:
-    from utils.expenses import monthly_summary, load_expenses
-
-# Use cleaned DB helpers (load_budget + sync_budget_from_family) from app.utils.db
-try:
-    from app.utils.db import load_budget, sync_budget_from_family
-except Exception:
-    # fall back to older module paths if necessary
-    try:
-        from utils.budget import load_budget  # older helper
-    except Exception:
-        def load_budget(u): return {"main_budget": None, "category_limits_json": "{}"}
-    def sync_budget_from_family(u): return 0.0
-
-# If there is a helper that explicitly computes family monthly income in older utils,
-# use it as fallback to compute a budget if sync isn't available.
-family_monthly_income = None
-try:
-    from app.utils.family import load_family as _lf
-    def family_monthly_income(username: str) -> float:
-        members = _lf(username) or []
-        total = 0.0
-        for m in members:
-            try:
-                total += float(m.get("monthly_income", 0) if isinstance(m, dict) else (m[3] if len(m) > 3 else 0))
-            except Exception:
-                pass
-        return total
-except Exception:
-    try:
-        from utils.family_utils import family_monthly_income  # older helper
-    except Exception:
-        # fallback stub
-        def family_monthly_income(username: str) -> float:
-            return 0.0
+from app.utils.formatting import rupee, format_date
+from app.utils.expenses import monthly_summary, query_expenses
+from app.utils.db import load_budget
+# Family income (trigger-maintained total) is the budget when none is set
+from app.utils.family_utils import family_monthly_income
 
 
 st.set_page_config(page_title="Home", page_icon="🏡", layout="wide")
@@ -59,21 +23,17 @@ if "username" not in st.session_state or not st.session_state.username:
 username = st.session_state.username
 
 # quick stats
-binfo = load_budget(username) or {"main_budget": None, "category_limits_json": "{}"}
+binfo = load_budget(username) or {"main_budget": None, "category_limits": {}}
 main_budget = binfo.get("main_budget")
 
-# If no DB budget, try to sync from family incomes (this writes to DB via sync)
+# If no DB budget, use the family's income (read-only: rendering never writes)
 if not main_budget:
     try:
-        sync_budget_from_family(username)
-        binfo = load_budget(username) or {"main_budget": None, "category_limits_json": "{}"}
-        main_budget = binfo.get("main_budget")
-    except Exception:
-        # fallback: use family_monthly_income helper if available
-        try:
+        main_budget = binfo.get("family_income")
+        if main_budget is None:
             main_budget = family_monthly_income(username)
-        except Exception:
-            main_budget = 0.0
+    except Exception:
+        main_budget = 0.0
 
 # final safety default
 try:
@@ -88,31 +48,13 @@ m = datetime.now().month
 try:
     spent, saved = monthly_summary(username, y, m, main_budget)
 except Exception:
-    # fallback: compute spent via load_expenses if monthly_summary not available
+    # fallback: sum this month's amounts straight from the expenses
     try:
-        df = load_expenses(username)
-        spent = 0.0
-        if hasattr(df, "iterrows"):
-            # pandas DataFrame
-            df["date"] = df["date"].astype(str)
-            df["date_only"] = df["date"].str.slice(0, 10)
-            spent = 0.0
-            for _, r in df.iterrows():
-                try:
-                    dt = r["date_only"]
-                    if dt.startswith(f"{y}-{m:02d}"):
-                        spent += float(r["amount"] or 0.0)
-                except Exception:
-                    pass
-        else:
-            # list of dicts
-            for r in df:
-                try:
-                    d = str(r.get("date", ""))[:7]
-                    if d == f"{y}-{m:02d}":
-                        spent += float(r.get("amount", 0) or 0.0)
-                except Exception:
-                    pass
+        month_start = datetime(y, m, 1)
+        month_end = datetime(y + (m == 12), m % 12 + 1, 1)
+        df = query_expenses(username, start=month_start, end=month_end,
+                            columns=["amount_paise"], order=None)
+        spent = float(df["amount_paise"].sum()) / 100
         saved = main_budget - spent
     except Exception:
         spent, saved = 0.0, main_budget
@@ -144,17 +86,10 @@ with col3:
     st.metric("Saved", rupee(saved))
     # most recent 3 transactions
     try:
-        hist = load_expenses(username)
-        if hasattr(hist, "empty") and not hist.empty:
-            hist["date"] = hist["date"].astype(str)
-            recent = hist.sort_values("date", ascending=False).head(3)
-            for _, r in recent.iterrows():
-                st.write(f"- {r['date']} • {r['category']} • {rupee(r['amount'])}")
-        elif isinstance(hist, list) and len(hist) > 0:
-            # list of dicts fallback
-            recent = sorted(hist, key=lambda x: x.get("date", ""), reverse=True)[:3]
-            for r in recent:
-                st.write(f"- {str(r.get('date',''))} • {r.get('category','')} • {rupee(r.get('amount',0))}")
+        recent = query_expenses(username, columns=["date", "category", "amount"],
+                                order="newest", limit=3)
+        for _, r in recent.iterrows():
+            st.write(f"- {str(r['date'])[:10]} • {r['category']} • {rupee(r['amount'])}")
     except Exception:
         pass
 
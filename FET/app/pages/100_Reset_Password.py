@@ -1,5 +1,7 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
 import streamlit as st
-from utils.db import verify_reset_token, clear_reset_token, reset_password
+from app.utils.db import verify_reset_token, clear_reset_token, reset_password
 
 st.title("🔐 Reset Your Password")
 
@@ -1,3 +1,5 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
 import streamlit as st
 import pandas as pd
 import plotly.express as px
@@ -6,12 +8,13 @@ from datetime import datetime, timedelta
 from app.utils.db import (
     load_budget,
     category_breakdown,
-    load_expenses,
+    query_expenses,
     load_goals,
-    # sync helper (exists in cleaned db.py)
-    sync_budget_from_family,
+    get_household,
+    household_month,
+    user_cache,
 )
-from app.utils.session_ui import show_logout_button
+from app.utils.session_ui import show_logout_button, expense_pager
 
 show_logout_button()  # put this near top of page (after imports)
 
@@ -63,17 +66,26 @@ m = now.month
 # load data from DB
 budget = load_budget(username) or {}
 cat_spend = category_breakdown(username, y, m) or {}
-expenses = load_expenses(username) or []
 goals = load_goals(username) or []
 
-# If DB budget missing, try to compute from family incomes (auto-sync)
-try:
-    if not budget or budget.get("main_budget") in (None, 0):
-        _ = sync_budget_from_family(username)
-        budget = load_budget(username) or {}
-except Exception:
-    # if sync fails, proceed with whatever budget we have
-    pass
+# If DB budget missing, use the family's income (read-only: rendering never writes)
+if not budget.get("main_budget"):
+    budget["main_budget"] = budget.get("family_income") or 0
+
+# Combined household mode: totals grouped in SQL across member accounts
+household = get_household(username)
+combined = False
+if household and len(household["members"]) > 1:
+    combined = st.toggle(
+        f"🏠 Combined view: {household['name']} ({len(household['members'])} accounts)",
+        key="ui_dashboard_combined",
+    )
+if combined:
+    hh = household_month(household, y, m)
+    cat_spend = hh["categories"]
+    budget = {"main_budget": hh["main_budget"], "category_limits": hh["category_limits"]}
+    st.caption("Totals, limits and budget cover every account in the household; "
+               "predictions below still use your own transactions.")
 
 # -------------------------------------------------
 # SAFETY HELPERS
@@ -87,13 +99,7 @@ def safe_float(value, default=0.0):
         return float(default)
 
 
-import json
-try:
-    category_limits = json.loads(budget.get("category_limits_json") or "{}")
-    if not isinstance(category_limits, dict):
-        category_limits = {}
-except Exception:
-    category_limits = {}
+category_limits = budget.get("category_limits") or {}
 
 main_budget = safe_float(budget.get("main_budget", 0))
 monthly_spent = sum([safe_float(v, 0.0) for v in cat_spend.values()]) if cat_spend else 0.0
@@ -145,54 +151,13 @@ col3.metric("Monthly Saved", f"₹ {monthly_saved:,.2f}")
 st.markdown("---")
 st.subheader("🔮 Predictions & Suggestions")
 
-# Build transactions DataFrame from `expenses` (defensive)
-def build_transactions_df(expenses_list):
-    """
-    Expected: each expense item is a dict with at least 'date', 'amount', 'category'
-    Falls back gracefully if keys differ.
-    """
-    if not expenses_list:
-        return pd.DataFrame(columns=["date", "amount", "category"])
-
-    if isinstance(expenses_list, pd.DataFrame):
-        df = expenses_list.copy()
-    else:
-        try:
-            df = pd.DataFrame(expenses_list)
-        except Exception:
-            try:
-                df = pd.DataFrame([{"date": e[0], "amount": e[1], "category": e[2] if len(e) > 2 else None} for e in expenses_list])
-            except Exception:
-                df = pd.DataFrame(columns=["date", "amount", "category"])
-
-    # normalize column names
-    if "amount" not in df.columns:
-        for alt in ["amt", "value", "cost"]:
-            if alt in df.columns:
-                df = df.rename(columns={alt: "amount"})
-                break
-
-    if "date" not in df.columns:
-        for alt in ["txn_date", "transaction_date", "created_at"]:
-            if alt in df.columns:
-                df = df.rename(columns={alt: "date"})
-                break
-
-    if "category" not in df.columns:
-        df["category"] = df.get("category", "Uncategorized")
-
-    # types
-    df["amount"] = df["amount"].apply(lambda v: safe_float(v, 0.0))
-    try:
-        df["date"] = pd.to_datetime(df["date"])
-    except Exception:
-        df["date"] = pd.to_datetime(now)
-
-    df = df[["date", "amount", "category"]]
-    return df
-
-
-trans_df = build_transactions_df(expenses)
+# Typed transactions frame (datetime64 date, int64 paise, categorical category)
+trans_df = user_cache.get(
+    username, "dashboard_transactions",
+    # full history for the models, unsorted (they group / sort themselves)
+    lambda: query_expenses(username, columns=["date", "amount_paise", "category"], order=None),
+)
+trans_df = trans_df.dropna(subset=["date"])
 
 # monthly aggregates for savings model
 def build_monthly_df_from_transactions(trans_df, monthly_income_proxy):
@@ -201,7 +166,8 @@ def build_monthly_df_from_transactions(trans_df, monthly_income_proxy):
 
     df = trans_df.copy()
     df["month"] = df["date"].dt.to_period("M").astype(str)
-    monthly = df.groupby("month", as_index=False)["amount"].sum().rename(columns={"amount": "expense"})
+    monthly = df.groupby("month", as_index=False)["amount_paise"].sum()
+    monthly["expense"] = monthly.pop("amount_paise") / 100
     monthly["income"] = monthly_income_proxy
     monthly = monthly[["month", "income", "expense"]]
     return monthly
@@ -232,11 +198,12 @@ if run_preds:
                 else:
                     total_future_exp, daily_preds = 0.0, []
 
+                cat_sum = (trans_df.groupby("category", observed=True)["amount_paise"].sum() / 100).reset_index(name="amount")
                 results = {
                     "predicted_next_days_total_expense": float(total_future_exp),
                     "predicted_next_month_savings": float(main_budget - total_future_exp) if main_budget else None,
-                    "category_summary": trans_df.groupby("category")["amount"].sum().reset_index().rename(columns={"amount": "amount"}),
-                    "top_categories": trans_df.groupby("category")["amount"].sum().reset_index().rename(columns={"amount": "amount"}).sort_values("amount", ascending=False).head(5),
+                    "category_summary": cat_sum,
+                    "top_categories": cat_sum.sort_values("amount", ascending=False).head(5),
                     "daily_predictions_array": daily_preds if 'daily_preds' in locals() else [],
                 }
             except Exception as e:
@@ -318,11 +285,7 @@ if cat_spend:
 st.markdown("---")
 st.subheader("📄 Recent Transactions")
 
-if expenses:
-    df = pd.DataFrame(expenses)
-    st.dataframe(df, use_container_width=True)
-else:
-    st.info("No transactions yet.")
+expense_pager(username, key="dash_recent")
 
 # -------------------------------------------------
 # ACTIVE GOALS (if exists)
@@ -1,6 +1,8 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
 import streamlit as st
 from datetime import date
-from app.utils.db import load_family, add_expense  # add_expense should exist in your utils.db
+from app.utils.db import load_family, add_expense, list_categories  # add_expense should exist in your utils.db
 
 # Page config
 st.set_page_config(page_title="Add Expense", page_icon="🧾")
@@ -112,7 +114,7 @@ with st.form("form_add_expense", clear_on_submit=False):
     amt_default = float(st.session_state.get("ui_add_amount", 0.0) or 0.0)
     amount = st.number_input("Amount (₹)", min_value=0.0, step=1.0, value=amt_default, format="%.2f", key="ui_amount_field_add")
 
-    categories_list = ["Rent", "Groceries", "Food", "Transport", "Utilities", "Entertainment", "Healthcare", "Education", "Shopping", "Other"]
+    categories_list = list_categories(username)
     cat_default = st.session_state.get("ui_add_category", "Other")
     if cat_default and cat_default not in categories_list:
         categories_list = [cat_default] + categories_list
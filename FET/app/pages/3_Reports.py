@@ -1,18 +1,18 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
 import streamlit as st
 import pandas as pd
-import json
 from datetime import datetime
 
-from utils.expenses import monthly_summary, yearly_summary, category_breakdown
-from utils.db import (
-    load_expenses,
+from app.utils.expenses import monthly_summary, yearly_summary, category_breakdown
+from app.utils.db import (
     load_budget,
     load_goals,
 )
 
-from utils.family_utils import family_monthly_income
-from utils.predictions import predict_next_month
-from utils.formatting import rupee
+from app.utils.family_utils import family_monthly_income
+from app.utils.predictions import predict_next_month
+from app.utils.formatting import rupee
 
 import plotly.graph_objects as go
 
@@ -50,14 +50,9 @@ month = col_m.selectbox(
 # -------------------------------------------------------------------
 # Load budget & calculate summaries
 # -------------------------------------------------------------------
-budget_info = load_budget(username)
-from utils.budget import load_budget
-
-main_budget = budget_info.get("main_budget")
-
 budget_info = load_budget(username)
 main_budget = budget_info["main_budget"]
-category_limits = json.loads(budget_info["category_limits_json"])
+category_limits = budget_info["category_limits"]
 
 if not main_budget:
     main_budget = family_monthly_income(username)
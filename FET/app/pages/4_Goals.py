@@ -1,16 +1,11 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
 import streamlit as st
 from datetime import datetime
 
-from app.utils.db import add_goal, delete_goal
+from app.utils.db import add_goal
 from app.utils.budget import load_budget
-from app.utils.goals_utils import load_goals
-
-
-from utils.goals_utils import (
-    load_goals,
-    add_goal,
-    delete_goal,
-)
+from app.utils.goals_utils import load_goals, delete_goal
 
 from app.utils.expenses import monthly_summary
 from app.utils.family_utils import family_monthly_income
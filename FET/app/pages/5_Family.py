@@ -1,3 +1,5 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
 import streamlit as st
 
 # Correct imports
@@ -5,7 +7,6 @@ from app.utils.db import (
     load_family,
     add_family_member,
     delete_family_member,
-    sync_budget_from_family,
 )
 
 st.set_page_config(page_title="Family Members", page_icon="👨‍👩‍👧‍👦")
@@ -64,9 +65,6 @@ else:
 
             if st.button("🗑 Delete Member", key=f"del_{member_id}"):
                 if delete_family_member(username, member_id):
-                    # Sync budget after deletion
-                    sync_budget_from_family(username)
-
                     st.success("Family member deleted successfully.")
                     st.rerun()
                 else:
@@ -104,9 +102,6 @@ with st.form("add_family_member_form"):
             )
 
             if ok:
-                # Sync budget (db.py also syncs internally, but this ensures UI correct instantly)
-                sync_budget_from_family(username)
-
                 st.success("Family member added successfully!")
                 st.rerun()
             else:
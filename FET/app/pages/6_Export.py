@@ -1,6 +1,11 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+import io
 import streamlit as st
-import pandas as pd
-from utils.db import load_expenses
+from app.utils.db import last_change, load_expenses_page
+from app.utils.expenses import load_expenses
+from app.utils.export import DELTA_FORMATS, FULL_COLUMNS, delta_export, delta_filename, parquet_available
+from app.utils.session_ui import expense_pager
 
 st.set_page_config(page_title="Export Data", page_icon="📤")
 
@@ -16,56 +21,86 @@ username = st.session_state["username"]
 st.title("📤 Export Your Data")
 
 # -------------------------------------
-# LOAD EXPENSES
+# SHOW TABLE (one page at a time)
 # -------------------------------------
-exp = load_expenses(username)
+first_page, _ = load_expenses_page(username, limit=1)
 
-# Normalize → Always DataFrame
-if isinstance(exp, list):
-    df = pd.DataFrame(exp) if exp else pd.DataFrame()
-elif isinstance(exp, pd.DataFrame):
-    df = exp
-else:
-    df = pd.DataFrame()  # fallback
-
-# Ensure columns exist
-expected_cols = ["date", "amount", "category", "assigned_member", "split_json", "note"]
-for col in expected_cols:
-    if col not in df.columns:
-        df[col] = ""
-
-# -------------------------------------
-# SHOW TABLE
-# -------------------------------------
-if df.empty:
+if not first_page:
     st.info("No expenses to export yet.")
 else:
     st.subheader("Your Expenses")
-    st.dataframe(df, width='stretch')
+    expense_pager(username, key="export_preview")
 
     # -------------------------------------
-    # EXPORT OPTIONS
+    # FULL EXPORT (history is read only when asked for)
     # -------------------------------------
     st.subheader("Download Options")
+    full_key = f"export_full:{username}"
+    if st.button("Prepare full export", key="ui_export_full"):
+        # taken first: anything written while the file is built shows up in the next delta
+        full_watermark = last_change(username)
+        # with ids, so later deltas can be upserted / deleted against it
+        df = load_expenses(username, columns=FULL_COLUMNS)
+        df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+        xlsx = io.BytesIO()
+        df.to_excel(xlsx, index=False)
+        st.session_state[full_key] = (df.to_csv(index=False).encode("utf-8"), xlsx.getvalue(), full_watermark)
 
-    # CSV export
-    csv_data = df.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        label="⬇ Download CSV",
-        data=csv_data,
-        file_name=f"{username}_expenses.csv",
-        mime="text/csv"
-    )
+    if full_key in st.session_state:
+        csv_data, xlsx_data, full_watermark = st.session_state[full_key]
+        # the next delta starts where this file ends
+        saved = lambda: st.session_state.update(ui_export_since=full_watermark)
+
+        # CSV export
+        st.download_button(
+            label="⬇ Download CSV",
+            data=csv_data,
+            file_name=f"{username}_expenses.csv",
+            mime="text/csv",
+            on_click=saved,
+        )
 
-    # Excel export
-    xlsx_data = df.to_excel("temp.xlsx", index=False)
-    with open("temp.xlsx", "rb") as f:
+        # Excel export
         st.download_button(
             label="⬇ Download Excel (.xlsx)",
-            data=f,
+            data=xlsx_data,
             file_name=f"{username}_expenses.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            on_click=saved,
+        )
+        st.caption(f"Full export watermark: {full_watermark}")
+
+    # -------------------------------------
+    # DELTA EXPORT (changes since a watermark)
+    # -------------------------------------
+    st.subheader("Changes Since Last Export")
+    st.caption(
+        "Only expenses added, edited or deleted after the watermark "
+        "(0 = everything, until you download an export). "
+        "Each row has an `op` column: I / U = upsert by id, D = delete."
+    )
+    c1, c2 = st.columns(2)
+    # driven only through its key (the download buttons move it forward);
+    # passing value= as well makes Streamlit warn about the double source
+    st.session_state.setdefault("ui_export_since", 0)
+    since = c1.number_input("Watermark", min_value=0, step=1, key="ui_export_since")
+    formats = [f for f in DELTA_FORMATS if f != "parquet" or parquet_available()]
+    fmt = c2.selectbox("Format", formats, key="ui_export_fmt")
+
+    delta_key = f"export_delta:{username}"
+    if st.button("Prepare changes", key="ui_export_delta"):
+        st.session_state[delta_key] = (int(since), fmt) + delta_export(username, int(since), fmt)
+
+    if delta_key in st.session_state:
+        d_since, d_fmt, data, watermark, count = st.session_state[delta_key]
+        st.download_button(
+            label=f"⬇ Download {count:,} change(s)",
+            data=data,
+            file_name=delta_filename(username, d_since, watermark, d_fmt),
+            mime=DELTA_FORMATS[d_fmt],
+            on_click=lambda: st.session_state.update(ui_export_since=watermark),
         )
+        st.caption(f"Changes after {d_since}; new watermark: {watermark}")
 
 st.markdown("---")
 st.caption("Export your expense data securely.")
@@ -1,6 +1,15 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
 import streamlit as st
-from utils.db import load_budget, set_budget
-import json
+from app.utils.db import (
+    create_household,
+    get_household,
+    join_household,
+    leave_household,
+    list_categories,
+    load_budget,
+    set_budget,
+)
 
 st.set_page_config(layout="wide")
 
@@ -15,8 +24,9 @@ username = st.session_state.username
 
 # Load existing budget data
 data = load_budget(username)
-main_budget = data.get("main_budget") or 0
-category_limits = json.loads(data.get("category_limits_json") or "{}")
+# only what the user set; the family-income fallback is never saved back
+main_budget = data.get("explicit_budget") or 0
+category_limits = data.get("category_limits") or {}
 
 st.subheader("💰 Main Monthly Budget")
 main_val = st.number_input(
@@ -24,16 +34,16 @@ main_val = st.number_input(
     min_value=0.0,
     value=float(main_budget),
     step=500.0,
+    help="Leave at 0 to use your family's total monthly income "
+         f"(currently ₹{data.get('family_income') or 0:,.2f}).",
 )
 
 st.markdown("---")
 
 st.subheader("📂 Category Limits")
 
-CATEGORIES = [
-    "Rent", "Groceries", "Food", "Transport", "Utilities",
-    "Entertainment", "Healthcare", "Education", "Shopping", "Other"
-]
+# the default list plus any custom category the user has spent in
+CATEGORIES = list_categories(username)
 
 new_limits = {}
 
@@ -60,3 +70,35 @@ if st.button("💾 Save settings"):
 st.markdown("---")
 
 st.info("Category budgets are used for alerts and dashboard warnings.")
+
+# -------------------------------------------------
+# HOUSEHOLD (combined Dashboard with other accounts)
+# -------------------------------------------------
+st.markdown("---")
+st.subheader("🏠 Household")
+
+household = get_household(username)
+if household:
+    others = [m["username"] for m in household["members"] if m["username"] != username]
+    st.write(f"**{household['name']}** — members: {', '.join(m['username'] for m in household['members'])}")
+    st.caption(f"Share this join code with other accounts in your family: `{household['join_code']}`")
+    if not others:
+        st.info("Nobody has joined yet. The Dashboard gets a combined view once they do.")
+    if st.button("Leave household", key="ui_household_leave"):
+        leave_household(username)
+        st.rerun()
+else:
+    st.caption("Link accounts (e.g. both parents) to see combined spending on the Dashboard.")
+    c1, c2 = st.columns(2)
+    with c1:
+        name = st.text_input("Household name (optional)", key="ui_household_name")
+        if st.button("Create household", key="ui_household_create"):
+            if create_household(username, name.strip() or None):
+                st.rerun()
+            st.error("Could not create the household.")
+    with c2:
+        code = st.text_input("Join code", key="ui_household_code")
+        if st.button("Join household", key="ui_household_join"):
+            if join_household(username, code):
+                st.rerun()
+            st.error("Unknown join code.")
@@ -0,0 +1,101 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+import streamlit as st
+
+from app.utils.importer import IMPORT_FIELDS, guess_mapping, import_file, preview
+
+st.set_page_config(page_title="Import Expenses", page_icon="📥")
+st.title("📥 Import Expenses")
+
+# -------------------------------------
+# USER AUTH CHECK
+# -------------------------------------
+username = st.session_state.get("username")
+if not username:
+    st.warning("Please log in first.")
+    st.stop()
+
+st.caption(
+    "Upload a CSV or Excel bank statement. Large files are imported in chunks, "
+    "and importing the same file twice will not create duplicate expenses."
+)
+
+up = st.file_uploader("Statement file", type=["csv", "xlsx"], key="ui_import_file")
+if not up:
+    st.stop()
+
+# -------------------------------------
+# PREVIEW + COLUMN MAPPING
+# -------------------------------------
+try:
+    up.seek(0)
+    head = preview(up, up.name)
+except Exception as e:
+    st.error(f"Could not read file: {e}")
+    st.stop()
+
+if head.empty:
+    st.info("The file has no rows.")
+    st.stop()
+
+st.subheader("Preview")
+st.dataframe(head, use_container_width=True)
+
+st.subheader("Map columns")
+columns = list(head.columns)
+guess = guess_mapping(columns)
+labels = {
+    "date": "Date",
+    "amount": "Amount (₹)",
+    "category": "Category",
+    "assigned_member": "Paid by",
+    "note": "Note",
+}
+
+mapping = {}
+cols = st.columns(len(IMPORT_FIELDS))
+for col, field in zip(cols, IMPORT_FIELDS):
+    options = [""] + columns
+    default = guess.get(field) or ""
+    mapping[field] = col.selectbox(
+        labels[field], options=options, index=options.index(default), key=f"ui_import_map_{field}"
+    ) or None
+
+c1, c2 = st.columns(2)
+default_category = c1.text_input("Category for rows without one", value="Other", key="ui_import_default_cat")
+dayfirst = c2.checkbox("Dates are day-first (DD/MM/YYYY)", value=True, key="ui_import_dayfirst")
+
+# -------------------------------------
+# IMPORT
+# -------------------------------------
+if st.button("📥 Import", key="ui_import_btn"):
+    if not mapping.get("date") or not mapping.get("amount"):
+        st.warning("Map at least the Date and Amount columns.")
+        st.stop()
+
+    status = st.empty()
+
+    def show_progress(t):
+        status.info(f"Read {t['rows']:,} rows • added {t['inserted']:,} • "
+                    f"skipped {t['duplicates']:,} duplicates • {t['invalid']:,} invalid")
+
+    up.seek(0)
+    with st.spinner("Importing..."):
+        try:
+            totals = import_file(
+                username, up, up.name, mapping,
+                default_category=default_category.strip(),
+                dayfirst=dayfirst,
+                on_progress=show_progress,
+            )
+        except Exception as e:
+            st.error(f"Import failed: {e}")
+            st.stop()
+
+    status.empty()
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Added", f"{totals['inserted']:,}")
+    m2.metric("Already imported", f"{totals['duplicates']:,}")
+    m3.metric("Invalid rows", f"{totals['invalid']:,}")
+    if totals["inserted"]:
+        st.success("Import complete.")
@@ -1,5 +1,7 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
 import streamlit as st
-from utils.db import register_user
+from app.utils.db import register_user
 import re
 
 st.set_page_config(page_title="Register", page_icon="📝")
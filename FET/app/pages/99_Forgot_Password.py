@@ -1,6 +1,8 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
 import streamlit as st
-from utils.db import create_reset_token, get_user_email
-from utils.email_utils import send_email  # if you use SMTP
+from app.utils.db import create_reset_token, get_user_email
+from app.utils.email_utils import send_email  # if you use SMTP
 
 st.title("🔑 Forgot Password")
 
@@ -0,0 +1,106 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+import streamlit as st
+import pandas as pd
+from datetime import date
+
+from app.utils.db import search_expenses
+from app.utils.formatting import rupee
+
+st.set_page_config(page_title="Search Expenses", page_icon="🔎", layout="wide")
+st.title("🔎 Search Expenses")
+
+# -------------------------------------
+# USER AUTH CHECK
+# -------------------------------------
+username = st.session_state.get("username")
+if not username:
+    st.warning("Please log in first.")
+    st.stop()
+
+# -------------------------------------
+# FILTERS
+# -------------------------------------
+text = st.text_input("Search notes and categories", placeholder="e.g. swiggy, rent, medicine",
+                     key="ui_search_text")
+
+c1, c2, c3, c4 = st.columns(4)
+use_dates = c1.checkbox("Filter by date", value=False, key="ui_search_use_dates")
+start = c1.date_input("From", value=date(date.today().year, 1, 1), key="ui_search_start",
+                      disabled=not use_dates)
+end = c2.date_input("To (inclusive)", value=date.today(), key="ui_search_end",
+                    disabled=not use_dates)
+min_amount = c3.number_input("Min amount (₹)", min_value=0.0, value=0.0, step=100.0,
+                             key="ui_search_min")
+max_amount = c4.number_input("Max amount (₹, 0 = no limit)", min_value=0.0, value=0.0, step=100.0,
+                             key="ui_search_max")
+
+# the facet widgets' current picks are already in session_state, so the
+# search runs first and its facets (each ignores its own filter) become
+# the choices in this same run
+categories = st.session_state.get("ui_search_cats", [])
+members = st.session_state.get("ui_search_members", [])
+
+filters = dict(
+    text=text.strip() or None,
+    start=start.isoformat() if use_dates else None,
+    end=(pd.Timestamp(end) + pd.Timedelta(days=1)).date().isoformat() if use_dates else None,
+    min_amount=min_amount or None,
+    max_amount=max_amount or None,
+    categories=categories or None,
+    members=members or None,
+)
+
+# new filters -> back to the first page
+cursor_key = "ui_search_cursors"
+if st.session_state.get("ui_search_filters") != filters:
+    st.session_state["ui_search_filters"] = filters
+    st.session_state[cursor_key] = [None]
+stack = st.session_state.setdefault(cursor_key, [None])
+
+res = search_expenses(username, before=stack[-1], limit=50, **filters)
+facets = res["facets"]
+
+f1, f2 = st.columns(2)
+f1.multiselect(
+    "Category", options=sorted(set(facets["category"]) | set(categories)),
+    format_func=lambda c: f"{c or '—'} ({facets['category'].get(c, 0)})", key="ui_search_cats",
+)
+f2.multiselect(
+    "Member", options=sorted(set(facets["member"]) | set(members)),
+    format_func=lambda m: f"{m or '—'} ({facets['member'].get(m, 0)})", key="ui_search_members",
+)
+
+# -------------------------------------
+# RESULTS
+# -------------------------------------
+m1, m2 = st.columns(2)
+m1.metric("Matching expenses", f"{res['total']:,}{'+' if res['capped'] else ''}")
+m2.metric("Total amount", rupee(res["amount"]))
+if res["capped"]:
+    st.caption("Very broad text search: counts cover the most recently added matches only. "
+               "Add words or filters to narrow it.")
+
+left, right = st.columns([3, 1])
+with left:
+    if res["rows"]:
+        st.dataframe(pd.DataFrame(res["rows"]), use_container_width=True, hide_index=True)
+    else:
+        st.info("No expenses match these filters.")
+
+    b1, b2, b3 = st.columns([1, 2, 1])
+    if b1.button("⬅ Newer", key="ui_search_newer", disabled=len(stack) == 1):
+        stack.pop()
+        st.rerun()
+    b2.caption(f"Page {len(stack)}")
+    if b3.button("Older ➡", key="ui_search_older", disabled=res["next_cursor"] is None):
+        stack.append(res["next_cursor"])
+        st.rerun()
+
+with right:
+    st.markdown("**By category**")
+    for name, n in list(res["facets"]["category"].items())[:10]:
+        st.write(f"{name or '—'}: {n:,}")
+    st.markdown("**By member**")
+    for name, n in list(res["facets"]["member"].items())[:10]:
+        st.write(f"{name or '—'}: {n:,}")
@@ -0,0 +1,15 @@
+# Move expenses from closed years into expenses_archive.
+# Run from the FET/ directory:
+#   python app/tools/archive_expenses.py                  # every user, years before this one
+#   python app/tools/archive_expenses.py 2024             # every user, years before 2024
+#   python app/tools/archive_expenses.py 2024 <username>  # one user
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+
+from app.utils.db import archive_closed_years
+
+before_year = int(sys.argv[1]) if len(sys.argv) > 1 else None
+username = sys.argv[2] if len(sys.argv) > 2 else None
+
+moved = archive_closed_years(username, before_year)
+print(f"✅ Archived {moved} expense(s) for", username or "all users")
@@ -0,0 +1,27 @@
+# Online backup of app.db and any shard files into app/instance/backups/.
+# Safe while the app is running: sessions keep writing during the copy.
+# Run from the FET/ directory:
+#   python app/tools/backup_db.py             # one snapshot (e.g. hourly from cron)
+#   python app/tools/backup_db.py 3600        # stay running, one snapshot per hour
+#   python app/tools/backup_db.py 3600 24     # ... keeping the newest 24
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+
+from app.utils.backup import KEEP, run_backup, run_forever
+
+
+def report(res):
+    if "error" in res:
+        print(f"❌ Backup failed: {res['error']}", flush=True)
+    else:
+        print(f"✅ Backed up to {res['path']} in {res['seconds']:.1f}s "
+              f"(removed {res['removed']} old snapshot(s))", flush=True)
+
+
+every = float(sys.argv[1]) if len(sys.argv) > 1 else None
+keep = int(sys.argv[2]) if len(sys.argv) > 2 else KEEP
+
+if every:
+    run_forever(every, keep, on_result=report)
+else:
+    report(run_backup(keep))
@@ -0,0 +1,146 @@
+# Benchmark: the baseline dict-per-row expense loading vs the typed columnar loader.
+# Builds throwaway databases (app/instance is never touched): the current
+# schema for the columnar loader, and the same rows in the baseline schema
+# (REAL rupees, text dates and categories) for the code it replaced.
+# Run from the FET/ directory:  python app/tools/bench_expense_loader.py [rows]
+import sys, pathlib, json, random, sqlite3, tempfile, time, tracemalloc
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+
+import pandas as pd
+
+from app.utils import db
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+USER = "bench"
+TARGET = 5.0  # required speed-up and peak-memory reduction vs legacy
+
+
+def seed(n):
+    random.seed(7)
+    cats = ["Rent", "Groceries", "Food", "Transport", "Utilities", "Shopping", "Other"]
+    members = ["Ravi", "Meera", "Riya", ""]
+    rows = []
+    for i in range(n):
+        m = random.choice(members)
+        rows.append({
+            "date": f"20{random.randint(15, 25)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+            "amount": round(random.uniform(10, 5000), 2),
+            "category": random.choice(cats),
+            "assigned_member": m,
+            "split": {m: 1} if m and i % 5 == 0 else None,
+            "note": f"note {i}",
+        })
+    db.add_expenses_bulk(USER, rows)
+    return rows
+
+
+def seed_legacy(path, rows):
+    """The same rows in the expenses table as it was before the migrations."""
+    conn = sqlite3.connect(str(path))
+    conn.execute("""
+        CREATE TABLE expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            date TEXT,
+            amount REAL,
+            category TEXT,
+            assigned_member TEXT,
+            split_json TEXT,
+            note TEXT
+        )
+    """)
+    conn.executemany("""
+        INSERT INTO expenses (username, date, amount, category, assigned_member, split_json, note)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [(USER, r["date"], r["amount"], r["category"], r["assigned_member"],
+           json.dumps(r["split"]) if r["split"] else "", r["note"]) for r in rows])
+    conn.commit()
+    conn.close()
+
+
+def safe_float(value, default=0.0):
+    try:
+        if value is None:
+            return float(default)
+        return float(value)
+    except Exception:
+        return float(default)
+
+
+def legacy():
+    """The baseline path: db.load_expenses() dicts + json.loads, then the Dashboard's apply(safe_float)."""
+    conn = sqlite3.connect(str(LEGACY_PATH))
+    conn.row_factory = sqlite3.Row
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id, date, amount, category, assigned_member, split_json, note
+        FROM expenses
+        WHERE username=?
+        ORDER BY date DESC, id DESC
+    """, (USER,))
+    rows = cur.fetchall()
+    conn.close()
+
+    result = []
+    for r in rows:
+        row = {k: r[k] for k in r.keys()}
+        try:
+            row["split"] = json.loads(r["split_json"]) if r["split_json"] else None
+        except Exception:
+            row["split"] = None
+        result.append(row)
+
+    df = pd.DataFrame(result)
+    df["amount"] = df["amount"].apply(lambda v: safe_float(v, 0.0))
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def columnar():
+    """Full-width typed load (every column, splits left undecoded)."""
+    return db.load_expenses_columnar(USER)
+
+
+def columnar_dashboard():
+    """What the Dashboard loads now: date, amount, category only."""
+    return db.load_expenses_columnar(USER, columns=["date", "amount", "category"])
+
+
+def measure(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    tracemalloc.start()
+    df = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, int(df.memory_usage(deep=True).sum())
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    db.DB_PATH = pathlib.Path(tmp) / "bench.db"
+    LEGACY_PATH = pathlib.Path(tmp) / "legacy.db"
+    db.init_db()
+    seed_legacy(LEGACY_PATH, seed(ROWS))
+
+    results = {
+        "legacy": measure(legacy),
+        "columnar": measure(columnar),
+        "dashboard": measure(columnar_dashboard),
+    }
+    db.close_connections()
+
+print(f"{ROWS:,} rows")
+for name, (secs, peak, frame) in results.items():
+    print(f"  {name:9s} {secs * 1000:8.1f} ms   peak {peak / 2**20:7.1f} MiB   frame {frame / 2**20:7.1f} MiB")
+lt, lp, lf = results["legacy"]
+for name in ("columnar", "dashboard"):
+    ct, cp, cf = results[name]
+    met = lt / ct >= TARGET and lp / cp >= TARGET
+    print(f"  {name:9s} vs legacy: {lt / ct:.1f}x faster, "
+          f"peak memory {lp / cp:.1f}x lower, frame {lf / cf:.1f}x smaller "
+          f"-> {'meets' if met else 'MISSES'} the {TARGET:g}x target")
+# every column includes note / split_json: one Python str per row that no
+# projection can drop, so the full-width load (exports) stays under target
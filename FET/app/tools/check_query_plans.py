@@ -0,0 +1,18 @@
+# Verify that the hot per-user queries are served by indexes.
+# Run from the FET/ directory:  python app/tools/check_query_plans.py
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+
+from app.utils.db import connection
+from app.utils.migrations import check_query_plans, schema_version
+
+with connection() as conn:
+    print("schema version:", schema_version(conn))
+    try:
+        plans = check_query_plans(conn)
+    except AssertionError as e:
+        print("❌", e)
+        sys.exit(1)
+
+for name, plan in plans.items():
+    print(f"✅ {name}: {plan}")
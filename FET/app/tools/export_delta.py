@@ -0,0 +1,24 @@
+# Export one user's expenses changed since a watermark (change_log seq).
+# Run from the FET/ directory:
+#   python app/tools/export_delta.py <username>                      # everything, as CSV
+#   python app/tools/export_delta.py <username> 1200                 # changes after seq 1200
+#   python app/tools/export_delta.py <username> 1200 json            # csv / json / parquet
+#   python app/tools/export_delta.py <username> 1200 json out.json   # explicit output file
+# Prints the new watermark; pass it as the second argument next time.
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+
+from app.utils.export import delta_export, delta_filename
+
+if len(sys.argv) < 2:
+    sys.exit("usage: export_delta.py <username> [since] [csv|json|parquet] [out]")
+
+username = sys.argv[1]
+since = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+fmt = sys.argv[3] if len(sys.argv) > 3 else "csv"
+
+data, watermark, count = delta_export(username, since, fmt)
+out = pathlib.Path(sys.argv[4] if len(sys.argv) > 4 else delta_filename(username, since, watermark, fmt))
+out.write_bytes(data)
+print(f"✅ Exported {count} changed expense(s) to {out}")
+print(f"watermark={watermark}")
@@ -0,0 +1,25 @@
+# SQLite upkeep for app.db and shard files: optimize/ANALYZE, bounded
+# incremental vacuum, WAL checkpoint. Safe while the app is running;
+# schedule it for a quiet hour (e.g. nightly from cron).
+# Run from the FET/ directory:
+#   python app/tools/maintain_db.py            # PRAGMA optimize + vacuum + checkpoint
+#   python app/tools/maintain_db.py analyze    # full ANALYZE instead of optimize
+#   python app/tools/maintain_db.py convert    # one-off: switch old files to
+#                                              # auto_vacuum=INCREMENTAL (full VACUUM, blocks writers)
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+
+from app.utils.maintenance import run_maintenance
+
+args = set(sys.argv[1:])
+
+for r in run_maintenance(analyze="analyze" in args, convert="convert" in args):
+    b, a = r["before"], r["after"]
+    ckpt = r["checkpoint"]
+    print(f"✅ {r['path']}")
+    print(f"   pages {b['page_count']:,} -> {a['page_count']:,} "
+          f"(free {b['freelist_count']:,} -> {a['freelist_count']:,}, "
+          f"{r['vacuumed_pages']:,} vacuumed, auto_vacuum={r['auto_vacuum']})")
+    print(f"   wal {b['wal_bytes']:,} -> {a['wal_bytes']:,} bytes"
+          f"{' (checkpoint busy)' if ckpt['busy'] else ''}"
+          f"{'' if r['quiet'] else ' — never quiet, ran anyway'}")
@@ -0,0 +1,12 @@
+# Recompute monthly_category_totals from the raw expenses table.
+# Run from the FET/ directory:
+#   python app/tools/rebuild_rollups.py            # every user
+#   python app/tools/rebuild_rollups.py <username> # one user
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+
+from app.utils.db import rebuild_monthly_totals
+
+username = sys.argv[1] if len(sys.argv) > 1 else None
+rebuild_monthly_totals(username)
+print("✅ Rebuilt monthly totals for", username or "all users")
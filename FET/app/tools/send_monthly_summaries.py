@@ -0,0 +1,16 @@
+# Email / Telegram every user a summary of one month.
+# Run from the FET/ directory (e.g. from cron on the 1st):
+#   python app/tools/send_monthly_summaries.py            # last month
+#   python app/tools/send_monthly_summaries.py 2025 11    # a given month
+import sys, pathlib, logging
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+
+from app.utils.monthly_summary import send_monthly_summaries
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+year = int(sys.argv[1]) if len(sys.argv) > 2 else None
+month = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+counts = send_monthly_summaries(year, month)
+print(f"✅ Sent {counts['sent']} summary(ies), skipped {counts['skipped']}, failed {counts['failed']}")
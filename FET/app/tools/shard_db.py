@@ -0,0 +1,100 @@
+# Split the per-user tables of app/instance/app.db into shard files.
+# Run from the FET/ directory, with the app stopped:
+#   python app/tools/shard_db.py user        # one file per username
+#   python app/tools/shard_db.py 8           # 8 hash-partitioned files
+#   python app/tools/shard_db.py 8 --keep    # copy only, leave rows in app.db
+# Then start the app with the same FET_SHARDS value.
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+
+from app.utils import db
+
+# categories first: expense triggers look their names up
+USER_TABLES = ["categories", "category_limits", "family", "expenses", "expenses_archive",
+               "budgets", "goals"]
+
+if len(sys.argv) < 2 or not (sys.argv[1] == "user" or sys.argv[1].isdigit()):
+    print("usage: shard_db.py user|<N> [--keep]")
+    sys.exit(1)
+
+db.SHARD_MODE = sys.argv[1]
+keep = "--keep" in sys.argv[2:]
+src = str(db.DB_PATH)
+
+
+def columns(conn, schema, table):
+    return [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info({table})").fetchall()]
+
+
+with db.connection(path=src) as conn:
+    ids = sorted({
+        r[0]
+        for t in USER_TABLES
+        for r in conn.execute(f"SELECT DISTINCT user_id FROM {t}").fetchall()
+    })
+users = db.usernames_by_id(ids)
+
+# rows keep their user_id: the users table itself stays in app.db
+by_shard = {}
+for uid, u in sorted(users.items(), key=lambda kv: kv[1]):
+    by_shard.setdefault(db.shard_path(u), []).append(uid)
+
+print(f"{len(users)} users -> {len(by_shard)} shard file(s)")
+
+for path, uids in sorted(by_shard.items()):
+    with db.connection(path=path):
+        pass  # creates + migrates the shard schema
+
+    marks = ",".join("?" * len(uids))
+    with db.connection(path=src) as conn:
+        conn.execute("ATTACH DATABASE ? AS shard", (str(path),))
+    try:
+        with db.connection(path=src) as conn:
+            for t in USER_TABLES:
+                shared = [c for c in columns(conn, "main", t) if c in columns(conn, "shard", t)]
+                cols = ", ".join(shared)
+                conn.execute(
+                    f"INSERT OR IGNORE INTO shard.{t} ({cols}) "
+                    f"SELECT {cols} FROM main.{t} WHERE user_id IN ({marks})", uids
+                )
+            conn.execute(f"""
+                INSERT OR IGNORE INTO shard.expense_splits (expense_id, member, share)
+                SELECT s.expense_id, s.member, s.share
+                FROM main.expense_splits s
+                JOIN (SELECT id, user_id FROM main.expenses
+                      UNION ALL
+                      SELECT id, user_id FROM main.expenses_archive) e ON e.id = s.expense_id
+                WHERE e.user_id IN ({marks})
+            """, uids)
+            # only the hot table's insert trigger feeds the search index
+            conn.execute(f"""
+                INSERT INTO shard.expenses_fts (rowid, note, category, user_id)
+                SELECT a.id, a.note, c.name, a.user_id
+                FROM shard.expenses_archive a
+                JOIN shard.categories c ON c.id = a.category_id
+                WHERE a.user_id IN ({marks})
+                  AND a.id NOT IN (SELECT rowid FROM shard.expenses_fts)
+            """, uids)
+
+            for t in USER_TABLES + ["expenses_fts"]:
+                q = f"SELECT COUNT(*) FROM {{}}.{t} WHERE user_id IN ({marks})"
+                a = conn.execute(q.format("main"), uids).fetchone()[0]
+                b = conn.execute(q.format("shard"), uids).fetchone()[0]
+                if a != b:
+                    raise RuntimeError(f"{path.name}: {t} has {a} rows in app.db but {b} in shard")
+
+            if not keep:
+                # delete triggers also clear the moved splits and rollups
+                for t in USER_TABLES:
+                    conn.execute(f"DELETE FROM main.{t} WHERE user_id IN ({marks})", uids)
+    finally:
+        with db.connection(path=src) as conn:
+            conn.execute("DETACH DATABASE shard")
+
+    # archived rows carry no insert trigger: recount the shard's rollup
+    for uid in uids:
+        db.rebuild_monthly_totals(users[uid])
+
+    print(f"✅ {path.name}: {', '.join(users[uid] for uid in uids)}")
+
+print("Done. Start the app with FET_SHARDS=" + db.SHARD_MODE)
@@ -6,8 +6,22 @@ import time
 import secrets
 import hashlib
 import os
+import threading
+import zlib
+import functools
+import inspect
+import queue
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import date as _date
 from pathlib import Path
-from typing import Optional, Any, List, Dict
+from typing import Optional, Any, Callable, List, Dict, Iterator, NamedTuple, Tuple
+
+from .migrations import (
+    latest_version, run_migrations, schema_version,
+    rebuild_monthly_totals as _rebuild_monthly_totals,
+)
 
 # ============================================================
 # PASSWORD HASHING (bcrypt preferred)
@@ -23,26 +37,402 @@ except Exception:
 # ============================================================
 # DATABASE PATHS (ONE DB ONLY — app/instance/app.db)
 # ============================================================
+# FET_INSTANCE_DIR moves app.db, shards and backups elsewhere (tests,
+# a data volume); unset keeps them in app/instance/.
 BASE_DIR = Path(__file__).resolve().parent.parent  # app/
-INSTANCE_DIR = BASE_DIR / "instance"
+INSTANCE_DIR = Path(os.environ.get("FET_INSTANCE_DIR") or BASE_DIR / "instance")
 INSTANCE_DIR.mkdir(parents=True, exist_ok=True)
 
 DB_PATH = INSTANCE_DIR / "app.db"   # <-- MAIN AND ONLY DB
 
 
 # ============================================================
-# CONNECTION HELPERS
+# SHARD ROUTING (opt-in)
+# ============================================================
+# FET_SHARDS unset / ""  -> every table lives in app.db (default)
+# FET_SHARDS=user        -> one database file per username
+# FET_SHARDS=<N>         -> N hash-partitioned database files
+# Shards live under instance/shards/. The users table (login, reset
+# tokens, user ids) always stays in app.db; every per-user table moves.
+SHARD_MODE = os.environ.get("FET_SHARDS", "").strip().lower()
+SHARD_DIR = INSTANCE_DIR / "shards"
+
+
+def shard_path(username: Optional[str]) -> Path:
+    """Database file holding `username`'s data under the current SHARD_MODE."""
+    if not SHARD_MODE or not username:
+        return Path(DB_PATH)
+    if SHARD_MODE == "user":
+        # hashed so any username is a safe file name
+        digest = hashlib.sha1(username.encode("utf-8")).hexdigest()[:16]
+        return SHARD_DIR / f"user_{digest}.db"
+    n = max(int(SHARD_MODE), 1)
+    return SHARD_DIR / f"shard_{zlib.crc32(username.encode('utf-8')) % n:03d}.db"
+
+
+def all_db_paths() -> List[Path]:
+    """app.db plus every shard file that exists (for admin fan-out)."""
+    paths = [Path(DB_PATH)]
+    if SHARD_MODE and SHARD_DIR.exists():
+        pattern = "user_*.db" if SHARD_MODE == "user" else "shard_*.db"
+        paths += sorted(SHARD_DIR.glob(pattern))
+    return paths
+
+
+# ============================================================
+# CONNECTION MANAGER
 # ============================================================
-def get_conn() -> sqlite3.Connection:
-    """Primary connection used everywhere."""
-    conn = sqlite3.connect(str(DB_PATH))
+# One connection per thread and database file, opened on first use.
+# Streamlit starts a fresh ScriptRunner thread for every rerun, so in
+# the app that means one connection per script run (not per session):
+# every helper call within a run shares it, and the pragmas below are
+# applied once per run instead of on every call. Anything memoised on
+# the thread state (e.g. user_generation) lasts one run as well.
+BUSY_TIMEOUT_MS = 5000
+
+CONNECTION_PRAGMAS = (
+    # must precede journal_mode: only a brand-new file picks it up here;
+    # existing ones are converted by maintenance.py (convert=True)
+    ("auto_vacuum", "INCREMENTAL"),
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("busy_timeout", BUSY_TIMEOUT_MS),
+    ("cache_size", -16000),        # ~16 MB page cache
+    ("mmap_size", 268435456),      # 256 MB memory-mapped I/O
+    ("temp_store", "MEMORY"),
+)
+
+_local = threading.local()
+
+# database files whose schema has been created/migrated by this process;
+# a file is only added once init_db() has finished for it, so a failed
+# migration is retried on the next connection instead of never again
+_schema_ready: set = set()
+_schema_lock = threading.RLock()
+
+
+def _open_conn(path: Path | str) -> sqlite3.Connection:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_MS / 1000)
     conn.row_factory = sqlite3.Row
+    for name, value in CONNECTION_PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def _thread_state() -> threading.local:
+    if not hasattr(_local, "conns"):
+        _local.conns = {}
+        _local.depth = {}
+        _local.generations = {}
+        _local.failed = set()
+        _local.initializing = set()
+    return _local
+
+
+def _thread_conn(path: Path | str | None = None) -> sqlite3.Connection:
+    """Return this thread's cached connection for `path`, opening it once."""
+    key = str(path or DB_PATH)
+    state = _thread_state()
+    conn = state.conns.get(key)
+    if conn is None:
+        conn = _open_conn(key)
+        state.conns[key] = conn
+    if key not in _schema_ready and key not in state.initializing:
+        init_db(key)   # first touch of this file, or an earlier attempt failed
     return conn
 
 
-def get_connection() -> sqlite3.Connection:
+@contextmanager
+def connection(username: Optional[str] = None,
+               *, path: Path | str | None = None) -> Iterator[sqlite3.Connection]:
+    """
+    Hand out this thread's persistent connection to `username`'s database
+    (app.db unless sharding is on), or to an explicit `path`.
+
+    The outermost `with connection()` block commits on success and rolls
+    back on error; nested blocks join the enclosing transaction, so a
+    helper that calls another helper still commits exactly once.
+    """
+    key = str(path or shard_path(username))
+    conn = _thread_conn(key)
+    state = _thread_state()
+    depth = state.depth.get(key, 0)
+    state.depth[key] = depth + 1
+    if depth == 0:
+        state.failed.discard(key)
+    try:
+        yield conn
+        if depth == 0:
+            conn.commit()
+    except BaseException:
+        if depth == 0:
+            conn.rollback()
+        else:
+            # an inner block failed; remembered even if a helper swallows
+            # the error (the single writer rolls that command back)
+            state.failed.add(key)
+        raise
+    finally:
+        state.depth[key] = depth
+
+
+def close_connections() -> None:
+    """Close every connection cached on the calling thread."""
+    state = _thread_state()
+    for conn in state.conns.values():
+        try:
+            conn.close()
+        except Exception:
+            pass
+    state.conns.clear()
+    state.depth.clear()
+    state.generations.clear()
+    state.failed.clear()
+
+
+def get_conn(username: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Standalone tuned connection to `username`'s database, for legacy
+    callers that close it themselves.
+    New code should use `with connection(username) as conn:` instead.
+    """
+    path = shard_path(username)
+    _thread_conn(path)  # makes sure the file's schema exists
+    return _open_conn(path)
+
+
+def get_connection(username: Optional[str] = None) -> sqlite3.Connection:
     """Compatibility alias for older modules."""
-    return get_conn()
+    return get_conn(username)
+
+
+def fan_out(fn: Callable[[sqlite3.Connection], Any],
+            paths: Optional[List[Path]] = None,
+            max_workers: Optional[int] = None) -> List[Any]:
+    """
+    Run `fn(conn)` against every database file in parallel and return the
+    results in path order. Used by admin/batch jobs that span all users.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    paths = list(paths or all_db_paths())
+
+    def run(p):
+        try:
+            with connection(path=p) as conn:
+                return fn(conn)
+        finally:
+            close_connections()
+
+    if len(paths) == 1:
+        with connection(path=paths[0]) as conn:
+            return [fn(conn)]
+    with ThreadPoolExecutor(max_workers=max_workers or min(8, len(paths))) as pool:
+        return list(pool.map(run, paths))
+
+
+# ============================================================
+# SINGLE WRITER (opt-in)
+# ============================================================
+# FET_WRITER unset / ""  -> every session commits its own writes (default)
+# FET_WRITER=1           -> one background thread per process runs all
+#                           @queued_write helpers; whatever is queued
+#                           within WRITER_WINDOW seconds shares a single
+#                           transaction, so a burst of sessions costs one
+#                           lock + commit instead of one each
+# Each command runs under its own SAVEPOINT: a failing one is rolled back
+# alone and its caller gets the same return value / exception as before.
+WRITER_MODE = os.environ.get("FET_WRITER", "").strip().lower() in ("1", "true", "yes", "on")
+WRITER_WINDOW = float(os.environ.get("FET_WRITER_WINDOW", "0.003"))
+WRITER_MAX_BATCH = 256
+
+
+class _WriteCommand(NamedTuple):
+    path: str
+    fn: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    future: Future
+
+
+class _Writer:
+    def __init__(self, window: float = WRITER_WINDOW, max_batch: int = WRITER_MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self.queue: "queue.Queue[Optional[_WriteCommand]]" = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="fet-db-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, username: Optional[str], fn: Callable[..., Any],
+               *args: Any, **kwargs: Any) -> Future:
+        fut: Future = Future()
+        self.queue.put(_WriteCommand(str(shard_path(username)), fn, args, kwargs, fut))
+        return fut
+
+    def stop(self) -> None:
+        self.queue.put(None)
+        self.thread.join()
+
+    def _next_batch(self) -> Tuple[List[_WriteCommand], bool]:
+        first = self.queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        try:
+            while True:
+                batch, stopping = self._next_batch()
+                groups: Dict[str, List[_WriteCommand]] = {}
+                for cmd in batch:
+                    groups.setdefault(cmd.path, []).append(cmd)
+                for path, cmds in groups.items():
+                    self._commit(path, cmds)
+                if stopping:
+                    return
+        finally:
+            close_connections()
+
+    def _commit(self, path: str, cmds: List[_WriteCommand]) -> None:
+        state = _thread_state()
+        done = []
+        try:
+            with connection(path=path) as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for cmd in cmds:
+                    if not cmd.future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT queued_write")
+                    state.failed.discard(path)
+                    result, error = None, None
+                    try:
+                        result = cmd.fn(*cmd.args, **cmd.kwargs)
+                    except Exception as e:
+                        error = e
+                    if error is not None or path in state.failed:
+                        conn.execute("ROLLBACK TO queued_write")
+                    conn.execute("RELEASE queued_write")
+                    done.append((cmd.future, result, error))
+        except Exception as e:
+            # the batch never committed: nobody's write landed
+            for cmd in cmds:
+                if not cmd.future.done():
+                    cmd.future.set_exception(e)
+            return
+        for fut, result, error in done:
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(result)
+
+
+_writer: Optional[_Writer] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> _Writer:
+    """The process's writer thread, started on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.thread.is_alive():
+            _writer = _Writer()
+        return _writer
+
+
+def stop_writer() -> None:
+    """Flush and stop the writer thread (tools / tests)."""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
+
+
+def queued_write(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Route a write helper through the single writer when FET_WRITER is on.
+    The helper's `username` argument picks the database file. Calls made
+    from inside an open connection() block on that file run inline, so
+    they still join the caller's transaction.
+    """
+    sig = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not WRITER_MODE or threading.current_thread().name == "fet-db-writer":
+            return fn(*args, **kwargs)
+        username = sig.bind_partial(*args, **kwargs).arguments.get("username")
+        if _thread_state().depth.get(str(shard_path(username)), 0):
+            return fn(*args, **kwargs)
+        return get_writer().submit(username, fn, *args, **kwargs).result()
+
+    return wrapper
+
+
+# ============================================================
+# DATE HELPERS (expenses.day = days since 1970-01-01)
+# ============================================================
+_EPOCH = _date(1970, 1, 1)
+
+
+def epoch_day(value: Any) -> Optional[int]:
+    """'YYYY-MM-DD' (or a date/datetime) -> integer epoch-day, None if unparseable."""
+    if value is None:
+        return None
+    try:
+        if isinstance(value, _date):
+            d = value if type(value) is _date else value.date()
+        else:
+            d = _date.fromisoformat(str(value).strip()[:10])
+        return (d - _EPOCH).days
+    except Exception:
+        return None
+
+
+def month_bounds(year: int, month: int) -> Tuple[int, int]:
+    """Half-open [start, end) epoch-day range covering one calendar month."""
+    start = _date(int(year), int(month), 1)
+    end = _date(start.year + (start.month == 12), start.month % 12 + 1, 1)
+    return (start - _EPOCH).days, (end - _EPOCH).days
+
+
+def year_bounds(year: int) -> Tuple[int, int]:
+    """Half-open [start, end) epoch-day range covering one calendar year."""
+    return (_date(int(year), 1, 1) - _EPOCH).days, (_date(int(year) + 1, 1, 1) - _EPOCH).days
+
+
+def year_month_key(year: int, month: int) -> int:
+    """monthly_category_totals.year_month key, e.g. (2025, 3) -> 202503."""
+    return int(year) * 100 + int(month)
+
+
+# ============================================================
+# MONEY (stored as INTEGER paise; rupees outside this module)
+# ============================================================
+def to_paise(value: Any) -> Optional[int]:
+    """Rupees (float / str / Decimal) -> integer paise, half-up; None stays None."""
+    from decimal import Decimal, ROUND_HALF_UP
+
+    if value is None or value == "":
+        return None
+    return int((Decimal(str(value)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_paise(value: Any) -> float:
+    """Integer paise -> rupees; NULL -> 0.0."""
+    return (value or 0) / 100
+
 
 
 # ============================================================
@@ -71,70 +461,94 @@ def verify_password(plain: str, hashed: str) -> bool:
 # ============================================================
 # INIT DB
 # ============================================================
-def init_db() -> None:
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        email TEXT,
-        password_hash TEXT,
-        reset_token TEXT,
-        reset_expiry INTEGER
-    )
-    """)
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS family (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL,
-        member_name TEXT,
-        relation TEXT,
-        monthly_income REAL DEFAULT 0,
-        age INTEGER DEFAULT 0,
-        notes TEXT,
-        is_head INTEGER DEFAULT 0,
-        family_name TEXT DEFAULT ''
-    )
-    """)
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS expenses (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL,
-        date TEXT,
-        amount REAL,
-        category TEXT,
-        assigned_member TEXT,
-        split_json TEXT,
-        note TEXT
-    )
-    """)
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS budgets (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL,
-        main_budget REAL,
-        category_limits_json TEXT
-    )
-    """)
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS goals (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL,
-        goal_name TEXT,
-        target_amount REAL,
-        months_to_complete INTEGER,
-        created_on TEXT
-    )
-    """)
+def init_db(path: Path | str | None = None) -> None:
+    """Create the base tables and apply migrations (app.db or one shard file)."""
+    key = str(path or DB_PATH)
+    state = _thread_state()
+    # the lock makes other threads wait for the schema; `initializing`
+    # lets this thread's own connection() calls below skip the check
+    with _schema_lock:
+        state.initializing.add(key)
+        try:
+            _create_schema(key)
+            _schema_ready.add(key)
+        finally:
+            state.initializing.discard(key)
+
+
+def _create_schema(key: str) -> None:
+    with connection(path=key) as conn:
+        cur = conn.cursor()
+
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT,
+            password_hash TEXT,
+            reset_token TEXT,
+            reset_expiry INTEGER
+        )
+        """)
+
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS family (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            member_name TEXT,
+            relation TEXT,
+            monthly_income REAL DEFAULT 0,
+            age INTEGER DEFAULT 0,
+            notes TEXT,
+            is_head INTEGER DEFAULT 0,
+            family_name TEXT DEFAULT ''
+        )
+        """)
+
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            date TEXT,
+            amount REAL,
+            category TEXT,
+            assigned_member TEXT,
+            split_json TEXT,
+            note TEXT
+        )
+        """)
 
-    conn.commit()
-    conn.close()
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS budgets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            main_budget REAL,
+            category_limits_json TEXT
+        )
+        """)
+
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS goals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            goal_name TEXT,
+            target_amount REAL,
+            months_to_complete INTEGER,
+            created_on TEXT
+        )
+        """)
+
+        # shard files resolve usernames to users.id through app.db
+        accounts = key != str(DB_PATH) and schema_version(conn) < latest_version()
+        if accounts:
+            conn.commit()
+            conn.execute("ATTACH DATABASE ? AS accounts", (str(DB_PATH),))
+        try:
+            # indexes, new columns and derived tables, in order
+            run_migrations(conn)
+        finally:
+            if accounts:
+                conn.execute("DETACH DATABASE accounts")
 
 
 # Run at import
@@ -152,47 +566,84 @@ def create_user(username: str, email: str, password: str) -> bool:
         return False
     try:
         pw_hash = hash_password(password)
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
-            (username, email or "", pw_hash)
-        )
-        conn.commit()
-        conn.close()
-        return True
+        with connection() as conn:
+            # a bare row from user_id(create=True) is claimed, a real account is not
+            cur = conn.execute("""
+                INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)
+                ON CONFLICT (username) DO UPDATE SET
+                    email = excluded.email, password_hash = excluded.password_hash
+                WHERE IFNULL(users.password_hash, '') = ''
+            """, (username, email or "", pw_hash))
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        try: conn.close()
-        except: pass
         return False
     except Exception:
-        try: conn.close()
-        except: pass
         return False
 
 
 register_user = create_user
 
 
+# every per-user table is keyed by users.id; ids are AUTOINCREMENT and
+# never reused, so a resolved id stays valid for the life of the process
+_user_ids: Dict[Tuple[str, str], int] = {}
+
+
+def user_id(username: Optional[str], create: bool = False) -> Optional[int]:
+    """
+    users.id for `username`, looked up in app.db once per process.
+    Write paths pass create=True so data saved for a name without an
+    account (imports, tools) still gets an id; read paths get None.
+    """
+    if not username:
+        return None
+    key = (str(DB_PATH), username)
+    uid = _user_ids.get(key)
+    if uid is not None:
+        return uid
+    created = False
+    with connection() as conn:
+        if create:
+            created = conn.execute(
+                "INSERT OR IGNORE INTO users (username) VALUES (?)", (username,)
+            ).rowcount > 0
+        row = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+    if row is None:
+        return None
+    uid = int(row[0])
+    # a row inserted inside the caller's open transaction may still roll back
+    if not (created and _thread_state().depth.get(str(DB_PATH), 0)):
+        _user_ids[key] = uid
+    return uid
+
+
+def usernames_by_id(ids: List[int]) -> Dict[int, str]:
+    """{users.id: username} for `ids` (unknown ids are left out)."""
+    out: Dict[int, str] = {}
+    with connection() as conn:
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            out.update(conn.execute(
+                f"SELECT id, username FROM users WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+    return out
+
+
 def login_user(username: str, password: str) -> bool:
     if not username or not password:
         return False
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT password_hash FROM users WHERE username = ?", (username,))
-    row = cur.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT password_hash FROM users WHERE username = ?", (username,)
+        ).fetchone()
     if not row:
         return False
     return verify_password(password, row["password_hash"])
 
 
 def get_user_email(username: str) -> Optional[str]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT email FROM users WHERE username = ?", (username,))
-    row = cur.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute("SELECT email FROM users WHERE username = ?", (username,)).fetchone()
     if not row:
         return None
     email = row["email"]
@@ -203,38 +654,34 @@ def get_user_email(username: str) -> Optional[str]:
 # RESET TOKEN
 # ============================================================
 def create_reset_token(email_or_username: str, ttl_seconds: int = 3600) -> Optional[str]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT username FROM users WHERE username = ? OR email = ?",
-        (email_or_username, email_or_username)
-    )
-    row = cur.fetchone()
-    if not row:
-        conn.close()
-        return None
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT username FROM users WHERE username = ? OR email = ?",
+            (email_or_username, email_or_username)
+        )
+        row = cur.fetchone()
+        if not row:
+            return None
 
-    username = row["username"]
-    token = secrets.token_urlsafe(24)
-    expiry = int(time.time()) + ttl_seconds
+        username = row["username"]
+        token = secrets.token_urlsafe(24)
+        expiry = int(time.time()) + ttl_seconds
 
-    cur.execute(
-        "UPDATE users SET reset_token=?, reset_expiry=? WHERE username=?",
-        (token, expiry, username)
-    )
-    conn.commit()
-    conn.close()
+        cur.execute(
+            "UPDATE users SET reset_token=?, reset_expiry=? WHERE username=?",
+            (token, expiry, username)
+        )
     return token
 
 
 def verify_reset_token(token: str) -> Optional[str]:
     if not token:
         return None
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT username, reset_expiry FROM users WHERE reset_token=?", (token,))
-    row = cur.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT username, reset_expiry FROM users WHERE reset_token=?", (token,)
+        ).fetchone()
     if not row:
         return None
 
@@ -251,41 +698,31 @@ validate_reset_token = verify_reset_token
 def reset_password(username: str, new_password: str) -> bool:
     try:
         new_hash = hash_password(new_password)
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute(
-            "UPDATE users SET password_hash=?, reset_token=NULL, reset_expiry=NULL WHERE username=?",
-            (new_hash, username)
-        )
-        conn.commit()
-        conn.close()
+        with connection() as conn:
+            conn.execute(
+                "UPDATE users SET password_hash=?, reset_token=NULL, reset_expiry=NULL WHERE username=?",
+                (new_hash, username)
+            )
         return True
     except Exception:
-        try: conn.close()
-        except: pass
         return False
 # ------------------------------------------------------------
 # CLEAR RESET TOKEN (needed by app.py)
 # ------------------------------------------------------------
 def clear_reset_token(username: str) -> None:
     try:
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute(
-            "UPDATE users SET reset_token = NULL, reset_expiry = NULL WHERE username = ?",
-            (username,)
-        )
-        conn.commit()
-        conn.close()
+        with connection() as conn:
+            conn.execute(
+                "UPDATE users SET reset_token = NULL, reset_expiry = NULL WHERE username = ?",
+                (username,)
+            )
     except Exception:
-        try:
-            conn.close()
-        except:
-            pass
+        pass
 
 # ============================================================
 # FAMILY
 # ============================================================
+@queued_write
 def add_family_member(username: str,
                       member_name: str,
                       relation: str,
@@ -296,103 +733,156 @@ def add_family_member(username: str,
                       family_name: str = "",
                       **kwargs) -> bool:
 
-    try: monthly_income = float(monthly_income or 0.0)
-    except: monthly_income = 0.0
+    try: monthly_income = to_paise(monthly_income or 0)
+    except: monthly_income = 0
 
     try: age = int(age or 0)
     except: age = 0
 
     try:
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO family (
-                username, member_name, relation, monthly_income,
-                age, notes, is_head, family_name
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            username,
-            member_name or "",
-            relation or "",
-            monthly_income,
-            age,
-            notes or "",
-            1 if is_head else 0,
-            family_name or ""
-        ))
-        conn.commit()
-        conn.close()
-
-        # auto-sync budget
-        sync_budget_from_family(username)
+        with connection(username) as conn:
+            conn.execute("""
+                INSERT INTO family (
+                    user_id, member_name, relation, monthly_income,
+                    age, notes, is_head, family_name
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                user_id(username, create=True),
+                member_name or "",
+                relation or "",
+                monthly_income,
+                age,
+                notes or "",
+                1 if is_head else 0,
+                family_name or ""
+            ))
 
         return True
 
     except Exception:
-        try: conn.close()
-        except: pass
         return False
 
 
-def save_family(family_name: str, username: str, rows: List[Dict]) -> bool:
+# family columns save_family() compares to decide whether a member changed
+FAMILY_FIELDS = ("member_name", "relation", "monthly_income", "age", "notes", "is_head", "family_name")
+
+
+def _family_values(r: Dict, family_name: Optional[str]) -> tuple:
+    """One roster row as stored (paise income, 0/1 head), in FAMILY_FIELDS order."""
     try:
-        conn = get_conn()
-        cur = conn.cursor()
+        age = int(r.get("age") or 0)
+    except (TypeError, ValueError):
+        age = 0
+    return (
+        r.get("member_name") or "",
+        r.get("relation") or "",
+        to_paise(r.get("monthly_income") or 0),
+        age,
+        r.get("notes") or "",
+        1 if str(r.get("is_head", "")).lower() in ("1", "on", "true", "yes") else 0,
+        (r.get("family_name") if family_name is None else family_name) or "",
+    )
 
-        cur.execute("DELETE FROM family WHERE username=?", (username,))
 
-        for r in rows:
-            inc = float(r.get("monthly_income") or 0.0)
-            age = int(r.get("age") or 0)
+@queued_write
+def save_family(family_name: Optional[str], username: str, rows: List[Dict]) -> bool:
+    """
+    Make the user's roster match `rows`, touching only what changed.
+
+    A row whose `id` is one of the user's members updates that member
+    (only if a field differs); a row without one is matched to an
+    unclaimed member with the same name and relation, else inserted.
+    Members missing from `rows` are deleted. Member ids therefore stay
+    stable across saves. `family_name` applies to every row; None keeps
+    each row's own. One transaction; family_income_totals follows by trigger.
+    """
+    try:
+        uid = user_id(username, create=True)
+        with connection(username) as conn:
+            cols = ", ".join(FAMILY_FIELDS)
+            existing = {}
+            for r in conn.execute(f"SELECT id, {cols} FROM family WHERE user_id=? ORDER BY id", (uid,)):
+                stored = dict(zip(FAMILY_FIELDS, r[1:]))
+                stored["monthly_income"] = from_paise(stored["monthly_income"])
+                existing[r[0]] = _family_values(stored, None)
+
+            claimed = set()
+            updates, inserts = [], []
+            for r in rows:
+                values = _family_values(r, family_name)
+                try:
+                    mid = int(r.get("id"))
+                except (TypeError, ValueError):
+                    mid = None
+                if mid not in existing or mid in claimed:
+                    mid = next((i for i, v in existing.items()
+                                if i not in claimed and v[:2] == values[:2]), None)
+                if mid is None:
+                    inserts.append((uid,) + values)
+                    continue
+                claimed.add(mid)
+                if existing[mid] != values:
+                    updates.append(values + (mid,))
+
+            deletes = [(i,) for i in existing if i not in claimed]
+            conn.executemany("DELETE FROM family WHERE id=?", deletes)
+            conn.executemany(
+                f"UPDATE family SET {', '.join(f + '=?' for f in FAMILY_FIELDS)} WHERE id=?", updates
+            )
+            conn.executemany(
+                f"INSERT INTO family (user_id, {cols}) VALUES (?, {', '.join('?' * len(FAMILY_FIELDS))})",
+                inserts,
+            )
 
-            cur.execute("""
-                INSERT INTO family (
-                    username, member_name, relation, monthly_income,
-                    age, notes, is_head, family_name
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                username,
-                r.get("member_name",""),
-                r.get("relation",""),
-                inc,
-                age,
-                r.get("notes",""),
-                1 if str(r.get("is_head","")).lower() in ("1","on","true","yes") else 0,
-                family_name or ""
-            ))
+        return True
 
-        conn.commit()
-        conn.close()
+    except Exception:
+        return False
 
-        # auto-sync
-        sync_budget_from_family(username)
 
-        return True
+@queued_write
+def delete_family_member(username: str, member_id: int) -> bool:
+    try:
+        with connection(username) as conn:
+            cur = conn.execute(
+                "DELETE FROM family WHERE id=? AND user_id=?", (int(member_id), user_id(username))
+            )
+        return cur.rowcount > 0
 
     except Exception:
-        try: conn.close()
-        except: pass
         return False
 
 
+def family_income_total(username: str) -> float:
+    """Summed monthly income of the user's family (trigger-maintained, one lookup)."""
+    with connection(username) as conn:
+        row = conn.execute(
+            "SELECT total FROM family_income_totals WHERE user_id=?", (user_id(username),)
+        ).fetchone()
+    return from_paise(row[0]) if row else 0.0
+
+
 def load_family(username: str) -> List[Dict]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, member_name, relation, monthly_income, age, notes, is_head, family_name
-        FROM family
-        WHERE username=?
-        ORDER BY id ASC
-    """, (username,))
-    rows = cur.fetchall()
-    conn.close()
+    with connection(username) as conn:
+        rows = conn.execute("""
+            SELECT id, member_name, relation, monthly_income, age, notes, is_head, family_name
+            FROM family
+            WHERE user_id=?
+            ORDER BY id ASC
+        """, (user_id(username),)).fetchall()
 
-    return [{k: r[k] for k in r.keys()} for r in rows]
+    result = []
+    for r in rows:
+        row = {k: r[k] for k in r.keys()}
+        row["monthly_income"] = from_paise(r["monthly_income"])
+        result.append(row)
+    return result
 
 
 # ============================================================
 # EXPENSES
 # ============================================================
+@queued_write
 def add_expense(username: str,
                 amount: Any,
                 category: str,
@@ -405,41 +895,206 @@ def add_expense(username: str,
         if date is None:
             date = time.strftime("%Y-%m-%d")
 
-        amount_val = float(amount or 0)
+        amount_val = to_paise(amount or 0)
 
         split_json = json.dumps(split) if split else ""
 
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO expenses (username, date, amount, category, assigned_member, split_json, note)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (username, date, amount_val, category or "", assigned_member or "", split_json, note or ""))
-        conn.commit()
-        conn.close()
+        uid = user_id(username, create=True)
+        with connection(username) as conn:
+            cat_id = intern_categories(conn, uid, [category])[category or ""]
+            cur = conn.execute("""
+                INSERT INTO expenses (user_id, date, day, amount, category_id, assigned_member, split_json, note)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (uid, date, epoch_day(date), amount_val, cat_id,
+                  assigned_member or "", split_json, note or ""))
+            conn.executemany(
+                "INSERT OR IGNORE INTO expense_splits (expense_id, member, share) VALUES (?, ?, ?)",
+                split_rows(cur.lastrowid, split),
+            )
         return True
 
     except Exception:
-        try: conn.close()
-        except: pass
         return False
 
 
+def split_rows(expense_id: int, split: Any) -> List[Tuple[int, str, int]]:
+    """{member: share in rupees} -> expense_splits rows (paise); anything else -> []."""
+    if not isinstance(split, dict):
+        return []
+    out = []
+    for member, share in split.items():
+        try:
+            out.append((int(expense_id), str(member), to_paise(share or 0)))
+        except Exception:
+            continue
+    return out
+
+
+def expense_row_hash(date: str, amount: float, category: str,
+                     assigned_member: str, note: str, occurrence: int = 0) -> str:
+    """
+    Content hash used to make imports idempotent. `occurrence` numbers
+    identical rows within one import so two genuine, identical purchases
+    on the same day are both kept, and re-importing the file keeps neither.
+    """
+    key = f"{date}|{amount:.2f}|{category}|{assigned_member}|{note}|{occurrence}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def add_expenses_bulk(username: str,
+                      rows: Any,
+                      occurrences: Optional[Dict[tuple, int]] = None) -> Dict[str, int]:
+    """
+    Validate and insert many expenses in one transaction.
+
+    `rows` is a DataFrame or a list of dicts with the same keys add_expense
+    takes (date, amount, category, assigned_member, split, note). Rows with
+    an unparseable date or a non-positive amount are rejected; rows already
+    imported (same content hash) are skipped. Pass the same `occurrences`
+    dict across calls when feeding one file in chunks.
+
+    Returns {"inserted": n, "duplicates": n, "invalid": n}.
+    """
+    import pandas as pd
+
+    df = rows.copy() if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows or []))
+    result = {"inserted": 0, "duplicates": 0, "invalid": 0}
+    if df.empty:
+        return result
+
+    for col in ("date", "amount", "category", "assigned_member", "note", "split"):
+        if col not in df.columns:
+            df[col] = None
+
+    # vectorised validation / coercion
+    dates = pd.to_datetime(df["date"], errors="coerce")
+    amounts = pd.to_numeric(df["amount"], errors="coerce")
+    valid = dates.notna() & amounts.notna() & (amounts > 0) & (amounts < float("inf"))
+
+    # to_paise() per distinct value, not float rounding: the same rupee
+    # string must store (and hash) the same paise as the single-add form
+    paise_of = {v: to_paise(v) for v in pd.unique(df.loc[valid, "amount"])}
+    paise = df["amount"].where(valid).map(paise_of)
+    valid &= paise > 0
+    result["invalid"] = int((~valid).sum())
+
+    df = df[valid]
+    if df.empty:
+        return result
+    dates = dates[valid].dt.normalize()
+    paise = paise[valid].astype("int64")
+    amounts = paise / 100
+
+    date_str = dates.dt.strftime("%Y-%m-%d")
+    days = ((dates - pd.Timestamp("1970-01-01")) // pd.Timedelta(days=1)).astype("int64")
+    category = df["category"].fillna("").astype(str).str.strip()
+    member = df["assigned_member"].fillna("").astype(str).str.strip()
+    note = df["note"].fillna("").astype(str).str.strip()
+    split_json = df["split"].map(lambda v: json.dumps(v) if isinstance(v, dict) and v else "")
+
+    seen = occurrences if occurrences is not None else {}
+    hashes = []
+    for d, a, c, m, n in zip(date_str, amounts, category, member, note):
+        base = (d, a, c, m, n)
+        k = seen.get(base, 0)
+        seen[base] = k + 1
+        hashes.append(expense_row_hash(d, a, c, m, n, k))
+
+    uid = user_id(username, create=True)
+    with connection(username) as conn:
+        cat_ids = intern_categories(conn, uid, category.unique())
+        params = list(zip(
+            [uid] * len(df), date_str, days.tolist(), paise.tolist(),
+            category.map(cat_ids), member, split_json, note, hashes,
+        ))
+
+        cur = conn.executemany("""
+            INSERT OR IGNORE INTO expenses
+                (user_id, date, day, amount, category_id, assigned_member, split_json, note, row_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, params)
+        # rowcount excludes rows written by triggers; ignored rows add 0
+        inserted = max(cur.rowcount, 0)
+
+        # splits: resolve ids of the split rows by content hash
+        with_split = {h: v for h, v in zip(hashes, df["split"]) if isinstance(v, dict) and v}
+        pending = list(with_split)
+        for i in range(0, len(pending), 500):
+            chunk = pending[i:i + 500]
+            ids = conn.execute(f"""
+                SELECT id, row_hash FROM expenses
+                WHERE user_id=? AND row_hash IN ({",".join("?" * len(chunk))})
+            """, [uid] + chunk).fetchall()
+            conn.executemany(
+                "INSERT OR IGNORE INTO expense_splits (expense_id, member, share) VALUES (?, ?, ?)",
+                [s for r in ids for s in split_rows(r[0], with_split[r[1]])],
+            )
+
+    result["inserted"] = int(inserted)
+    result["duplicates"] = len(params) - int(inserted)
+    return result
+
+
+def expense_source(columns: List[str],
+                   username: str,
+                   start: Any = None,
+                   end: Any = None,
+                   category_ids: Optional[List[int]] = None,
+                   order_by: Optional[str] = None,
+                   limit: Optional[int] = None) -> Tuple[str, List[Any]]:
+    """
+    SELECT over hot + archived expenses for one user, as (sql, params).
+
+    Both halves carry the same `columns` and the same [start, end) day
+    predicate, so an archived year outside the range costs one index
+    seek and nothing else. Use it as a subquery or a whole statement.
+
+    `category_ids` narrows both halves to those categories. With `limit`,
+    each half is cut to `limit` rows in `order_by` order before the two
+    are merged, so a "latest 3" read walks an index for a few rows
+    instead of the whole history.
+    """
+    cols = ", ".join(columns)
+    where, params = "user_id=?", [user_id(username)]
+    if start is not None:
+        where += " AND day >= ?"
+        params.append(epoch_day(start))
+    if end is not None:
+        where += " AND day < ?"
+        params.append(epoch_day(end))
+    if category_ids is not None:
+        where += f" AND category_id IN ({','.join('?' * len(category_ids))})"
+        params.extend(category_ids)
+    if limit is None:
+        sql = (f"SELECT {cols} FROM expenses WHERE {where} "
+               f"UNION ALL SELECT {cols} FROM expenses_archive WHERE {where}")
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        return sql, params * 2
+
+    tail = (f" ORDER BY {order_by}" if order_by else "") + f" LIMIT {int(limit)}"
+    sql = (f"SELECT * FROM (SELECT {cols} FROM expenses WHERE {where}{tail}) "
+           f"UNION ALL SELECT * FROM (SELECT {cols} FROM expenses_archive WHERE {where}{tail})"
+           f"{tail}")
+    return sql, params * 2
+
+
 def load_expenses(username: str) -> List[Dict]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, date, amount, category, assigned_member, split_json, note
-        FROM expenses
-        WHERE username=?
-        ORDER BY date DESC, id DESC
-    """, (username,))
-    rows = cur.fetchall()
-    conn.close()
+    source, params = expense_source(
+        ["id", "date", "day", "amount", "category_id", "assigned_member", "split_json", "note"], username
+    )
+    with connection(username) as conn:
+        rows = conn.execute(f"""
+            SELECT e.id, e.date, e.amount, c.name AS category, e.assigned_member, e.split_json, e.note
+            FROM ({source}) e
+            LEFT JOIN categories c ON c.id = e.category_id
+            ORDER BY e.day DESC, e.id DESC
+        """, params).fetchall()
 
     result = []
     for r in rows:
         row = {k: r[k] for k in r.keys()}
+        row["amount"] = from_paise(r["amount"])
         try:
             row["split"] = json.loads(r["split_json"]) if r["split_json"] else None
         except:
@@ -448,66 +1103,824 @@ def load_expenses(username: str) -> List[Dict]:
     return result
 
 
+EXPENSE_COLUMNS = ("id", "date", "amount", "category", "assigned_member", "split_json", "note")
+# extra column query_expenses() can add: exact int64 paise, for sums
+AMOUNT_PAISE = "amount_paise"
+_CATEGORICAL_COLUMNS = ("category", "assigned_member")
+# selected as numbers (category arrives as its interned id)
+_NUMERIC_COLUMNS = ("day", "id", "amount", "category")
+QUERY_CHUNK_ROWS = 10_000
+
+
+# query_expenses(order=...) -> (SQL ORDER BY used when a limit is pushed down)
+EXPENSE_ORDERS = {
+    "newest": "day DESC, id DESC",
+    "oldest": "day, id",
+    "largest": "amount DESC, id DESC",
+}
+
+
+def query_expenses(username: str,
+                   start: Any = None,
+                   end: Any = None,
+                   columns: Optional[List[str]] = None,
+                   categories: Optional[List[str]] = None,
+                   order: Optional[str] = "newest",
+                   limit: Optional[int] = None,
+                   decode_splits: bool = False):
+    """
+    Typed, columnar read of a user's expenses (hot + archived) as a
+    DataFrame, answered by the narrowest SQL the request allows.
+
+    Only `columns` are selected (plus whatever the ordering needs);
+    [start, end), `categories` (names) and `limit` are pushed into the
+    WHERE / LIMIT of both the hot and the archive half. `order` is one
+    of EXPENSE_ORDERS, or None when the caller aggregates and does not
+    care (no sort at all).
+
+    The cursor is drained QUERY_CHUNK_ROWS at a time into one typed NumPy
+    array per column (numbers as float64, text as object), so the whole
+    result never exists as Python tuples. Each column is then typed once:
+    date -> datetime64 (from the integer day column, no string parsing),
+    amount -> float64 rupees,
+    amount_paise -> int64 paise (exact; sum this one), id -> int64,
+    category / assigned_member -> categorical, the rest -> object.
+    `decode_splits` adds a parsed `split` column (split_json is otherwise
+    left as text and never JSON-decoded). Categories arrive as interned
+    ids and are named once per distinct id.
+
+    Without a limit, ordering is done in NumPy rather than SQL, so a
+    date/amount/category load is answered from the covering
+    (user_id, day, category_id, amount) index without touching the
+    table. Ties are broken by id only when id is selected.
+    """
+    import numpy as np
+    import pandas as pd
+
+    cols = list(columns or EXPENSE_COLUMNS)
+    unknown = [c for c in cols if c not in EXPENSE_COLUMNS + (AMOUNT_PAISE,)]
+    if unknown:
+        raise ValueError(f"unknown expense columns: {unknown}")
+    if order is not None and order not in EXPENSE_ORDERS:
+        raise ValueError(f"unknown expense order: {order}")
+
+    select = ["day"] + [c for c in cols if c not in ("date", AMOUNT_PAISE)]
+    if (AMOUNT_PAISE in cols or order == "largest") and "amount" not in select:
+        select.append("amount")
+    if decode_splits and "split_json" not in select:
+        select.append("split_json")
+    if limit is not None and order is not None and "id" not in select:
+        select.append("id")
+
+    names: Dict[int, str] = {}
+    with connection(username) as conn:
+        uid = user_id(username)
+        if "category" in select or categories is not None:
+            names = category_names(conn, uid)
+        category_ids = None
+        if categories is not None:
+            wanted = set(categories)
+            category_ids = [i for i, n in names.items() if n in wanted]
+
+        sql, params = expense_source(
+            ["category_id" if c == "category" else c for c in select], username, start, end,
+            category_ids=category_ids,
+            order_by=EXPENSE_ORDERS[order] if order and limit is not None else None,
+            limit=limit,
+        )
+        cur = conn.cursor()
+        cur.row_factory = None  # plain tuples: no per-row Row objects
+        cur.execute(sql, params)
+        dtypes = ["float64" if c in _NUMERIC_COLUMNS else object for c in select]
+        numeric = object not in dtypes
+        chunks: List[List[Any]] = [[] for _ in select]
+        while True:
+            rows = cur.fetchmany(QUERY_CHUNK_ROWS)
+            if not rows:
+                break
+            # NULL -> nan; an all-number select converts as one 2-D block
+            if numeric:
+                values = np.array(rows, dtype="float64").T
+            else:
+                values = [np.array(v, dtype=d) for d, v in zip(dtypes, zip(*rows))]
+            for parts, column in zip(chunks, values):
+                parts.append(column)
+        del rows
+
+    table = {
+        c: np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+        for c, dtype, parts in zip(select, dtypes, chunks)
+    }
+    del chunks
+
+    # day DESC (then id DESC) for "newest"; undated rows last like SQLite
+    if order is not None:
+        keys = [np.nan_to_num(table["day"], nan=-np.inf)]
+        if "id" in select:
+            keys.insert(0, table["id"])
+        if order == "largest":
+            keys.append(np.nan_to_num(table["amount"], nan=-np.inf))
+        order_idx = np.lexsort(keys)
+        if order != "oldest":
+            order_idx = order_idx[::-1]
+        table = {c: a[order_idx] for c, a in table.items()}
+
+    paise = None
+    if "amount" in select:
+        paise = np.nan_to_num(table["amount"]).astype("int64")
+
+    data = {}
+    for c in cols:
+        if c == "date":
+            data[c] = pd.to_datetime(table["day"], unit="D")
+        elif c == "id":
+            data[c] = table[c].astype("int64")
+        elif c == AMOUNT_PAISE:
+            data[c] = paise
+        elif c == "amount":
+            data[c] = paise / 100
+        elif c == "category":
+            codes, uniques = pd.factorize(table[c].astype("int64"))
+            data[c] = pd.Categorical.from_codes(
+                codes, categories=[names.get(int(i), "") for i in uniques]
+            )
+        elif c in _CATEGORICAL_COLUMNS:
+            codes, uniques = pd.factorize(table[c])
+            data[c] = pd.Categorical.from_codes(codes, categories=uniques)
+        else:
+            data[c] = table[c]
+    df = pd.DataFrame(data, columns=cols)
+
+    if decode_splits:
+        def _decode(v):
+            try:
+                return json.loads(v) if v else None
+            except Exception:
+                return None
+        df["split"] = [_decode(v) for v in table["split_json"]]
+
+    return df
+
+
+def load_expenses_columnar(username: str,
+                           columns: Optional[List[str]] = None,
+                           decode_splits: bool = False,
+                           start: Any = None,
+                           end: Any = None):
+    """Full history, newest first: query_expenses() without filters or limit."""
+    return query_expenses(username, start=start, end=end, columns=columns,
+                          decode_splits=decode_splits)
+
+
+def load_expenses_page(username: str,
+                       before: Optional[Tuple[Any, int]] = None,
+                       limit: int = 50) -> Tuple[List[Dict], Optional[Tuple[str, int]]]:
+    """
+    One page of expenses, newest first, by keyset on (date DESC, id DESC).
+
+    `before` is the (date, id) cursor of the last row already shown, or
+    None for the first page. Returns (rows, next_cursor); next_cursor is
+    None on the last page. Cost is O(limit) however deep the page is.
+    """
+    limit = max(int(limit or 50), 1)
+    # each table gives at most limit + 1 rows off its (user_id, day, id)
+    # key; the merge below only ever sorts those
+    half = """
+        SELECT * FROM (
+            SELECT id, date, day, amount, category_id, assigned_member, split_json, note
+            FROM {table}
+            WHERE user_id=?{keyset}
+            ORDER BY day DESC, id DESC LIMIT ?
+        )
+    """
+    params: List[Any] = [user_id(username)]
+    keyset = ""
+    if before is not None:
+        keyset = " AND (day, id) < (?, ?)"
+        params += [epoch_day(before[0]), int(before[1])]
+    params.append(limit + 1)
+    sql = f"""
+        SELECT e.id, e.date, e.day, e.amount, c.name AS category, e.assigned_member, e.split_json, e.note
+        FROM ({half.format(table="expenses", keyset=keyset)} UNION ALL
+              {half.format(table="expenses_archive", keyset=keyset)}) e
+        LEFT JOIN categories c ON c.id = e.category_id
+        ORDER BY e.day DESC, e.id DESC LIMIT ?
+    """
+
+    with connection(username) as conn:
+        rows = conn.execute(sql, params * 2 + [limit + 1]).fetchall()
+
+    result = []
+    for r in rows[:limit]:
+        row = {k: r[k] for k in r.keys() if k != "day"}
+        row["amount"] = from_paise(r["amount"])
+        try:
+            row["split"] = json.loads(r["split_json"]) if r["split_json"] else None
+        except:
+            row["split"] = None
+        result.append(row)
+
+    next_cursor = None
+    if len(rows) > limit and result:
+        next_cursor = (result[-1]["date"], result[-1]["id"])
+    return result, next_cursor
+
+
+def member_breakdown(username: str, start: Any, end: Any) -> Dict[str, Dict[str, float]]:
+    """
+    Per-member totals for expenses dated in [start, end).
+
+    `paid` sums expenses a member is assigned to; `owed` sums their
+    shares from expense_splits. One grouped query, no JSON decoding.
+    Returns {member: {"paid": x, "owed": y}}.
+    """
+    source, params = expense_source(["id", "assigned_member", "amount"], username, start, end)
+    with connection(username) as conn:
+        rows = conn.execute(f"""
+            WITH e AS ({source})
+            SELECT member, SUM(paid) AS paid, SUM(owed) AS owed
+            FROM (
+                SELECT assigned_member AS member, amount AS paid, 0 AS owed
+                FROM e
+                WHERE assigned_member != ''
+                UNION ALL
+                SELECT s.member, 0, s.share
+                FROM e
+                JOIN expense_splits s ON s.expense_id = e.id
+            )
+            GROUP BY member
+            ORDER BY member
+        """, params).fetchall()
+
+    return {
+        r["member"]: {"paid": from_paise(r["paid"]), "owed": from_paise(r["owed"])}
+        for r in rows
+    }
+
+
+# ============================================================
+# SEARCH
+# ============================================================
+# words shorter than this match whole words only: a one- or two-letter
+# prefix expands to most of a user's postings
+FTS_MIN_PREFIX = 3
+# text search considers at most this many (most recently added) hits
+FTS_MAX_HITS = 10_000
+
+
+def fts_query(text: str, uid: Optional[int]) -> Optional[str]:
+    """
+    FTS5 MATCH string for free text: every word must prefix-match the
+    note or category (whole-word match below FTS_MIN_PREFIX characters),
+    within the postings of user id `uid`. None if no words.
+    """
+    import re
+
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    terms = " AND ".join(f'"{w}"*' if len(w) >= FTS_MIN_PREFIX else f'"{w}"' for w in words)
+    return f'user_id : "{uid}" AND {{note category}} : ({terms})'
+
+
+def search_expenses(username: str,
+                    text: Optional[str] = None,
+                    start: Any = None,
+                    end: Any = None,
+                    min_amount: Optional[float] = None,
+                    max_amount: Optional[float] = None,
+                    categories: Optional[List[str]] = None,
+                    members: Optional[List[str]] = None,
+                    before: Optional[Tuple[Any, int]] = None,
+                    limit: int = 50) -> Dict[str, Any]:
+    """
+    Faceted search over a user's hot + archived expenses.
+
+    `text` goes through the expenses_fts index, capped at the
+    FTS_MAX_HITS most recently added hits (then "capped" is True and
+    total / amount / facets cover only those); dates are [start, end);
+    amounts are inclusive. Rows come newest first, keyset-paged like
+    load_expenses_page(). Facet counts follow the usual rule: the
+    category facet ignores the category filter and the member facet
+    ignores the member filter, so other choices stay visible.
+
+    One statement returns the page of rows plus a (category, member)
+    count grid, streamed off the (user_id, category_id, assigned_member,
+    day, amount) index; totals and both facets are folded from the grid.
+    {"rows": [...], "next_cursor": (date, id) | None, "total": n,
+     "amount": x, "capped": bool,
+     "facets": {"category": {name: n}, "member": {name: n}}}
+    """
+    limit = max(int(limit or 50), 1)
+
+    uid = user_id(username)
+    match = fts_query(text, uid) if text else None
+    # with text, the capped hit list drives the query (rowid lookups);
+    # "+" keeps SQLite from walking all of the user's rows instead
+    where, params = ["+user_id=?" if match else "user_id=?"], [uid]
+    if start is not None:
+        where.append("day >= ?")
+        params.append(epoch_day(start))
+    if end is not None:
+        where.append("day < ?")
+        params.append(epoch_day(end))
+    if min_amount is not None:
+        where.append("amount >= ?")
+        params.append(to_paise(min_amount))
+    if max_amount is not None:
+        where.append("amount <= ?")
+        params.append(to_paise(max_amount))
+    hits, hit_params = "", []
+    if match:
+        # cost is per hit (each is looked up by id), so the list is capped,
+        # and materialised once for the four places that use it
+        hits = """WITH hits(id) AS MATERIALIZED (
+            SELECT rowid FROM expenses_fts WHERE expenses_fts MATCH ?
+            ORDER BY rowid DESC LIMIT ?)"""
+        hit_params = [match, FTS_MAX_HITS]
+        where.append("id IN hits")
+    base = " AND ".join(where)
+
+    filters, filter_params = [], []
+    if categories:
+        filters.append(f"""category_id IN (
+            SELECT id FROM categories WHERE user_id=? AND name IN ({','.join('?' * len(categories))}))""")
+        filter_params += [uid] + list(categories)
+    if members:
+        filters.append(f"assigned_member IN ({','.join('?' * len(members))})")
+        filter_params += list(members)
+    if before is not None:
+        filters.append("(day, id) < (?, ?)")
+        filter_params += [epoch_day(before[0]), int(before[1])]
+    narrowed = " AND ".join([base] + filters)
+
+    # each table gives at most limit + 1 rows in key order, as in
+    # load_expenses_page(); only those are merged and sorted
+    page = """
+        SELECT * FROM (
+            SELECT id, date, day, amount, category_id, assigned_member, note
+            FROM {table} WHERE {where}
+            ORDER BY day DESC, id DESC LIMIT ?
+        )"""
+    sql = f"""{hits}
+        SELECT * FROM (
+            SELECT 'row' AS kind, id, date, amount, category_id, assigned_member, note
+            FROM ({page.format(table="expenses", where=narrowed)}
+                  UNION ALL {page.format(table="expenses_archive", where=narrowed)})
+            ORDER BY day DESC, id DESC
+            LIMIT ?
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT 'grid', COUNT(*), NULL, SUM(amount), category_id, assigned_member, NULL
+            FROM expenses WHERE {base}
+            GROUP BY category_id, assigned_member
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT 'grid', COUNT(*), NULL, SUM(amount), category_id, assigned_member, NULL
+            FROM expenses_archive WHERE {base}
+            GROUP BY category_id, assigned_member
+        )
+    """
+    args = hit_params + (params + filter_params + [limit + 1]) * 2 + [limit + 1] + params * 2
+
+    rows: List[Dict] = []
+    grid: Dict[Tuple[str, str], List[int]] = {}
+    with connection(username) as conn:
+        capped = bool(match) and conn.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT rowid FROM expenses_fts WHERE expenses_fts MATCH ? LIMIT ?)
+        """, (match, FTS_MAX_HITS + 1)).fetchone()[0] > FTS_MAX_HITS
+        names = category_names(conn, uid)
+        for r in conn.execute(sql, args):
+            category = names.get(r["category_id"], "")
+            if r["kind"] == "row":
+                row = {
+                    "id": r["id"], "date": r["date"], "amount": from_paise(r["amount"]),
+                    "category": category, "assigned_member": r["assigned_member"], "note": r["note"],
+                }
+                rows.append(row)
+                continue
+            cell = grid.setdefault((category, r["assigned_member"] or ""), [0, 0])
+            cell[0] += int(r["id"] or 0)
+            cell[1] += int(r["amount"] or 0)
+
+    cat_ok = set(categories or ())
+    mem_ok = set(members or ())
+    total, amount = 0, 0
+    by_cat: Dict[str, int] = {}
+    by_mem: Dict[str, int] = {}
+    for (cat, mem), (n, amt) in grid.items():
+        in_cat = not cat_ok or cat in cat_ok
+        in_mem = not mem_ok or mem in mem_ok
+        if in_mem:
+            by_cat[cat] = by_cat.get(cat, 0) + n
+        if in_cat:
+            by_mem[mem] = by_mem.get(mem, 0) + n
+        if in_cat and in_mem:
+            total += n
+            amount += amt
+
+    def ranked(counts):
+        return dict(sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1]["date"], rows[-1]["id"])
+
+    return {
+        "rows": rows,
+        "next_cursor": next_cursor,
+        "total": total,
+        "amount": from_paise(amount),
+        "capped": capped,
+        "facets": {"category": ranked(by_cat), "member": ranked(by_mem)},
+    }
+
+
+# ============================================================
+# ARCHIVE (closed years)
+# ============================================================
+def archive_closed_years(username: Optional[str] = None,
+                         before_year: Optional[int] = None) -> int:
+    """
+    Move expenses dated before Jan 1 of `before_year` (default: this
+    year) from the hot table into expenses_archive, for one user or
+    everyone. Rollup totals and splits are untouched. Returns rows moved.
+    """
+    cutoff = year_bounds(before_year or _date.today().year)[0]
+    cols = "user_id, day, id, date, amount, category_id, assigned_member, split_json, note, row_hash"
+
+    def move(conn, uid=None):
+        where, params = "day < ?", [cutoff]
+        if uid is not None:
+            where = "user_id = ? AND " + where
+            params.insert(0, uid)
+        conn.execute(f"""
+            INSERT OR IGNORE INTO expenses_archive ({cols})
+            SELECT {cols} FROM expenses WHERE {where}
+        """, params)
+        return conn.execute(f"DELETE FROM expenses WHERE {where}", params).rowcount
+
+    if username:
+        with connection(username) as conn:
+            return move(conn, user_id(username))
+    return sum(fan_out(move))
+
+
+def archived_years(username: str) -> Dict[int, int]:
+    """{year: archived row count} for one user."""
+    with connection(username) as conn:
+        rows = conn.execute("""
+            SELECT CAST(strftime('%Y', day * 86400, 'unixepoch') AS INTEGER) AS year, COUNT(*)
+            FROM expenses_archive
+            WHERE user_id=?
+            GROUP BY year
+            ORDER BY year
+        """, (user_id(username),)).fetchall()
+    return {int(r[0]): int(r[1]) for r in rows}
+
+
+# ============================================================
+# CHANGE LOG (trigger-maintained; see migrations._m012_change_log)
+# ============================================================
+# Every insert / update / delete on expenses, family, budgets, goals
+# and category_limits appends a row to change_log. seq only grows, so a
+# reader keeps the last seq it saw and asks for what came after it.
+# With sharding on each database file has its own sequence: follow one
+# user with `username`, or walk a single file with `path`.
+class Change(NamedTuple):
+    seq: int
+    user_id: int
+    table: str
+    row_id: int
+    op: str                                          # 'I' / 'U' / 'D'
+    ts: int                                          # unix seconds
+
+
+def changes_since(seq: int = 0,
+                  username: Optional[str] = None,
+                  *,
+                  path: Path | str | None = None,
+                  batch_size: int = 1000) -> Iterator[Change]:
+    """
+    Yield change_log entries after `seq`, oldest first, for one user or
+    (username=None) everyone in the database file. Rows are read in
+    keyset batches so a long backlog never sits in memory at once.
+    """
+    if username is not None:
+        uid = user_id(username)
+        if uid is None:
+            return
+        where, params, path = "user_id = ? AND seq > ?", [uid], shard_path(username)
+    else:
+        where, params = "seq > ?", []
+
+    while True:
+        with connection(path=path) as conn:
+            rows = conn.execute(f"""
+                SELECT seq, user_id, table_name, row_id, op, ts
+                FROM change_log
+                WHERE {where}
+                ORDER BY seq LIMIT ?
+            """, params + [seq, batch_size]).fetchall()
+        for r in rows:
+            yield Change(*r)
+        if len(rows) < batch_size:
+            return
+        seq = rows[-1][0]
+
+
+def last_change(username: str) -> int:
+    """
+    seq of the newest change touching `username` (0 if none). One index
+    probe, so "has anything changed since I last looked?" is cheap.
+    """
+    uid = user_id(username)
+    if uid is None:
+        return 0
+    with connection(username) as conn:
+        row = conn.execute("SELECT MAX(seq) FROM change_log WHERE user_id=?", (uid,)).fetchone()
+    return int(row[0] or 0)
+
+
+def expense_changes(username: str, since: int = 0) -> Tuple[List[Dict], int]:
+    """
+    Expenses inserted, updated or deleted after change_log seq `since`,
+    as (rows, watermark). Each expense appears once with its latest op
+    ('I' / 'U' / 'D', oldest change first) and its current values; 'D'
+    rows carry only the id. Pass the watermark back as `since` next time.
+
+    A row rewritten after the watermark was taken is exported with its
+    newer values now and again next time, so consumers should upsert.
+    """
+    uid = user_id(username)
+    if uid is None:
+        return [], since
+
+    with connection(username) as conn:
+        # never behind `since`: a shard move or restore starts a file whose
+        # change_log seq is lower than watermarks handed out before
+        watermark = max(since, conn.execute(
+            "SELECT MAX(seq) FROM change_log WHERE user_id=?", (uid,)
+        ).fetchone()[0] or 0)
+        latest: Dict[int, str] = {}
+        for row_id, op in conn.execute("""
+            SELECT row_id, op FROM change_log
+            WHERE user_id = ? AND seq > ? AND seq <= ? AND table_name = 'expenses'
+            ORDER BY seq
+        """, (uid, since, watermark)):
+            latest.pop(row_id, None)  # re-insert so dict order follows the last change
+            latest[row_id] = op
+
+        cols = "id, date, amount, category_id, assigned_member, split_json, note"
+        current: Dict[int, tuple] = {}
+        ids = [i for i, op in latest.items() if op != "D"]
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for r in conn.execute(f"""
+                SELECT {cols} FROM expenses WHERE user_id = ? AND id IN ({marks})
+                UNION ALL
+                SELECT {cols} FROM expenses_archive WHERE user_id = ? AND id IN ({marks})
+            """, [uid, *chunk, uid, *chunk]):
+                current[r[0]] = r
+        names = category_names(conn, uid) if current else {}
+
+    rows = []
+    for row_id, op in latest.items():
+        r = current.get(row_id)
+        if r is None:
+            # gone since (deleted, or purged from the archive)
+            rows.append({"op": "D", "id": row_id})
+            continue
+        rows.append({
+            "op": op,
+            "id": r[0],
+            "date": r[1],
+            "amount": from_paise(r[2]),
+            "category": names.get(r[3], ""),
+            "assigned_member": r[4],
+            "split_json": r[5],
+            "note": r[6],
+        })
+    return rows, int(watermark)
+
+
+# ============================================================
+# CACHE COHERENCE (safe caching across worker processes)
+# ============================================================
+# A user's generation is the seq of their newest change_log row, so it
+# moves on every write to the tables in CHANGE_LOG_TABLES, whichever
+# process made it. Checking it is one index probe, and most of the time
+# not even that: PRAGMA data_version on this thread's connection only
+# changes when some *other* connection commits to the file, and
+# total_changes covers this connection's own writes. While both stand
+# still, generations looked up earlier on this thread (in the app: this
+# script run) are still current.
+def data_version(path: Path | str | None = None) -> int:
+    """PRAGMA data_version of this thread's connection to `path` (default app.db)."""
+    return int(_thread_conn(path).execute("PRAGMA data_version").fetchone()[0])
+
+
+def user_generation(username: str) -> int:
+    """Cheap "has `username`'s data changed?" token (see CACHE COHERENCE)."""
+    path = str(shard_path(username))
+    conn = _thread_conn(path)
+    mark = (conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes)
+    state = _thread_state()
+    memo = state.generations.get(path)
+    if memo is None or memo[0] != mark:
+        memo = state.generations[path] = (mark, {})
+    gens = memo[1]
+    if username not in gens:
+        gens[username] = last_change(username)
+    return gens[username]
+
+
+class UserCache:
+    """
+    Process-wide LRU of per-user results that stays correct when other
+    processes write: each entry remembers the user's generation when it
+    was loaded and is reloaded once that moves. Treat cached values as
+    read-only; they are shared between sessions.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str, key: Any, loader: Callable[[], Any]) -> Any:
+        # read the generation first: a write racing the loader only makes
+        # the entry look older than it is, never newer
+        gen = user_generation(username)
+        k = (str(shard_path(username)), username, key)
+        with self._lock:
+            hit = self._data.get(k)
+            if hit is not None and hit[0] == gen:
+                self._data.move_to_end(k)
+                return hit[1]
+        value = loader()
+        with self._lock:
+            self._data[k] = (gen, value)
+            self._data.move_to_end(k)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+user_cache = UserCache()
+
+
+# ============================================================
+# CATEGORIES (interned per user; expenses store category_id)
+# ============================================================
+DEFAULT_CATEGORIES = [
+    "Rent", "Groceries", "Food", "Transport", "Utilities",
+    "Entertainment", "Healthcare", "Education", "Shopping", "Other",
+]
+
+
+def intern_categories(conn: sqlite3.Connection, uid: int, names: Any) -> Dict[str, int]:
+    """{name: categories.id} for `names`, adding the ones the user has not used yet."""
+    names = sorted({n or "" for n in names})
+    conn.executemany(
+        "INSERT OR IGNORE INTO categories (user_id, name) VALUES (?, ?)", [(uid, n) for n in names]
+    )
+    ids: Dict[str, int] = {}
+    for i in range(0, len(names), 500):
+        chunk = names[i:i + 500]
+        ids.update(conn.execute(
+            f"SELECT name, id FROM categories WHERE user_id=? AND name IN ({','.join('?' * len(chunk))})",
+            [uid] + chunk,
+        ).fetchall())
+    return ids
+
+
+def category_names(conn: sqlite3.Connection, uid: Optional[int]) -> Dict[int, str]:
+    """{categories.id: name} for one user."""
+    return dict(conn.execute("SELECT id, name FROM categories WHERE user_id=?", (uid,)).fetchall())
+
+
+def list_categories(username: str) -> List[str]:
+    """DEFAULT_CATEGORIES followed by the user's own categories, for pickers."""
+    with connection(username) as conn:
+        rows = conn.execute(
+            "SELECT name FROM categories WHERE user_id=? ORDER BY name", (user_id(username),)
+        ).fetchall()
+    return DEFAULT_CATEGORIES + [r[0] for r in rows if r[0] and r[0] not in DEFAULT_CATEGORIES]
+
+
 # ============================================================
 # BUDGETS
 # ============================================================
+@queued_write
 def set_budget(username: str, main_budget: Any, category_limits: Any = None) -> bool:
+    """
+    Replace the main budget and, when `category_limits` {category: rupees}
+    is given, the category limits (zero / blank limits are dropped).
+    """
     try:
-        mb_val = float(main_budget) if main_budget not in (None, "") else None
+        mb_val = to_paise(main_budget)
     except:
         mb_val = None
 
-    cat_json = "{}"
-    if category_limits is not None:
+    limits: Dict[str, int] = {}
+    for cat, value in (category_limits.items() if isinstance(category_limits, dict) else ()):
         try:
-            cat_json = json.dumps(category_limits)
-        except:
-            cat_json = "{}"
+            value = to_paise(value or 0)
+        except Exception:
+            continue
+        if value > 0:
+            limits[str(cat)] = value
 
     try:
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM budgets WHERE username=?", (username,))
-        cur.execute("""
-            INSERT INTO budgets (username, main_budget, category_limits_json)
-            VALUES (?, ?, ?)
-        """, (username, mb_val, cat_json))
-        conn.commit()
-        conn.close()
+        uid = user_id(username, create=True)
+        with connection(username) as conn:
+            conn.execute("DELETE FROM budgets WHERE user_id=?", (uid,))
+            conn.execute("INSERT INTO budgets (user_id, main_budget) VALUES (?, ?)", (uid, mb_val))
+            if category_limits is not None:
+                ids = intern_categories(conn, uid, limits)
+                conn.execute("DELETE FROM category_limits WHERE user_id=?", (uid,))
+                conn.executemany(
+                    "INSERT INTO category_limits (user_id, category_id, limit_amount) VALUES (?, ?, ?)",
+                    [(uid, ids[cat], value) for cat, value in limits.items()],
+                )
         return True
 
     except Exception:
-        try: conn.close()
-        except: pass
         return False
 
 
+def load_category_limits(username: str) -> Dict[str, float]:
+    """{category: limit in rupees} for one user."""
+    with connection(username) as conn:
+        rows = conn.execute("""
+            SELECT c.name, l.limit_amount
+            FROM category_limits l
+            JOIN categories c ON c.id = l.category_id
+            WHERE l.user_id=?
+        """, (user_id(username),)).fetchall()
+    return {r[0]: from_paise(r[1]) for r in rows}
+
+
+def get_category_limit(username: str, category: str) -> float:
+    """One category's limit in rupees (0.0 when none is set)."""
+    uid = user_id(username)
+    with connection(username) as conn:
+        row = conn.execute("""
+            SELECT l.limit_amount
+            FROM categories c
+            JOIN category_limits l ON l.user_id = c.user_id AND l.category_id = c.id
+            WHERE c.user_id=? AND c.name=?
+        """, (uid, category or "")).fetchone()
+    return from_paise(row[0] if row else 0)
+
+
 def load_budget(username: str) -> Dict[str, Any]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT main_budget, category_limits_json
-        FROM budgets
-        WHERE username=?
-        ORDER BY id DESC LIMIT 1
-    """, (username,))
-    row = cur.fetchone()
-    conn.close()
+    """
+    {"main_budget": rupees or None, "explicit_budget": rupees or None,
+     "category_limits": {category: rupees}, "family_income": rupees}.
 
-    if not row:
-        return {"main_budget": None, "category_limits_json": "{}"}
+    explicit_budget is what the user set (None when unset or 0).
+    main_budget is that, else the family income from family_income_totals,
+    else None. The fallback is derived on read and never written back, so
+    roster edits cannot overwrite a budget the user chose.
+    """
+    with connection(username) as conn:
+        row = conn.execute("""
+            SELECT main_budget
+            FROM budgets
+            WHERE user_id=?
+            ORDER BY id DESC LIMIT 1
+        """, (user_id(username),)).fetchone()
+        limits = load_category_limits(username)
+        income = family_income_total(username)
 
     try:
-        main_val = float(row["main_budget"]) if row["main_budget"] not in (None,"") else None
+        explicit = from_paise(row["main_budget"]) if row and row["main_budget"] else None
     except:
-        main_val = None
+        explicit = None
 
-    return {"main_budget": main_val, "category_limits_json": row["category_limits_json"] or "{}"}
+    return {
+        "main_budget": explicit or income or None,
+        "explicit_budget": explicit,
+        "category_limits": limits,
+        "family_income": income,
+    }
 
 
 # ============================================================
 # GOALS
 # ============================================================
+@queued_write
 def add_goal(username: str, goal_name: str, target_amount: float, months: int,
              created_on: Optional[str] = None) -> bool:
 
@@ -515,55 +1928,237 @@ def add_goal(username: str, goal_name: str, target_amount: float, months: int,
         if created_on is None:
             created_on = time.strftime("%Y-%m-%d")
 
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO goals (username, goal_name, target_amount, months_to_complete, created_on)
-            VALUES (?, ?, ?, ?, ?)
-        """, (username, goal_name, float(target_amount or 0), int(months or 1), created_on))
-        conn.commit()
-        conn.close()
+        with connection(username) as conn:
+            conn.execute("""
+                INSERT INTO goals (user_id, goal_name, target_amount, months_to_complete, created_on)
+                VALUES (?, ?, ?, ?, ?)
+            """, (user_id(username, create=True), goal_name, to_paise(target_amount or 0), int(months or 1), created_on))
         return True
 
     except Exception:
-        try: conn.close()
-        except: pass
         return False
 
 
 def load_goals(username: str) -> List[Dict]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, goal_name, target_amount, months_to_complete, created_on
-        FROM goals
-        WHERE username=?
-        ORDER BY id DESC
-    """, (username,))
-    rows = cur.fetchall()
-    conn.close()
+    with connection(username) as conn:
+        rows = conn.execute("""
+            SELECT id, goal_name, target_amount, months_to_complete, created_on
+            FROM goals
+            WHERE user_id=?
+            ORDER BY id DESC
+        """, (user_id(username),)).fetchall()
 
-    return [{k: r[k] for k in r.keys()} for r in rows]
+    result = []
+    for r in rows:
+        row = {k: r[k] for k in r.keys()}
+        row["target_amount"] = from_paise(r["target_amount"])
+        result.append(row)
+    return result
 
 
 # ============================================================
 # CATEGORY BREAKDOWN
 # ============================================================
 def category_breakdown(username: str, year: int, month: int) -> Dict[str, float]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT category, SUM(amount) as total
-        FROM expenses
-        WHERE username=?
-          AND substr(date,1,4)=?
-          AND substr(date,6,2)=?
-        GROUP BY category
-    """, (username, str(year), f"{month:02d}"))
-    rows = cur.fetchall()
-    conn.close()
+    with connection(username) as conn:
+        rows = conn.execute("""
+            SELECT c.name AS category, t.total
+            FROM monthly_category_totals t
+            JOIN categories c ON c.id = t.category_id
+            WHERE t.user_id=?
+              AND t.year_month=?
+        """, (user_id(username), year_month_key(year, month))).fetchall()
+
+    paise: Dict[str, int] = {}
+    for r in rows:
+        key = r["category"] or "Other"
+        paise[key] = paise.get(key, 0) + int(r["total"] or 0)
+    return {k: from_paise(v) for k, v in paise.items()}
+
+
+def rebuild_monthly_totals(username: Optional[str] = None) -> None:
+    """Recompute the monthly rollup from raw expenses (one user or everyone)."""
+    if username:
+        with connection(username) as conn:
+            _rebuild_monthly_totals(conn, user_id(username))
+    else:
+        fan_out(lambda conn: _rebuild_monthly_totals(conn, None))
+
+
+def monthly_spend_by_user(year: int, month: int) -> Dict[str, float]:
+    """{username: total spent} for one month across every database file."""
+    ym = year_month_key(year, month)
+
+    def per_db(conn):
+        return conn.execute("""
+            SELECT user_id, SUM(total)
+            FROM monthly_category_totals
+            WHERE year_month = ?
+            GROUP BY user_id
+        """, (ym,)).fetchall()
 
-    return {r["category"] or "Other": float(r["total"] or 0.0) for r in rows}
+    totals: Dict[int, int] = {}
+    for rows in fan_out(per_db):
+        for uid, total in rows:
+            totals[uid] = totals.get(uid, 0) + int(total or 0)
+    names = usernames_by_id(list(totals))
+    return {names[uid]: from_paise(t) for uid, t in totals.items() if uid in names}
+
+
+# ============================================================
+# HOUSEHOLDS (accounts sharing one combined view)
+# ============================================================
+# households / household_members live in app.db next to users. An account
+# belongs to at most one household; others join with its join_code, so
+# two families that happen to share a family_name never see each other.
+# Household totals are grouped in SQL over the members' monthly rollups:
+# one query per database file that holds members (one file unsharded).
+def create_household(username: str, name: Optional[str] = None) -> Optional[int]:
+    """Start a household headed by `username`. None if already in one."""
+    uid = user_id(username, create=True)
+    if uid is None:
+        return None
+    if not name:
+        family = [r.get("family_name") for r in load_family(username) if r.get("family_name")]
+        name = family[0] if family else f"{username}'s household"
+    try:
+        with connection() as conn:
+            cur = conn.execute(
+                "INSERT INTO households (name, join_code, created_by) VALUES (?, ?, ?)",
+                (name, secrets.token_urlsafe(6), uid),
+            )
+            hid = cur.lastrowid
+            conn.execute(
+                "INSERT INTO household_members (household_id, user_id, role) VALUES (?, ?, 'head')",
+                (hid, uid),
+            )
+        return hid
+    except sqlite3.IntegrityError:
+        return None
+
+
+def join_household(username: str, join_code: str) -> Optional[int]:
+    """Join the household with `join_code`. None if the code is unknown or already in one."""
+    uid = user_id(username, create=True)
+    try:
+        with connection() as conn:
+            row = conn.execute(
+                "SELECT id FROM households WHERE join_code=?", ((join_code or "").strip(),)
+            ).fetchone()
+            if not row or uid is None:
+                return None
+            conn.execute(
+                "INSERT INTO household_members (household_id, user_id) VALUES (?, ?)",
+                (row["id"], uid),
+            )
+        return int(row["id"])
+    except sqlite3.IntegrityError:
+        return None
+
+
+def leave_household(username: str) -> bool:
+    """Leave the current household; the last member out removes it."""
+    uid = user_id(username)
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT household_id FROM household_members WHERE user_id=?", (uid,)
+        ).fetchone()
+        if not row:
+            return False
+        hid = row["household_id"]
+        conn.execute("DELETE FROM household_members WHERE user_id=?", (uid,))
+        left = conn.execute(
+            "SELECT 1 FROM household_members WHERE household_id=? LIMIT 1", (hid,)
+        ).fetchone()
+        if not left:
+            conn.execute("DELETE FROM households WHERE id=?", (hid,))
+    return True
+
+
+def get_household(username: str) -> Optional[Dict[str, Any]]:
+    """{"id", "name", "join_code", "members": [{"user_id", "username", "role"}]} or None."""
+    uid = user_id(username)
+    if uid is None:
+        return None
+    with connection() as conn:
+        head = conn.execute("""
+            SELECT h.id, h.name, h.join_code
+            FROM household_members m
+            JOIN households h ON h.id = m.household_id
+            WHERE m.user_id=?
+        """, (uid,)).fetchone()
+        if not head:
+            return None
+        members = conn.execute("""
+            SELECT m.user_id, u.username, m.role
+            FROM household_members m
+            JOIN users u ON u.id = m.user_id
+            WHERE m.household_id=?
+            ORDER BY m.role = 'head' DESC, u.username
+        """, (head["id"],)).fetchall()
+    return {
+        "id": head["id"],
+        "name": head["name"],
+        "join_code": head["join_code"],
+        "members": [{"user_id": r[0], "username": r[1], "role": r[2]} for r in members],
+    }
+
+
+def household_month(household: Dict[str, Any], year: int, month: int) -> Dict[str, Any]:
+    """
+    Combined month for a get_household() result:
+    {"categories": {name: rupees}, "main_budget": rupees,
+     "category_limits": {name: rupees}}.
+
+    Categories are interned per account, so totals and limits are
+    grouped by name. The budget is the sum of each member's main budget,
+    falling back to that member's family income when unset (the same
+    rule as the monthly summaries).
+    """
+    ym = year_month_key(year, month)
+    by_path: Dict[Path, List[int]] = {}
+    for mbr in household["members"]:
+        by_path.setdefault(shard_path(mbr["username"]), []).append(mbr["user_id"])
+
+    cats: Dict[str, int] = {}
+    limits: Dict[str, int] = {}
+    budget = 0
+    for path, ids in by_path.items():
+        marks = ",".join("?" * len(ids))
+        with connection(path=path) as conn:
+            for name, total in conn.execute(f"""
+                SELECT c.name, SUM(t.total)
+                FROM monthly_category_totals t
+                JOIN categories c ON c.id = t.category_id
+                WHERE t.user_id IN ({marks}) AND t.year_month = ?
+                GROUP BY c.name
+            """, ids + [ym]):
+                key = name or "Other"
+                cats[key] = cats.get(key, 0) + int(total or 0)
+
+            for name, total in conn.execute(f"""
+                SELECT c.name, SUM(l.limit_amount)
+                FROM category_limits l
+                JOIN categories c ON c.id = l.category_id
+                WHERE l.user_id IN ({marks})
+                GROUP BY c.name
+            """, ids):
+                limits[name] = limits.get(name, 0) + int(total or 0)
+
+            budget += int(conn.execute(f"""
+                SELECT IFNULL(SUM(CASE WHEN IFNULL(b.main_budget, 0) > 0
+                                       THEN b.main_budget ELSE IFNULL(f.total, 0) END), 0)
+                FROM (SELECT value AS user_id FROM json_each(?)) m
+                LEFT JOIN budgets b
+                       ON b.id = (SELECT MAX(id) FROM budgets WHERE user_id = m.user_id)
+                LEFT JOIN family_income_totals f ON f.user_id = m.user_id
+            """, [json.dumps(ids)]).fetchone()[0])
+
+    return {
+        "categories": {k: from_paise(v) for k, v in sorted(cats.items(), key=lambda kv: -kv[1])},
+        "main_budget": from_paise(budget),
+        "category_limits": {k: from_paise(v) for k, v in limits.items()},
+    }
 
 
 # ============================================================
@@ -581,11 +2176,12 @@ def load_telegram_config():
         return json.load(f)
 
 
-def send_telegram_alert(message: str) -> bool:
+def send_telegram_alert(message: str, chat_id: Optional[str] = None) -> bool:
+    """Send `message` to `chat_id`, or to the configured chat when none is given."""
     try:
         cfg = load_telegram_config()
         token = cfg.get("bot_token","").strip()
-        chat_id = cfg.get("chat_id","").strip()
+        chat_id = str(chat_id or cfg.get("chat_id","")).strip()
 
         if not token or not chat_id:
             return False
@@ -645,14 +2241,14 @@ def send_budget_alert(username: str, category: str, spent: float, limit: float):
 
 def get_user_budget(username: str) -> Optional[float]:
     """
-    Return the user's monthly budget (float) or None.
-    Uses load_budget() which returns {'main_budget': value}.
+    Return the user's monthly budget (float) or None: the main budget,
+    else the family's income.
     """
     try:
         b = load_budget(username)
         if not b:
             return None
-        return b.get("main_budget")
+        return b.get("main_budget") or b.get("family_income") or None
     except Exception:
         return None
 
@@ -662,7 +2258,9 @@ def get_user_contacts(username: str):
     Returns (email, telegram_chat_id)
 
     - email: from users table (get_user_email)
-    - telegram_chat_id: try instance/telegram_users.json, then instance/telegram_config.json
+    - telegram_chat_id: the user's own entry in instance/telegram_users.json.
+      The shared chat in telegram_config.json is deliberately not used as a
+      fallback: it would deliver one user's totals to everyone reading it.
     """
     # 1. email
     try:
@@ -671,25 +2269,22 @@ def get_user_contacts(username: str):
         email = None
 
     # 2. telegram chat id
-    telegram_chat_id = None
+    return (email, _telegram_chat_ids().get(username) or None)
+
+
+def _telegram_chat_ids() -> Dict[str, Any]:
+    """{username: chat_id} from instance/telegram_users.json"""
+    chat_ids: Dict[str, Any] = {}
     try:
         user_map_path = os.path.join(BASE_DIR, "instance", "telegram_users.json")
         if os.path.exists(user_map_path):
             with open(user_map_path, "r") as f:
                 data = json.load(f)
-            telegram_chat_id = data.get(username)
+            if isinstance(data, dict):
+                chat_ids = data
     except Exception:
-        telegram_chat_id = None
-
-    if not telegram_chat_id:
-        try:
-            cfg = load_telegram_config()
-            chat = cfg.get("chat_id", "") if isinstance(cfg, dict) else ""
-            telegram_chat_id = chat if chat and str(chat).strip() else None
-        except Exception:
-            telegram_chat_id = None
-
-    return (email, telegram_chat_id)
+        chat_ids = {}
+    return chat_ids
 
 
 def get_monthly_family_expenses(username: str) -> float:
@@ -699,85 +2294,202 @@ def get_monthly_family_expenses(username: str) -> float:
     """
     from datetime import datetime
     now = datetime.now()
-    year = str(now.year)
-    month = f"{now.month:02d}"
 
     try:
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT IFNULL(SUM(amount), 0) AS total
-            FROM expenses
-            WHERE username = ?
-              AND substr(date, 1, 4) = ?
-              AND substr(date, 6, 2) = ?
-            """,
-            (username, year, month)
-        )
-        row = cur.fetchone()
-        conn.close()
+        with connection(username) as conn:
+            row = conn.execute(
+                """
+                SELECT IFNULL(SUM(total), 0) AS total
+                FROM monthly_category_totals
+                WHERE user_id = ?
+                  AND year_month = ?
+                """,
+                (user_id(username), year_month_key(now.year, now.month))
+            ).fetchone()
         if row:
             # row can be sqlite3.Row, so access by key or index
-            try:
-                return float(row["total"])
-            except Exception:
-                return float(row[0])
+            return from_paise(row[0])
     except Exception:
-        try:
-            conn.close()
-        except Exception:
-            pass
+        pass
     return 0.0
 
 # ============================================================
-# AUTO-SYNC BUDGET FROM FAMILY (FINAL & CLEAN)
+# BATCH SUMMARIES (nightly / monthly jobs)
 # ============================================================
-def sync_budget_from_family(username: str) -> float:
+class UserMonthSummary(NamedTuple):
+    username: str
+    email: Optional[str]
+    telegram_chat_id: Optional[str]
+    year_month: int                                  # yyyymm
+    spent: float
+    count: int
+    budget: float                                    # main budget, else family income
+    categories: Tuple[Tuple[str, float], ...]        # (category, total), largest first
+    over_limit: Tuple[Tuple[str, float, float], ...]  # (category, spent, limit)
+
+    @property
+    def remaining(self) -> float:
+        return self.budget - self.spent
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget > 0 and self.spent > self.budget
+
+
+def get_all_users() -> List[str]:
+    with connection() as conn:
+        rows = conn.execute("SELECT username FROM users ORDER BY username").fetchall()
+    return [r[0] for r in rows]
+
+
+def _month_batch(conn: sqlite3.Connection,
+                 ids: List[int],
+                 ym: int) -> Tuple[Dict[int, list], Dict[int, int], Dict[int, int], Dict[int, list]]:
     """
-    Sums monthly incomes of all family members for a user
-    and writes the total into budgets.main_budget.
+    Rollup rows, latest main budget, family income and category limits
+    (all paise) for user `ids`: four grouped queries.
     """
-    try:
-        conn = get_conn()
-        cur = conn.cursor()
-
-        cur.execute("SELECT monthly_income FROM family WHERE username=?", (username,))
-        rows = cur.fetchall()
-
-        total = 0.0
-        for r in rows:
-            try:
-                total += float(r[0] or 0.0)
-            except:
-                pass
-
-        # ensure budgets table exists
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS budgets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL,
-                main_budget REAL,
-                category_limits_json TEXT
+    marks = ",".join("?" * len(ids))
+
+    cats: Dict[int, list] = {}
+    for r in conn.execute(f"""
+        SELECT t.user_id, c.name, t.total, t.count
+        FROM monthly_category_totals t
+        JOIN categories c ON c.id = t.category_id
+        WHERE t.year_month = ? AND t.user_id IN ({marks})
+        ORDER BY t.user_id, t.total DESC
+    """, [ym] + ids):
+        cats.setdefault(r[0], []).append((r[1] or "Other", int(r[2] or 0), int(r[3] or 0)))
+
+    budgets = {
+        r[0]: r[1]
+        for r in conn.execute(f"""
+            SELECT user_id, main_budget
+            FROM budgets
+            WHERE id IN (SELECT MAX(id) FROM budgets WHERE user_id IN ({marks}) GROUP BY user_id)
+        """, ids)
+    }
+
+    incomes = {
+        r[0]: int(r[1] or 0)
+        for r in conn.execute(f"""
+            SELECT user_id, total
+            FROM family_income_totals
+            WHERE user_id IN ({marks})
+        """, ids)
+    }
+
+    limits: Dict[int, list] = {}
+    for r in conn.execute(f"""
+        SELECT l.user_id, c.name, l.limit_amount
+        FROM category_limits l
+        JOIN categories c ON c.id = l.category_id
+        WHERE l.user_id IN ({marks})
+        ORDER BY l.user_id, l.category_id
+    """, ids):
+        limits.setdefault(r[0], []).append((r[1], int(r[2] or 0)))
+    return cats, budgets, incomes, limits
+
+
+def iter_monthly_summaries(year: int,
+                           month: int,
+                           usernames: Optional[List[str]] = None,
+                           batch_size: int = 500) -> Iterator[UserMonthSummary]:
+    """
+    Yield one UserMonthSummary per user (all users by default) for a month.
+    Names in `usernames` that have no account are skipped, not reported
+    as an empty month.
+
+    Users are streamed from the users table in batches of `batch_size`;
+    each batch costs four grouped queries per database file it touches
+    (rollup, budgets, family income, category limits) instead of a
+    handful per user, so
+    memory and query count stay flat for tens of thousands of users.
+    """
+    ym = year_month_key(year, month)
+    chat_ids = _telegram_chat_ids()
+
+    def user_batches():
+        if usernames is not None:
+            names = list(usernames)
+            for i in range(0, len(names), batch_size):
+                chunk = names[i:i + batch_size]
+                with connection() as conn:
+                    known = {
+                        r[0]: (r[1], r[2]) for r in conn.execute(
+                            f"SELECT username, id, email FROM users "
+                            f"WHERE username IN ({','.join('?' * len(chunk))})", chunk
+                        )
+                    }
+                batch = []
+                for u in chunk:
+                    uid, email = known.get(u, (None, None))
+                    batch.append((uid, u, email))
+                yield batch
+            return
+        after = 0
+        while True:
+            with connection() as conn:
+                batch = conn.execute("""
+                    SELECT id, username, email FROM users
+                    WHERE id > ?
+                    ORDER BY id LIMIT ?
+                """, (after, batch_size)).fetchall()
+            if not batch:
+                return
+            yield [(r[0], r[1], r[2]) for r in batch]
+            after = batch[-1][0]
+
+    for batch in user_batches():
+        by_path: Dict[Path, List[int]] = {}
+        for uid, u, _ in batch:
+            if uid is not None:
+                by_path.setdefault(shard_path(u), []).append(uid)
+
+        cats: Dict[int, list] = {}
+        budgets: Dict[int, int] = {}
+        incomes: Dict[int, int] = {}
+        limits: Dict[int, list] = {}
+        for path, ids in by_path.items():
+            with connection(path=path) as conn:
+                c, b, i, l = _month_batch(conn, ids, ym)
+            cats.update(c)
+            budgets.update(b)
+            incomes.update(i)
+            limits.update(l)
+
+        for uid, u, email in batch:
+            if uid is None:
+                continue
+            rows = cats.get(uid, [])
+            # everything in paise until the record is built
+            budget = int(budgets.get(uid) or 0) or incomes.get(uid, 0)
+
+            by_cat: Dict[str, int] = {}
+            for cat, total, _ in rows:
+                by_cat[cat] = by_cat.get(cat, 0) + total
+            over = [
+                (cat, from_paise(by_cat[cat]), from_paise(limit))
+                for cat, limit in limits.get(uid, ())
+                if limit > 0 and by_cat.get(cat, 0) > limit
+            ]
+
+            yield UserMonthSummary(
+                username=u,
+                email=email,
+                telegram_chat_id=chat_ids.get(u) or None,
+                year_month=ym,
+                spent=from_paise(sum(by_cat.values())),
+                count=sum(r[2] for r in rows),
+                budget=from_paise(budget),
+                categories=tuple(
+                    (cat, from_paise(total))
+                    for cat, total in sorted(by_cat.items(), key=lambda kv: -kv[1])
+                ),
+                over_limit=tuple(over),
             )
-        """)
 
-        # update or insert
-        cur.execute("SELECT id FROM budgets WHERE username=?", (username,))
-        row = cur.fetchone()
 
-        if row:
-            cur.execute("UPDATE budgets SET main_budget=? WHERE username=?", (total, username))
-        else:
-            cur.execute("""
-                INSERT INTO budgets (username, main_budget, category_limits_json)
-                VALUES (?, ?, ?)
-            """, (username, total, "{}"))
-
-        conn.commit()
-        conn.close()
-        return float(total)
-
-    except Exception as e:
-        print("sync_budget_from_family ERROR:", e)
-        return 0.0
+def get_user_monthly_expenses_summary(username: str, year: int, month: int) -> Optional[UserMonthSummary]:
+    """Single-user form of iter_monthly_summaries(); None for an unknown username."""
+    return next(iter_monthly_summaries(year, month, usernames=[username]), None)
@@ -1,36 +1,58 @@
-from .db import get_conn
-import json
-from datetime import datetime
-import pandas as pd
+from .db import connection, year_month_key, query_expenses, from_paise, user_id
 
 
 # -------------------------------------
-# Load all expenses for a user
+# Load a user's expenses, hot + archived (typed columns)
+# Pass `columns` (or use query_expenses()) to load only what a view needs;
+# the full-width default is for exports.
 # -------------------------------------
-def load_expenses(username: str):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT date, amount, category, assigned_member, split_json, note FROM expenses WHERE username = ?", (username,))
-    rows = cur.fetchall()
-    conn.close()
+def load_expenses(username: str, start=None, end=None, columns=None):
+    return query_expenses(
+        username,
+        start=start,
+        end=end,
+        columns=columns or ["date", "amount", "category", "assigned_member", "split_json", "note"],
+    )
 
-    cols = ["date", "amount", "category", "assigned_member", "split_json", "note"]
-    df = pd.DataFrame(rows, columns=cols)
-    return df
+
+# -------------------------------------
+# Total + row count for a yyyymm range (monthly rollup table)
+# -------------------------------------
+def _period_total(username: str, first_ym: int, last_ym: int):
+    with connection(username) as conn:
+        row = conn.execute("""
+            SELECT IFNULL(SUM(total), 0), IFNULL(SUM(count), 0)
+            FROM monthly_category_totals
+            WHERE user_id = ? AND year_month BETWEEN ? AND ?
+        """, (user_id(username), first_ym, last_ym)).fetchone()
+    return from_paise(row[0]), int(row[1] or 0)
+
+
+# -------------------------------------
+# Last `months` months that have spending: [(yyyymm, rupees)], oldest first
+# -------------------------------------
+def recent_monthly_totals(username: str, months: int):
+    with connection(username) as conn:
+        rows = conn.execute("""
+            SELECT year_month, SUM(total)
+            FROM monthly_category_totals
+            WHERE user_id = ?
+            GROUP BY year_month
+            ORDER BY year_month DESC
+            LIMIT ?
+        """, (user_id(username), months)).fetchall()
+    return [(int(r[0]), from_paise(r[1])) for r in reversed(rows)]
 
 
 # -------------------------------------
 # Monthly summary (spent + saved)
 # -------------------------------------
 def monthly_summary(username: str, year: int, month: int, monthly_budget: float):
-    df = load_expenses(username)
-    if df.empty:
+    ym = year_month_key(year, month)
+    spent, count = _period_total(username, ym, ym)
+    if count == 0:
         return 0.0, monthly_budget
 
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    sel = df[(df["date"].dt.year == year) & (df["date"].dt.month == month)]
-    spent = float(sel["amount"].fillna(0).sum())
-
     saved = max(monthly_budget - spent, 0.0)
     return spent, saved
 
@@ -39,14 +61,10 @@ def monthly_summary(username: str, year: int, month: int, monthly_budget: float)
 # Yearly summary
 # -------------------------------------
 def yearly_summary(username: str, year: int, monthly_budget: float):
-    df = load_expenses(username)
-    if df.empty:
+    spent, count = _period_total(username, year_month_key(year, 1), year_month_key(year, 12))
+    if count == 0:
         return 0.0, monthly_budget * 12
 
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    sel = df[df["date"].dt.year == year]
-    spent = float(sel["amount"].fillna(0).sum())
-
     saved = max(monthly_budget * 12 - spent, 0.0)
     return spent, saved
 
@@ -55,14 +73,13 @@ def yearly_summary(username: str, year: int, monthly_budget: float):
 # Category breakdown for bar/pie charts
 # -------------------------------------
 def category_breakdown(username: str, year: int, month: int):
-    df = load_expenses(username)
-    if df.empty:
-        return {}
-
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    sel = df[(df["date"].dt.year == year) & (df["date"].dt.month == month)]
-
-    if sel.empty:
-        return {}
-
-    return sel.groupby("category")["amount"].sum().sort_values(ascending=False).to_dict()
+    with connection(username) as conn:
+        rows = conn.execute("""
+            SELECT c.name AS category, t.total
+            FROM monthly_category_totals t
+            JOIN categories c ON c.id = t.category_id
+            WHERE t.user_id = ? AND t.year_month = ?
+            ORDER BY t.total DESC
+        """, (user_id(username), year_month_key(year, month))).fetchall()
+
+    return {r["category"]: from_paise(r["total"]) for r in rows}
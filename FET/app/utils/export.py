@@ -0,0 +1,70 @@
+# app/utils/export.py
+"""
+Delta export: only the expenses that changed since a watermark.
+
+The watermark is a change_log seq (see db.changes_since). A consumer
+keeps the one it got back last time and asks again with it, so a daily
+pull costs the handful of rows that changed instead of the full history.
+Every row carries an `op` column: 'I' / 'U' rows should be upserted on
+`id`, 'D' rows deleted.
+"""
+import io
+from typing import Tuple
+
+import pandas as pd
+
+from .db import expense_changes
+
+DELTA_COLUMNS = ["op", "id", "date", "amount", "category", "assigned_member", "split_json", "note"]
+# a full export is the snapshot deltas apply to: same columns, no op
+FULL_COLUMNS = DELTA_COLUMNS[1:]
+DELTA_FORMATS = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    """Parquet needs pyarrow or fastparquet, neither of which is required."""
+    for mod in ("pyarrow", "fastparquet"):
+        try:
+            __import__(mod)
+            return True
+        except ImportError:
+            pass
+    return False
+
+
+def delta_frame(username: str, since: int = 0) -> Tuple[pd.DataFrame, int]:
+    """(changed rows, new watermark) for `username` after `since`."""
+    rows, watermark = expense_changes(username, since)
+    df = pd.DataFrame(rows, columns=DELTA_COLUMNS)
+    df["id"] = df["id"].astype("int64")
+    return df, watermark
+
+
+def delta_export(username: str, since: int = 0, fmt: str = "csv") -> Tuple[bytes, int, int]:
+    """
+    Encode the delta as `fmt` (csv / json / parquet).
+    Returns (file bytes, new watermark, row count).
+    """
+    if fmt not in DELTA_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == "parquet" and not parquet_available():
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    df, watermark = delta_frame(username, since)
+    if fmt == "csv":
+        data = df.to_csv(index=False).encode("utf-8")
+    elif fmt == "json":
+        data = df.to_json(orient="records", force_ascii=False).encode("utf-8")
+    else:
+        buf = io.BytesIO()
+        df.to_parquet(buf, index=False)
+        data = buf.getvalue()
+    return data, watermark, len(df)
+
+
+def delta_filename(username: str, since: int, watermark: int, fmt: str) -> str:
+    return f"{username}_expenses_{since}-{watermark}.{fmt}"
@@ -1,31 +1,15 @@
 import pandas as pd
-from .db import get_connection
+from .db import connection, user_id, save_family as db_save_family
 
 def load_family(username: str):
-    conn = get_conn()
-    df = pd.read_sql_query(
-        "SELECT * FROM family WHERE username = ?",
-        conn, params=[username]
-    )
+    with connection(username) as conn:
+        df = pd.read_sql_query(
+            "SELECT * FROM family WHERE user_id = ?",
+            conn, params=[user_id(username)]
+        )
+    df["monthly_income"] = df["monthly_income"].fillna(0).astype("int64") / 100
     return df
 
 def save_family(username: str, rows: list):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("DELETE FROM family WHERE username = ?", (username,))
-
-    for r in rows:
-        cur.execute("""
-            INSERT INTO family (username, member_name, relation, monthly_income, age, notes)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            username,
-            r.get("member_name", ""),
-            r.get("relation", ""),
-            float(r.get("monthly_income", 0)),
-            int(r.get("age", 0)),
-            r.get("notes", "")
-        ))
-
-    conn.commit()
+    # same diff-based roster sync as db.save_family; each row keeps its own family_name
+    return db_save_family(None, username, rows)
@@ -1,4 +1,4 @@
-from .db import get_conn
+from .db import connection, family_income_total, from_paise, user_id
 import pandas as pd
 
 
@@ -6,26 +6,20 @@ import pandas as pd
 # Load family members for a user
 # -------------------------------------
 def load_family(username: str) -> pd.DataFrame:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT member_name, relation, monthly_income, age, notes, is_head
-        FROM family WHERE username = ?
-    """, (username,))
-    rows = cur.fetchall()
-    conn.close()
+    with connection(username) as conn:
+        rows = conn.execute("""
+            SELECT member_name, relation, monthly_income, age, notes, is_head
+            FROM family WHERE user_id = ?
+        """, (user_id(username),)).fetchall()
 
     cols = ["member_name", "relation", "monthly_income", "age", "notes", "is_head"]
-    return pd.DataFrame(rows, columns=cols)
+    df = pd.DataFrame(rows, columns=cols)
+    df["monthly_income"] = df["monthly_income"].fillna(0).astype("int64") / 100
+    return df
 
 
 # -------------------------------------
-# Total family monthly income
+# Total family monthly income (trigger-maintained, one lookup)
 # -------------------------------------
 def family_monthly_income(username: str) -> float:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT SUM(monthly_income) FROM family WHERE username = ?", (username,))
-    amount = cur.fetchone()[0]
-    conn.close()
-    return amount if amount else 0.0
+    return family_income_total(username)
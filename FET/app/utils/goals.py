@@ -1,20 +1,19 @@
 import pandas as pd
 from datetime import datetime
-from .db import get_connection
+from .db import connection, to_paise, from_paise, user_id
 
 def load_goals(username: str):
-    conn = get_conn()
-    df = pd.read_sql_query(
-        "SELECT * FROM goals WHERE username = ?",
-        conn, params=[username]
-    )
+    with connection(username) as conn:
+        df = pd.read_sql_query(
+            "SELECT * FROM goals WHERE user_id = ?",
+            conn, params=[user_id(username)]
+        )
+    df["target_amount"] = df["target_amount"].fillna(0).astype("int64") / 100
     return df
 
 def add_goal(username: str, name: str, target: float, months: int):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO goals (username, goal_name, target_amount, months_to_complete, created_on) VALUES (?, ?, ?, ?, ?)",
-        (username, name, target, months, datetime.now().strftime("%Y-%m-%d"))
-    )
-    conn.commit()
+    with connection(username) as conn:
+        conn.execute(
+            "INSERT INTO goals (user_id, goal_name, target_amount, months_to_complete, created_on) VALUES (?, ?, ?, ?, ?)",
+            (user_id(username, create=True), name, to_paise(target or 0), months, datetime.now().strftime("%Y-%m-%d"))
+        )
@@ -1,4 +1,4 @@
-from .db import get_conn
+from .db import connection, to_paise, user_id
 import pandas as pd
 
 
@@ -6,42 +6,35 @@ import pandas as pd
 # Load all goals for a user
 # -------------------------------------
 def load_goals(username: str):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT goal_name, target_amount, months_to_complete, created_on
-        FROM goals WHERE username = ?
-    """, (username,))
-    rows = cur.fetchall()
-    conn.close()
+    with connection(username) as conn:
+        rows = conn.execute("""
+            SELECT goal_name, target_amount, months_to_complete, created_on
+            FROM goals WHERE user_id = ?
+        """, (user_id(username),)).fetchall()
 
     cols = ["goal_name", "target_amount", "months_to_complete", "created_on"]
-    return pd.DataFrame(rows, columns=cols)
+    df = pd.DataFrame(rows, columns=cols)
+    df["target_amount"] = df["target_amount"].fillna(0).astype("int64") / 100
+    return df
 
 
 # -------------------------------------
 # Add a new goal
 # -------------------------------------
 def add_goal(username: str, goal_name: str, target: float, months: int, created_on: str):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO goals (username, goal_name, target_amount, months_to_complete, created_on)
-        VALUES (?, ?, ?, ?, ?)
-    """, (username, goal_name, target, months, created_on))
-    conn.commit()
-    conn.close()
+    with connection(username) as conn:
+        conn.execute("""
+            INSERT INTO goals (user_id, goal_name, target_amount, months_to_complete, created_on)
+            VALUES (?, ?, ?, ?, ?)
+        """, (user_id(username, create=True), goal_name, to_paise(target or 0), months, created_on))
 
 
 # -------------------------------------
 # Delete a goal by name
 # -------------------------------------
 def delete_goal(username: str, goal_name: str):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        DELETE FROM goals
-        WHERE username = ? AND goal_name = ?
-    """, (username, goal_name))
-    conn.commit()
-    conn.close()
+    with connection(username) as conn:
+        conn.execute("""
+            DELETE FROM goals
+            WHERE user_id = ? AND goal_name = ?
+        """, (user_id(username), goal_name))
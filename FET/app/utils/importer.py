@@ -0,0 +1,132 @@
+# app/utils/importer.py
+"""
+Chunked CSV / XLSX reader behind the bulk import page.
+
+Files are streamed in fixed-size DataFrame chunks so a bank statement
+with hundreds of thousands of rows never has to sit in memory at once;
+each chunk goes to db.add_expenses_bulk() as one transaction.
+"""
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from .db import add_expenses_bulk
+
+CHUNK_ROWS = 5000
+
+# expense fields a file column can be mapped onto
+IMPORT_FIELDS = ["date", "amount", "category", "assigned_member", "note"]
+
+
+def _is_excel(filename: str) -> bool:
+    return filename.lower().endswith((".xlsx", ".xlsm"))
+
+
+def iter_chunks(fileobj, filename: str, chunksize: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield the file as DataFrames of at most `chunksize` rows."""
+    if filename.lower().endswith(".csv"):
+        yield from pd.read_csv(fileobj, chunksize=chunksize, dtype=str, keep_default_na=False)
+        return
+
+    if not _is_excel(filename):
+        raise ValueError(f"Unsupported file type: {filename}")
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(h) if h is not None else f"column_{i + 1}" for i, h in enumerate(header)]
+
+        batch = []
+        for r in rows:
+            if r is None or all(v is None for v in r):
+                continue
+            batch.append(r[:len(columns)])
+            if len(batch) >= chunksize:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        wb.close()
+
+
+def preview(fileobj, filename: str, n: int = 20) -> pd.DataFrame:
+    """First `n` rows of the file (used to pick the column mapping)."""
+    for chunk in iter_chunks(fileobj, filename, chunksize=n):
+        return chunk
+    return pd.DataFrame()
+
+
+def _map_chunk(chunk: pd.DataFrame,
+               mapping: Dict[str, Optional[str]],
+               default_category: str,
+               dayfirst: bool) -> pd.DataFrame:
+    out = pd.DataFrame(index=chunk.index)
+    for field in IMPORT_FIELDS:
+        col = mapping.get(field)
+        out[field] = chunk[col] if col else None
+
+    out["date"] = pd.to_datetime(out["date"], errors="coerce", dayfirst=dayfirst)
+    # "₹1,234.50" / "Rs 1234.50" -> 1234.50
+    out["amount"] = pd.to_numeric(
+        out["amount"].astype(str).str.replace(r"[^0-9.\-]", "", regex=True),
+        errors="coerce",
+    )
+    if default_category:
+        out["category"] = out["category"].where(
+            out["category"].notna() & (out["category"].astype(str).str.strip() != ""),
+            default_category,
+        )
+    return out
+
+
+def import_file(username: str,
+                fileobj,
+                filename: str,
+                mapping: Dict[str, Optional[str]],
+                default_category: str = "Other",
+                dayfirst: bool = False,
+                chunksize: int = CHUNK_ROWS,
+                on_progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+    """
+    Stream `fileobj` into the user's expenses.
+
+    `mapping` maps each of IMPORT_FIELDS to a file column (or None).
+    Re-importing the same file is a no-op: every row is skipped as a
+    duplicate by its content hash.
+    """
+    totals = {"rows": 0, "inserted": 0, "duplicates": 0, "invalid": 0}
+    occurrences: Dict[tuple, int] = {}
+
+    for chunk in iter_chunks(fileobj, filename, chunksize=chunksize):
+        res = add_expenses_bulk(
+            username, _map_chunk(chunk, mapping, default_category, dayfirst), occurrences
+        )
+        totals["rows"] += len(chunk)
+        for k in ("inserted", "duplicates", "invalid"):
+            totals[k] += res[k]
+        if on_progress:
+            on_progress(totals)
+
+    return totals
+
+
+def guess_mapping(columns: List[str]) -> Dict[str, Optional[str]]:
+    """Best-effort column guess from common bank-statement headers."""
+    hints = {
+        "date": ("date", "txn date", "transaction date", "value date"),
+        "amount": ("amount", "debit", "withdrawal", "amt"),
+        "category": ("category", "type"),
+        "assigned_member": ("member", "paid by", "assigned_member"),
+        "note": ("note", "description", "narration", "remarks", "details"),
+    }
+    lowered = {c.strip().lower(): c for c in columns}
+    mapping: Dict[str, Optional[str]] = {}
+    for field, names in hints.items():
+        mapping[field] = next((lowered[n] for n in names if n in lowered), None)
+    return mapping
@@ -0,0 +1,133 @@
+# app/utils/maintenance.py
+"""
+Routine SQLite upkeep for app.db and shard files, safe next to live sessions.
+
+Per file, once it has been quiet for a moment (PRAGMA data_version stops
+moving): PRAGMA optimize with a bounded analysis_limit, incremental_vacuum
+in small steps (each its own short write transaction), then
+wal_checkpoint(TRUNCATE). Page counts are recorded before and after.
+
+Files created before auto_vacuum=INCREMENTAL was the default need one
+full VACUUM to switch over. That holds the write lock for the whole
+rewrite, so it only happens when asked for (convert=True).
+"""
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .db import BUSY_TIMEOUT_MS, all_db_paths
+
+ANALYSIS_LIMIT = 1000      # rows sampled per index by PRAGMA optimize
+VACUUM_STEP_PAGES = 500    # pages freed per incremental_vacuum step
+VACUUM_MAX_PAGES = 50_000  # upper bound per run (~200 MB at 4 KB pages)
+STEP_SLEEP = 0.05          # seconds between vacuum steps
+QUIET_SECONDS = 2.0
+QUIET_MAX_WAIT = 60.0
+
+AUTO_VACUUM_MODES = {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def _pragma(conn: sqlite3.Connection, name: str) -> int:
+    return int(conn.execute(f"PRAGMA {name}").fetchone()[0])
+
+
+def page_stats(conn: sqlite3.Connection, path: Path) -> Dict[str, int]:
+    wal = Path(str(path) + "-wal")
+    return {
+        "page_size": _pragma(conn, "page_size"),
+        "page_count": _pragma(conn, "page_count"),
+        "freelist_count": _pragma(conn, "freelist_count"),
+        "wal_bytes": wal.stat().st_size if wal.exists() else 0,
+    }
+
+
+def wait_for_quiet(conn: sqlite3.Connection,
+                   quiet: float = QUIET_SECONDS,
+                   max_wait: float = QUIET_MAX_WAIT) -> bool:
+    """
+    Block until nobody else has committed for `quiet` seconds, or give up
+    after `max_wait`. Returns True if a quiet window was found.
+    """
+    deadline = time.monotonic() + max_wait
+    last = _pragma(conn, "data_version")
+    since = time.monotonic()
+    while time.monotonic() < deadline:
+        time.sleep(min(quiet / 4, 0.5))
+        now = _pragma(conn, "data_version")
+        if now != last:
+            last, since = now, time.monotonic()
+        elif time.monotonic() - since >= quiet:
+            return True
+    return False
+
+
+def incremental_vacuum(conn: sqlite3.Connection,
+                       max_pages: int = VACUUM_MAX_PAGES,
+                       step: int = VACUUM_STEP_PAGES,
+                       sleep: float = STEP_SLEEP) -> int:
+    """Free up to `max_pages` pages, `step` at a time. Returns pages freed."""
+    freed = 0
+    while freed < max_pages:
+        free = _pragma(conn, "freelist_count")
+        if not free:
+            break
+        n = min(step, free, max_pages - freed)
+        # execute() would step the pragma once and free a single page;
+        # executescript() runs it to completion
+        conn.executescript(f"PRAGMA incremental_vacuum({n})")
+        left = _pragma(conn, "freelist_count")
+        if left >= free:
+            break
+        freed += free - left
+        time.sleep(sleep)
+    return freed
+
+
+def maintain_file(path: Path,
+                  analyze: bool = False,
+                  convert: bool = False,
+                  max_vacuum_pages: int = VACUUM_MAX_PAGES,
+                  quiet: float = QUIET_SECONDS,
+                  max_wait: float = QUIET_MAX_WAIT) -> Dict[str, object]:
+    """
+    Run one maintenance pass over the database at `path`.
+    `analyze` runs a full ANALYZE instead of PRAGMA optimize.
+    """
+    conn = _connect(path)
+    try:
+        report: Dict[str, object] = {"path": str(path), "before": page_stats(conn, path)}
+        report["quiet"] = wait_for_quiet(conn, quiet, max_wait)
+
+        if analyze:
+            conn.execute("ANALYZE")
+        else:
+            conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+            conn.execute("PRAGMA optimize")
+
+        mode = _pragma(conn, "auto_vacuum")
+        if mode != 2 and convert:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+            mode = _pragma(conn, "auto_vacuum")
+        report["auto_vacuum"] = AUTO_VACUUM_MODES.get(mode, str(mode))
+        report["vacuumed_pages"] = incremental_vacuum(conn, max_vacuum_pages) if mode == 2 else 0
+
+        busy, log, done = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        report["checkpoint"] = {"busy": bool(busy), "wal_frames": log, "checkpointed": done}
+        report["after"] = page_stats(conn, path)
+        return report
+    finally:
+        conn.close()
+
+
+def run_maintenance(paths: Optional[List[Path]] = None, **kwargs) -> List[Dict[str, object]]:
+    """maintain_file() over app.db and every shard file (or `paths`)."""
+    return [maintain_file(p, **kwargs) for p in (paths or all_db_paths()) if os.path.exists(p)]
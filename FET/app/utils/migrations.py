@@ -0,0 +1,951 @@
+# app/utils/migrations.py
+"""
+Versioned schema migrations for app/instance/app.db.
+
+The schema version lives in `PRAGMA user_version`. Each step runs once,
+in order, inside its own write transaction, and is written so that
+re-running it against a partially migrated file is harmless
+(IF NOT EXISTS everywhere).
+"""
+from __future__ import annotations
+import sqlite3
+from typing import Callable, Dict, List, Tuple
+
+Migration = Tuple[int, str, Callable[[sqlite3.Connection], None]]
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    """Register a migration step for `version`."""
+    def wrap(fn: Callable[[sqlite3.Connection], None]):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return wrap
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Apply every pending step and return the resulting schema version.
+
+    The version is checked without a lock first so an up-to-date database
+    costs one pragma read; pending steps re-check under BEGIN IMMEDIATE so
+    two processes starting together never apply the same step twice.
+    """
+    if schema_version(conn) >= latest_version():
+        return schema_version(conn)
+
+    if conn.in_transaction:
+        conn.commit()
+
+    for version, _description, step in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    return schema_version(conn)
+
+
+# ============================================================
+# MIGRATION STEPS
+# ============================================================
+@migration(1, "indexes for per-user lookups and reset tokens")
+def _m001_indexes(conn: sqlite3.Connection) -> None:
+    # covering index: month/category sums never touch the table
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_expenses_user_date_cat_amt
+        ON expenses (username, date, category, amount)
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_family_username ON family (username)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_goals_username ON goals (username)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_budgets_username ON budgets (username)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_reset_token ON users (reset_token)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)")
+
+
+# SQL expression for the epoch-day of a 'YYYY-MM-DD...' date string;
+# must agree with db.epoch_day().
+EPOCH_DAY_SQL = "CAST(julianday(substr({col}, 1, 10)) - 2440587.5 AS INTEGER)"
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    # main only: a shard being migrated has app.db attached alongside
+    return [r[1] for r in conn.execute(f"PRAGMA main.table_info({table})").fetchall()]
+
+
+@migration(2, "integer epoch-day column on expenses for range scans")
+def _m002_expense_day(conn: sqlite3.Connection) -> None:
+    if "day" not in _columns(conn, "expenses"):
+        conn.execute("ALTER TABLE expenses ADD COLUMN day INTEGER")
+
+    conn.execute(
+        "UPDATE expenses SET day = " + EPOCH_DAY_SQL.format(col="date") + " WHERE day IS NULL"
+    )
+
+    # rows written without `day` (older code paths) or with an edited date
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_day_insert
+        AFTER INSERT ON expenses
+        WHEN NEW.day IS NULL
+        BEGIN
+            UPDATE expenses SET day = """ + EPOCH_DAY_SQL.format(col="NEW.date") + """
+            WHERE id = NEW.id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_day_update
+        AFTER UPDATE OF date ON expenses
+        BEGIN
+            UPDATE expenses SET day = """ + EPOCH_DAY_SQL.format(col="NEW.date") + """
+            WHERE id = NEW.id;
+        END
+    """)
+
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_expenses_user_day_cat_amt
+        ON expenses (username, day, category, amount)
+    """)
+    conn.execute("DROP INDEX IF EXISTS idx_expenses_user_date_cat_amt")
+
+
+@migration(3, "content hash on expenses for idempotent imports")
+def _m003_expense_row_hash(conn: sqlite3.Connection) -> None:
+    if "row_hash" not in _columns(conn, "expenses"):
+        conn.execute("ALTER TABLE expenses ADD COLUMN row_hash TEXT")
+
+    # partial: hand-entered rows carry no hash and cost nothing here
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_user_row_hash
+        ON expenses (username, row_hash)
+        WHERE row_hash IS NOT NULL
+    """)
+
+
+# yyyymm integer for a 'YYYY-MM-DD...' date string (NULL if unparseable)
+YEAR_MONTH_SQL = "CAST(strftime('%Y%m', substr({col}, 1, 10)) AS INTEGER)"
+
+
+def _rollup_add_sql(sign: str, row: str) -> str:
+    """Upsert that adds (sign=+) or removes (sign=-) one expense row."""
+    ym = YEAR_MONTH_SQL.format(col=f"{row}.date")
+    return f"""
+            INSERT INTO monthly_category_totals (username, year_month, category, total, count)
+            SELECT {row}.username, {ym}, IFNULL({row}.category, ''),
+                   {sign}IFNULL({row}.amount, 0), {sign}1
+            WHERE {ym} IS NOT NULL
+            ON CONFLICT (username, year_month, category) DO UPDATE SET
+                total = total + excluded.total,
+                count = count + excluded.count;"""
+
+
+def rebuild_monthly_totals(conn: sqlite3.Connection, user_id: int | None = None) -> None:
+    """Recompute monthly_category_totals from expenses + archive (all users or one)."""
+    # migration 4 runs this before migrations 10 and 11 swapped the
+    # username / category text for user_id / category_id
+    cols = _columns(conn, "expenses")
+    owner = "user_id" if "user_id" in cols else "username"
+    category = "category_id" if "category_id" in cols else "category"
+    key = category if category == "category_id" else "IFNULL(category, '')"
+    where, params = (f"WHERE {owner} = ?", (user_id,)) if user_id is not None else ("", ())
+    conn.execute(f"DELETE FROM monthly_category_totals {where}", params)
+
+    source = f"SELECT {owner}, date, {category}, amount FROM expenses {where}"
+    if _columns(conn, "expenses_archive"):
+        source += f" UNION ALL SELECT {owner}, date, {category}, amount FROM expenses_archive {where}"
+        params = params * 2
+
+    ym = YEAR_MONTH_SQL.format(col="date")
+    conn.execute(f"""
+        INSERT INTO monthly_category_totals ({owner}, year_month, {category}, total, count)
+        SELECT {owner}, {ym}, {key}, SUM(IFNULL(amount, 0)), COUNT(*)
+        FROM ({source})
+        WHERE {ym} IS NOT NULL
+        GROUP BY {owner}, {ym}, {key}
+    """, params)
+
+
+def _create_rollup_triggers(conn: sqlite3.Connection) -> None:
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_insert
+        AFTER INSERT ON expenses
+        BEGIN{_rollup_add_sql("+", "NEW")}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_delete
+        AFTER DELETE ON expenses
+        BEGIN{_rollup_add_sql("-", "OLD")}
+            DELETE FROM monthly_category_totals
+            WHERE username = OLD.username AND count <= 0;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_update
+        AFTER UPDATE OF username, date, amount, category ON expenses
+        BEGIN{_rollup_add_sql("-", "OLD")}{_rollup_add_sql("+", "NEW")}
+            DELETE FROM monthly_category_totals
+            WHERE username = OLD.username AND count <= 0;
+        END
+    """)
+
+
+@migration(4, "trigger-maintained monthly_category_totals rollup")
+def _m004_monthly_rollup(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_category_totals (
+            username TEXT NOT NULL,
+            year_month INTEGER NOT NULL,     -- yyyymm
+            category TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (username, year_month, category)
+        ) WITHOUT ROWID
+    """)
+    _create_rollup_triggers(conn)
+    rebuild_monthly_totals(conn)
+
+
+@migration(5, "(username, day) index for keyset pagination")
+def _m005_expense_keyset_index(conn: sqlite3.Connection) -> None:
+    # rowid is the implicit last key, so this orders by (day, id)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_day ON expenses (username, day)")
+
+
+@migration(6, "normalised expense_splits table")
+def _m006_expense_splits(conn: sqlite3.Connection) -> None:
+    import json
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS expense_splits (
+            expense_id INTEGER NOT NULL,
+            member TEXT NOT NULL,
+            share REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (expense_id, member)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_expense_splits_member
+        ON expense_splits (member, expense_id)
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_splits_delete
+        AFTER DELETE ON expenses
+        BEGIN
+            DELETE FROM expense_splits WHERE expense_id = OLD.id;
+        END
+    """)
+
+    # existing split_json blobs -> rows
+    rows = conn.execute(
+        "SELECT id, split_json FROM expenses WHERE split_json IS NOT NULL AND split_json != ''"
+    ).fetchall()
+    splits = []
+    for expense_id, blob in rows:
+        try:
+            data = json.loads(blob)
+        except Exception:
+            continue
+        if not isinstance(data, dict):
+            continue
+        for member, share in data.items():
+            try:
+                splits.append((expense_id, str(member), float(share or 0.0)))
+            except Exception:
+                continue
+    conn.executemany(
+        "INSERT OR IGNORE INTO expense_splits (expense_id, member, share) VALUES (?, ?, ?)", splits
+    )
+
+
+# an expense row that was just copied into the archive is being moved,
+# not deleted: its splits and its rollup contribution stay
+ARCHIVED_ROW_SQL = """EXISTS (
+            SELECT 1 FROM expenses_archive
+            WHERE username = OLD.username AND day = OLD.day AND id = OLD.id)"""
+
+
+@migration(7, "expenses_archive for closed years")
+def _m007_expenses_archive(conn: sqlite3.Connection) -> None:
+    # clustered by (username, day, id): one user-year is one contiguous
+    # key range, so a closed year reads like a single compact partition
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS expenses_archive (
+            username TEXT NOT NULL,
+            day INTEGER NOT NULL,
+            id INTEGER NOT NULL,
+            date TEXT,
+            amount REAL,
+            category TEXT,
+            assigned_member TEXT,
+            split_json TEXT,
+            note TEXT,
+            row_hash TEXT,
+            PRIMARY KEY (username, day, id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_expenses_archive_user_row_hash
+        ON expenses_archive (username, row_hash)
+        WHERE row_hash IS NOT NULL
+    """)
+
+    # re-importing an archived statement stays a no-op
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_archived_hash
+        BEFORE INSERT ON expenses
+        WHEN NEW.row_hash IS NOT NULL AND EXISTS (
+            SELECT 1 FROM expenses_archive
+            WHERE username = NEW.username AND row_hash = NEW.row_hash)
+        BEGIN
+            SELECT RAISE(IGNORE);
+        END
+    """)
+
+    conn.execute("DROP TRIGGER IF EXISTS trg_expenses_rollup_delete")
+    conn.execute(f"""
+        CREATE TRIGGER trg_expenses_rollup_delete
+        AFTER DELETE ON expenses
+        WHEN NOT {ARCHIVED_ROW_SQL}
+        BEGIN{_rollup_add_sql("-", "OLD")}
+            DELETE FROM monthly_category_totals
+            WHERE username = OLD.username AND count <= 0;
+        END
+    """)
+    conn.execute("DROP TRIGGER IF EXISTS trg_expenses_splits_delete")
+    conn.execute(f"""
+        CREATE TRIGGER trg_expenses_splits_delete
+        AFTER DELETE ON expenses
+        WHEN NOT {ARCHIVED_ROW_SQL}
+        BEGIN
+            DELETE FROM expense_splits WHERE expense_id = OLD.id;
+        END
+    """)
+
+    # purging archived rows (e.g. moving a user to a shard) cleans up after them
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_archive_delete
+        AFTER DELETE ON expenses_archive
+        BEGIN{_rollup_add_sql("-", "OLD")}
+            DELETE FROM monthly_category_totals
+            WHERE username = OLD.username AND count <= 0;
+            DELETE FROM expense_splits WHERE expense_id = OLD.id;
+        END
+    """)
+
+
+@migration(8, "FTS5 index over expense note/category and search filter indexes")
+def _m008_expense_search(conn: sqlite3.Connection) -> None:
+    # rowid = expense id; username is indexed too so a search only walks
+    # one user's postings
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(
+            note, category, username,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_insert
+        AFTER INSERT ON expenses
+        BEGIN
+            INSERT INTO expenses_fts (rowid, note, category, username)
+            VALUES (NEW.id, NEW.note, NEW.category, NEW.username);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_update
+        AFTER UPDATE OF note, category, username ON expenses
+        BEGIN
+            DELETE FROM expenses_fts WHERE rowid = OLD.id;
+            INSERT INTO expenses_fts (rowid, note, category, username)
+            VALUES (NEW.id, NEW.note, NEW.category, NEW.username);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_delete
+        AFTER DELETE ON expenses
+        WHEN NOT {ARCHIVED_ROW_SQL}
+        BEGIN
+            DELETE FROM expenses_fts WHERE rowid = OLD.id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_archive_fts_delete
+        AFTER DELETE ON expenses_archive
+        BEGIN
+            DELETE FROM expenses_fts WHERE rowid = OLD.id;
+        END
+    """)
+
+    conn.execute("DELETE FROM expenses_fts")
+    conn.execute("""
+        INSERT INTO expenses_fts (rowid, note, category, username)
+        SELECT id, note, category, username FROM expenses
+        UNION ALL
+        SELECT id, note, category, username FROM expenses_archive
+    """)
+
+    # category / member filters and full-text hits resolved against the archive;
+    # the category index also hands facet counts their GROUP BY order
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_expenses_user_cat_mem_day
+        ON expenses (username, category, assigned_member, day, amount)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_expenses_user_member_day
+        ON expenses (username, assigned_member, day)
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_archive_id ON expenses_archive (id)")
+
+
+def _rebuild_table(conn: sqlite3.Connection,
+                   table: str,
+                   retype: Dict[str, str] | None = None,
+                   convert: Dict[str, str] | None = None,
+                   rename: Dict[str, Tuple[str, str]] | None = None) -> bool:
+    """
+    Change columns the way SQLite allows: create a new table from the
+    stored CREATE text with `retype` {column: new type} and `rename`
+    {column: (new name, new declaration)} applied, copy rows across
+    (`convert` {column: SQL expression} rewrites values on the way), swap
+    it in, then replay the table's indexes, triggers and AUTOINCREMENT
+    position. Renamed columns are renamed in the replayed SQL too,
+    including `_<column>` in index names. Returns False if nothing
+    needed changing.
+    """
+    import re
+
+    retype, convert, rename = retype or {}, convert or {}, rename or {}
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    if not row:
+        return False
+    create = row[0]
+    for col, new_type in retype.items():
+        create = re.sub(rf"(\b{col}\s+)[A-Za-z]+", rf"\g<1>{new_type}", create, count=1)
+    for col, (new_name, decl) in rename.items():
+        create = re.sub(rf"\b{col}\s+[A-Za-z]+(\s+(UNIQUE|NOT\s+NULL))*", f"{new_name} {decl}",
+                        create, count=1)
+        create = re.sub(rf"\b{col}\b", new_name, create)
+    if create == row[0]:
+        return False
+
+    def renamed(sql: str) -> str:
+        for col, (new_name, _decl) in rename.items():
+            sql = re.sub(rf"_{col}\b", f"_{new_name}", sql)
+            sql = re.sub(rf"\b{col}\b", new_name, sql)
+        return sql
+
+    tmp = f"{table}__rebuild"
+    create = re.sub(rf"^CREATE TABLE\s+(IF NOT EXISTS\s+)?\"?{table}\"?", f"CREATE TABLE {tmp}", create)
+    dependents = conn.execute("""
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    """, (table,)).fetchall()
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone() \
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone() else None
+
+    cols = _columns(conn, table)
+    select = ", ".join(convert.get(c, c) for c in cols)
+    targets = ", ".join(rename[c][0] if c in rename else c for c in cols)
+
+    conn.execute(create)
+    conn.execute(f"INSERT INTO {tmp} ({targets}) SELECT {select} FROM {table}")
+    # no trigger rewriting while the name is briefly missing
+    conn.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {tmp} RENAME TO {table}")
+    finally:
+        conn.execute("PRAGMA legacy_alter_table = OFF")
+    for (sql,) in dependents:
+        conn.execute(renamed(sql))
+    if seq:
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (seq[0], table))
+    return True
+
+
+# rupees (REAL) -> paise (INTEGER) through db.to_paise() itself, so a
+# migrated row holds the paise the app would store for the same input
+PAISE_SQL = "to_paise({col})"
+
+
+def _sql_to_paise(value):
+    from .db import to_paise
+
+    try:
+        return to_paise(value)
+    except (ArithmeticError, ValueError):
+        return 0  # junk text in a REAL column, as CAST(... AS INTEGER) had it
+
+
+def _register_to_paise(conn: sqlite3.Connection) -> None:
+    conn.create_function("to_paise", 1, _sql_to_paise, deterministic=True)
+
+MONEY_COLUMNS = {
+    "expenses": ["amount"],
+    "expenses_archive": ["amount"],
+    "expense_splits": ["share"],
+    "monthly_category_totals": ["total"],
+    "family": ["monthly_income"],
+    "budgets": ["main_budget"],
+    "goals": ["target_amount"],
+}
+
+
+@migration(9, "money columns as INTEGER paise")
+def _m009_integer_paise(conn: sqlite3.Connection) -> None:
+    _register_to_paise(conn)
+    for table, cols in MONEY_COLUMNS.items():
+        _rebuild_table(
+            conn, table,
+            retype={c: "INTEGER" for c in cols},
+            convert={c: PAISE_SQL.format(col=c) for c in cols},
+        )
+
+
+# tables whose rows belong to one user, keyed by users.id from migration 10
+USER_TABLES = ["family", "expenses", "expenses_archive", "budgets", "goals",
+               "monthly_category_totals"]
+
+
+@migration(10, "integer user_id instead of repeated username text")
+def _m010_user_id(conn: sqlite3.Connection) -> None:
+    import re
+
+    # a shard file resolves names through app.db, attached by db.init_db()
+    attached = [r[1] for r in conn.execute("PRAGMA database_list").fetchall()]
+    users = "accounts.users" if "accounts" in attached else "main.users"
+
+    tables = [t for t in USER_TABLES if "username" in _columns(conn, t)]
+    for table in tables:
+        # rows owned by no one were unreachable anyway
+        conn.execute(f"DELETE FROM {table} WHERE username IS NULL")
+        # data written before (or without) a registration still gets an id
+        conn.execute(f"INSERT OR IGNORE INTO {users} (username) SELECT DISTINCT username FROM {table}")
+
+    # triggers span tables, so they come back after every table is rebuilt
+    triggers = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"
+    ).fetchall()
+    for name, _sql in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+    conn.execute("DROP TABLE IF EXISTS expenses_fts")
+
+    for table in tables:
+        _rebuild_table(
+            conn, table,
+            rename={"username": ("user_id", "INTEGER NOT NULL REFERENCES users(id)")},
+            convert={"username": f"(SELECT u.id FROM {users} u WHERE u.username = {table}.username)"},
+        )
+
+    conn.execute("""
+        CREATE VIRTUAL TABLE expenses_fts USING fts5(
+            note, category, user_id,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+    conn.execute("""
+        INSERT INTO expenses_fts (rowid, note, category, user_id)
+        SELECT id, note, category, user_id FROM expenses
+        UNION ALL
+        SELECT id, note, category, user_id FROM expenses_archive
+    """)
+    for _name, sql in triggers:
+        conn.execute(re.sub(r"\busername\b", "user_id", sql))
+
+
+def _rollup_delta_sql(sign: str, row: str) -> str:
+    """_rollup_add_sql() for the migration 11 schema (user_id, category_id)."""
+    ym = YEAR_MONTH_SQL.format(col=f"{row}.date")
+    return f"""
+            INSERT INTO monthly_category_totals (user_id, year_month, category_id, total, count)
+            SELECT {row}.user_id, {ym}, {row}.category_id, {sign}IFNULL({row}.amount, 0), {sign}1
+            WHERE {ym} IS NOT NULL
+            ON CONFLICT (user_id, year_month, category_id) DO UPDATE SET
+                total = total + excluded.total,
+                count = count + excluded.count;"""
+
+
+@migration(11, "categories dictionary and category_limits table")
+def _m011_categories(conn: sqlite3.Connection) -> None:
+    import json
+
+    # one row per (user, name) ever used; '' is the uncategorised bucket
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            name TEXT NOT NULL,
+            UNIQUE (user_id, name)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS category_limits (
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            limit_amount INTEGER NOT NULL,   -- paise
+            PRIMARY KEY (user_id, category_id)
+        ) WITHOUT ROWID
+    """)
+
+    for table in ("expenses", "expenses_archive", "monthly_category_totals"):
+        if "category" in _columns(conn, table):
+            conn.execute(f"""
+                INSERT OR IGNORE INTO categories (user_id, name)
+                SELECT DISTINCT user_id, IFNULL(category, '') FROM {table}
+            """)
+
+    # the latest budgets row holds each user's limits blob
+    if "category_limits_json" in _columns(conn, "budgets"):
+        rows = conn.execute("""
+            SELECT user_id, category_limits_json FROM budgets
+            WHERE id IN (SELECT MAX(id) FROM budgets GROUP BY user_id)
+        """).fetchall()
+        for uid, blob in rows:
+            try:
+                limits = json.loads(blob) if blob else {}
+            except Exception:
+                continue
+            for name, value in (limits.items() if isinstance(limits, dict) else ()):
+                try:
+                    value = float(value or 0)
+                except (TypeError, ValueError):
+                    continue
+                if value <= 0:
+                    continue
+                conn.execute("INSERT OR IGNORE INTO categories (user_id, name) VALUES (?, ?)",
+                             (uid, str(name)))
+                conn.execute("""
+                    INSERT OR REPLACE INTO category_limits (user_id, category_id, limit_amount)
+                    SELECT ?, id, ?
+                    FROM categories WHERE user_id = ? AND name = ?
+                """, (uid, _sql_to_paise(value), uid, str(name)))
+        conn.execute("ALTER TABLE budgets DROP COLUMN category_limits_json")
+
+    # triggers that read the category text are recreated below; the rest
+    # are replayed as they are by _rebuild_table()
+    for name in ("trg_expenses_rollup_insert", "trg_expenses_rollup_delete",
+                 "trg_expenses_rollup_update", "trg_expenses_archive_delete",
+                 "trg_expenses_fts_insert", "trg_expenses_fts_update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    for table in ("expenses", "expenses_archive", "monthly_category_totals"):
+        _rebuild_table(
+            conn, table,
+            rename={"category": ("category_id", "INTEGER NOT NULL REFERENCES categories(id)")},
+            convert={"category": f"""(SELECT c.id FROM categories c
+                WHERE c.user_id = {table}.user_id AND c.name = IFNULL({table}.category, ''))"""},
+        )
+
+    archived = ARCHIVED_ROW_SQL.replace("username", "user_id")
+    conn.execute(f"""
+        CREATE TRIGGER trg_expenses_rollup_insert
+        AFTER INSERT ON expenses
+        BEGIN{_rollup_delta_sql("+", "NEW")}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_expenses_rollup_delete
+        AFTER DELETE ON expenses
+        WHEN NOT {archived}
+        BEGIN{_rollup_delta_sql("-", "OLD")}
+            DELETE FROM monthly_category_totals
+            WHERE user_id = OLD.user_id AND count <= 0;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_expenses_rollup_update
+        AFTER UPDATE OF user_id, date, amount, category_id ON expenses
+        BEGIN{_rollup_delta_sql("-", "OLD")}{_rollup_delta_sql("+", "NEW")}
+            DELETE FROM monthly_category_totals
+            WHERE user_id = OLD.user_id AND count <= 0;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_expenses_archive_delete
+        AFTER DELETE ON expenses_archive
+        BEGIN{_rollup_delta_sql("-", "OLD")}
+            DELETE FROM monthly_category_totals
+            WHERE user_id = OLD.user_id AND count <= 0;
+            DELETE FROM expense_splits WHERE expense_id = OLD.id;
+        END
+    """)
+    # the full-text index keeps the category name, looked up once per write
+    conn.execute("""
+        CREATE TRIGGER trg_expenses_fts_insert
+        AFTER INSERT ON expenses
+        BEGIN
+            INSERT INTO expenses_fts (rowid, note, category, user_id)
+            VALUES (NEW.id, NEW.note,
+                    (SELECT name FROM categories WHERE id = NEW.category_id), NEW.user_id);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER trg_expenses_fts_update
+        AFTER UPDATE OF note, category_id, user_id ON expenses
+        BEGIN
+            DELETE FROM expenses_fts WHERE rowid = OLD.id;
+            INSERT INTO expenses_fts (rowid, note, category, user_id)
+            VALUES (NEW.id, NEW.note,
+                    (SELECT name FROM categories WHERE id = NEW.category_id), NEW.user_id);
+        END
+    """)
+
+
+# table -> the column change_log.row_id points at
+CHANGE_LOG_TABLES = {
+    "expenses": "id",
+    "family": "id",
+    "budgets": "id",
+    "goals": "id",
+    "category_limits": "category_id",
+}
+
+
+@migration(12, "append-only change_log filled by triggers")
+def _m012_change_log(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL,                -- 'I' / 'U' / 'D'
+            ts INTEGER NOT NULL              -- unix seconds
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_change_log_user_seq ON change_log (user_id, seq)")
+
+    ts = "CAST(strftime('%s', 'now') AS INTEGER)"
+    # moving a row into the archive is not a change to the data
+    archived = ARCHIVED_ROW_SQL.replace("username", "user_id")
+    for table, key in CHANGE_LOG_TABLES.items():
+        for op, event, row in (("I", "INSERT", "NEW"), ("U", "UPDATE", "NEW"), ("D", "DELETE", "OLD")):
+            when = f"WHEN NOT {archived}" if table == "expenses" and op == "D" else ""
+            if table == "expenses" and op == "U":
+                # trg_expenses_day_* only fill in the derived day column
+                event = "UPDATE OF user_id, date, amount, category_id, assigned_member, split_json, note"
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_log_{event.split()[0].lower()}
+                AFTER {event} ON {table}
+                {when}
+                BEGIN
+                    INSERT INTO change_log (user_id, table_name, row_id, op, ts)
+                    VALUES ({row}.user_id, '{table}', {row}.{key}, '{op}', {ts});
+                END
+            """)
+
+
+@migration(13, "households grouping accounts for a combined view")
+def _m013_households(conn: sqlite3.Connection) -> None:
+    # lives next to users in app.db (shard files get an unused copy)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS households (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            join_code TEXT UNIQUE NOT NULL,
+            created_by INTEGER REFERENCES users(id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS household_members (
+            household_id INTEGER NOT NULL REFERENCES households(id),
+            user_id INTEGER NOT NULL UNIQUE REFERENCES users(id),   -- one household per account
+            role TEXT NOT NULL DEFAULT 'member',                    -- 'head' / 'member'
+            PRIMARY KEY (household_id, user_id)
+        ) WITHOUT ROWID
+    """)
+
+
+def _family_income_delta_sql(sign: str, row: str) -> str:
+    return f"""
+            INSERT INTO family_income_totals (user_id, total, members)
+            VALUES ({row}.user_id, {sign}IFNULL({row}.monthly_income, 0), {sign}1)
+            ON CONFLICT (user_id) DO UPDATE SET
+                total = total + excluded.total,
+                members = members + excluded.members;"""
+
+
+@migration(14, "trigger-maintained family_income_totals")
+def _m014_family_income_totals(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS family_income_totals (
+            user_id INTEGER PRIMARY KEY REFERENCES users(id),
+            total INTEGER NOT NULL DEFAULT 0,      -- paise
+            members INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("DELETE FROM family_income_totals")
+    conn.execute("""
+        INSERT INTO family_income_totals (user_id, total, members)
+        SELECT user_id, IFNULL(SUM(monthly_income), 0), COUNT(*)
+        FROM family
+        GROUP BY user_id
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_family_income_insert
+        AFTER INSERT ON family
+        BEGIN{_family_income_delta_sql("+", "NEW")}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_family_income_delete
+        AFTER DELETE ON family
+        BEGIN{_family_income_delta_sql("-", "OLD")}
+            DELETE FROM family_income_totals WHERE user_id = OLD.user_id AND members <= 0;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_family_income_update
+        AFTER UPDATE OF user_id, monthly_income ON family
+        BEGIN{_family_income_delta_sql("-", "OLD")}{_family_income_delta_sql("+", "NEW")}
+            DELETE FROM family_income_totals WHERE user_id = OLD.user_id AND members <= 0;
+        END
+    """)
+
+
+# ============================================================
+# QUERY PLAN CHECK
+# ============================================================
+# (name, sql, params, index expected to serve it)
+HOT_QUERIES: List[Tuple[str, str, tuple, str]] = [
+    ("load_expenses",
+     "SELECT id, date, amount, category_id, assigned_member, split_json, note "
+     "FROM expenses WHERE user_id=? ORDER BY day DESC, id DESC",
+     (1,), "idx_expenses_user_day"),
+    ("load_expenses_page",
+     "SELECT id, date, amount FROM expenses "
+     "WHERE user_id=? AND (day, id) < (?, ?) ORDER BY day DESC, id DESC LIMIT 51",
+     (1, 20100, 10), "idx_expenses_user_day"),
+    ("expenses_latest",
+     "SELECT day, date, category_id, amount, id FROM expenses "
+     "WHERE user_id=? ORDER BY day DESC, id DESC LIMIT 3",
+     (1,), "idx_expenses_user_day"),
+    ("expenses_by_category",
+     "SELECT day, amount, id FROM expenses WHERE user_id=? AND category_id IN (?, ?)",
+     (1, 1, 2), "idx_expenses_user_cat_mem_day"),
+    ("expenses_in_range",
+     "SELECT category_id, amount FROM expenses WHERE user_id=? AND day >= ? AND day < ?",
+     (1, 20089, 20120), "idx_expenses_user_day_cat_amt"),
+    ("archive_in_range",
+     "SELECT day, amount, category_id FROM expenses_archive "
+     "WHERE user_id=? AND day >= ? AND day < ? ORDER BY day DESC, id DESC",
+     (1, 19358, 19723), "PRIMARY KEY"),
+    ("archive_row_hash",
+     "SELECT 1 FROM expenses_archive WHERE user_id=? AND row_hash=?",
+     (1, "h"), "idx_expenses_archive_user_row_hash"),
+    ("search_by_category",
+     "SELECT id, note FROM expenses WHERE user_id=? AND category_id=?",
+     (1, 1), "idx_expenses_user_cat_mem_day"),
+    ("search_facets",
+     "SELECT category_id, assigned_member, COUNT(*), SUM(amount) FROM expenses "
+     "WHERE user_id=? AND day >= ? GROUP BY category_id, assigned_member",
+     (1, 19358), "idx_expenses_user_cat_mem_day"),
+    ("search_by_member",
+     "SELECT id, note FROM expenses WHERE user_id=? AND assigned_member=?",
+     (1, "m"), "idx_expenses_user_member_day"),
+    ("search_archive_hit",
+     "SELECT day, amount FROM expenses_archive WHERE id=?",
+     (1,), "idx_expenses_archive_id"),
+    ("category_breakdown",
+     "SELECT category_id, total FROM monthly_category_totals "
+     "WHERE user_id=? AND year_month=?",
+     (1, 202501), "PRIMARY KEY"),
+    ("yearly_summary",
+     "SELECT SUM(total), SUM(count) FROM monthly_category_totals "
+     "WHERE user_id=? AND year_month BETWEEN ? AND ?",
+     (1, 202501, 202512), "PRIMARY KEY"),
+    ("expense_splits_by_expense",
+     "SELECT member, share FROM expense_splits WHERE expense_id=?",
+     (1,), "PRIMARY KEY"),
+    ("expense_splits_by_member",
+     "SELECT expense_id, share FROM expense_splits WHERE member=?",
+     ("m",), "idx_expense_splits_member"),
+    ("load_family",
+     "SELECT id, member_name FROM family WHERE user_id=? ORDER BY id ASC",
+     (1,), "idx_family_user_id"),
+    ("load_goals",
+     "SELECT id, goal_name FROM goals WHERE user_id=? ORDER BY id DESC",
+     (1,), "idx_goals_user_id"),
+    ("load_budget",
+     "SELECT main_budget FROM budgets "
+     "WHERE user_id=? ORDER BY id DESC LIMIT 1",
+     (1,), "idx_budgets_user_id"),
+    ("category_by_name",
+     "SELECT id FROM categories WHERE user_id=? AND name=?",
+     (1, "Food"), "sqlite_autoindex_categories_1"),
+    ("category_limit",
+     "SELECT limit_amount FROM category_limits WHERE user_id=? AND category_id=?",
+     (1, 1), "PRIMARY KEY"),
+    ("change_log_since",
+     "SELECT seq, table_name, row_id, op FROM change_log WHERE seq > ? ORDER BY seq LIMIT 1000",
+     (0,), "INTEGER PRIMARY KEY"),
+    ("change_log_user",
+     "SELECT MAX(seq) FROM change_log WHERE user_id=?",
+     (1,), "idx_change_log_user_seq"),
+    ("change_log_user_since",
+     "SELECT seq, table_name, row_id, op FROM change_log WHERE user_id=? AND seq > ? ORDER BY seq",
+     (1, 0), "idx_change_log_user_seq"),
+    ("household_of_user",
+     "SELECT household_id FROM household_members WHERE user_id=?",
+     (1,), "sqlite_autoindex_household_members_1"),
+    ("household_members",
+     "SELECT user_id FROM household_members WHERE household_id=?",
+     (1,), "PRIMARY KEY"),
+    ("household_month",
+     "SELECT c.name, SUM(t.total) FROM monthly_category_totals t "
+     "JOIN categories c ON c.id = t.category_id "
+     "WHERE t.user_id IN (?, ?) AND t.year_month = ? GROUP BY c.name",
+     (1, 2, 202601), "PRIMARY KEY"),
+    ("family_income_total",
+     "SELECT total FROM family_income_totals WHERE user_id=?",
+     (1,), "INTEGER PRIMARY KEY"),
+    ("verify_reset_token",
+     "SELECT username, reset_expiry FROM users WHERE reset_token=?",
+     ("t",), "idx_users_reset_token"),
+]
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> str:
+    """Return the EXPLAIN QUERY PLAN detail lines joined into one string."""
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return "\n".join(str(r[-1]) for r in rows)
+
+
+def check_query_plans(conn: sqlite3.Connection) -> Dict[str, str]:
+    """
+    Assert that every hot query is answered through its index.
+
+    Returns {query name: plan}. Raises AssertionError listing each query
+    whose plan falls back to a table scan or misses the expected index.
+    """
+    plans: Dict[str, str] = {}
+    failures: List[str] = []
+    for name, sql, params, index in HOT_QUERIES:
+        plan = explain(conn, sql, params)
+        plans[name] = plan
+        if index not in plan or any(line.startswith("SCAN") for line in plan.splitlines()):
+            failures.append(f"{name}: expected {index}, got:\n{plan}")
+    if failures:
+        raise AssertionError("query plan check failed:\n" + "\n\n".join(failures))
+    return plans
@@ -1,7 +1,60 @@
 # app/utils/monthly_summary.py
+import logging
 from datetime import datetime, timedelta
 from app.utils.notify import notify_user
-from app.utils.db import get_all_users, get_user_monthly_expenses_summary
+from app.utils.db import iter_monthly_summaries, UserMonthSummary
 
-def build_summary_text(summary):
-    ...
+logger = logging.getLogger(__name__)
+
+
+def previous_month(today=None):
+    first = (today or datetime.now()).replace(day=1)
+    last = first - timedelta(days=1)
+    return last.year, last.month
+
+
+def build_summary_text(summary: UserMonthSummary) -> str:
+    ym = f"{summary.year_month // 100}-{summary.year_month % 100:02d}"
+    lines = [
+        f"Monthly summary for {summary.username} ({ym})",
+        f"Spent: ₹{summary.spent:,.2f} across {summary.count} expense(s)",
+    ]
+    if summary.budget > 0:
+        status = "over budget" if summary.over_budget else "within budget"
+        lines.append(f"Budget: ₹{summary.budget:,.2f} ({status}, ₹{summary.remaining:,.2f} left)")
+    if summary.categories:
+        lines.append("Top categories:")
+        for cat, total in summary.categories[:5]:
+            lines.append(f"  • {cat}: ₹{total:,.2f}")
+    for cat, spent, limit in summary.over_limit:
+        lines.append(f"⚠️ {cat}: ₹{spent:,.2f} spent vs limit ₹{limit:,.2f}")
+    return "\n".join(lines)
+
+
+def send_monthly_summaries(year=None, month=None, skip_empty=True):
+    """
+    Notify every user about last month (or year/month), each on their own
+    email / Telegram chat only. Users with neither are skipped; users no
+    channel reached are logged and counted as failed.
+    Returns {"sent": n, "skipped": n, "failed": n}.
+    """
+    if year is None or month is None:
+        year, month = previous_month()
+
+    counts = {"sent": 0, "skipped": 0, "failed": 0}
+    for summary in iter_monthly_summaries(year, month):
+        if (skip_empty and summary.count == 0) or not (summary.email or summary.telegram_chat_id):
+            counts["skipped"] += 1
+            continue
+        results = notify_user(
+            summary.email,
+            summary.telegram_chat_id,
+            f"Your expense summary for {year}-{month:02d}",
+            build_summary_text(summary),
+        )
+        if any(results.values()):
+            counts["sent"] += 1
+        else:
+            logger.warning("monthly summary for %s not delivered: %s", summary.username, results)
+            counts["failed"] += 1
+    return counts
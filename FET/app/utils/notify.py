@@ -1,60 +1,42 @@
-# app/utils/notify.py (debug version)
+# app/utils/notify.py
+import logging
+
 from app.utils.email import send_email_alert
 from app.utils.db import send_telegram_alert
-import traceback
-import sys
+
+logger = logging.getLogger(__name__)
+
 
 def notify_user(user_email: str | None,
                 telegram_chat_id: str | None,
                 subject: str,
                 message_text: str,
                 message_html: str | None = None):
-
-    print("DEBUG: notify_user called")
-    print("  user_email:", user_email)
-    print("  telegram_chat_id:", telegram_chat_id)
-    print("  subject:", subject)
-    # do not print message_html if very large, but we will show lengths
-    print("  message_text (len):", len(message_text) if message_text else 0)
-    print("  message_html (len):", len(message_html) if message_html else 0)
-    sys.stdout.flush()
-
+    """
+    Send one message to one user: Telegram to their own chat, email to
+    their own address. A channel the user has no contact for is skipped
+    (None in the result), never redirected to a shared default.
+    Returns {"telegram": bool | None, "email": bool | None}.
+    """
     results = {"telegram": None, "email": None}
 
-    # ---- TELEGRAM ----
-    try:
-        print("DEBUG: calling send_telegram_alert(message_text)")
-        sys.stdout.flush()
-        t_ok = send_telegram_alert(message_text)
-        print("DEBUG: send_telegram_alert returned:", t_ok)
-        results["telegram"] = bool(t_ok)
-    except Exception as e:
-        print("Telegram notify failed: (exception)")
-        traceback.print_exc()
-        results["telegram"] = False
+    if telegram_chat_id:
+        try:
+            results["telegram"] = bool(send_telegram_alert(message_text, chat_id=telegram_chat_id))
+        except Exception:
+            logger.exception("telegram delivery to chat %s failed", telegram_chat_id)
+            results["telegram"] = False
 
-    # ---- EMAIL ----
-    try:
-        print("DEBUG: calling send_email_alert(...)")
-        sys.stdout.flush()
-        e_ok = None
-        if user_email:
-            e_ok = send_email_alert(
+    if user_email:
+        try:
+            results["email"] = bool(send_email_alert(
                 to_email=user_email,
                 subject=subject,
                 body_plain=message_text,
                 body_html=message_html or f"<p>{message_text}</p>"
-            )
-            print("DEBUG: send_email_alert returned:", e_ok)
-            results["email"] = bool(e_ok)
-        else:
-            print("DEBUG: no user_email provided — skipping email")
-            results["email"] = None
-    except Exception as e:
-        print("Email notify failed: (exception)")
-        traceback.print_exc()
-        results["email"] = False
+            ))
+        except Exception:
+            logger.exception("email delivery to %s failed", user_email)
+            results["email"] = False
 
-    print("DEBUG: notify_user returning:", results)
-    sys.stdout.flush()
     return results
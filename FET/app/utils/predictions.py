@@ -1,7 +1,7 @@
 import numpy as np
 import pandas as pd
 from datetime import datetime
-from .expenses import load_expenses
+from .expenses import recent_monthly_totals
 
 
 # ---------------------------------------------------------
@@ -9,26 +9,13 @@ from .expenses import load_expenses
 # ---------------------------------------------------------
 
 def predict_next_month(username: str, months_back: int = 6):
-    df = load_expenses(username)
-    if df.empty:
+    # only the last `months_back` monthly rollup rows, never the expenses
+    recent = recent_monthly_totals(username, months_back)
+    if not recent:
         return None, [], []
 
-    df["date_parsed"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date_parsed"])
-
-    df["year_month"] = df["date_parsed"].dt.to_period("M")
-
-    periods = sorted(df["year_month"].unique())
-    recent = periods[-months_back:]
-
-    amounts = []
-    labels = []
-
-    for p in recent:
-        sel = df[df["year_month"] == p]
-        amt = float(pd.to_numeric(sel["amount"], errors="coerce").fillna(0).sum())
-        labels.append(str(p))
-        amounts.append(amt)
+    labels = [f"{ym // 100}-{ym % 100:02d}" for ym, _ in recent]
+    amounts = [total for _, total in recent]
 
     # Not enough data
     if len(amounts) < 2:
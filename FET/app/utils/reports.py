@@ -1,13 +1,15 @@
 import pandas as pd
-from datetime import datetime
-from .expenses import load_expenses
+from .db import connection, year_month_key, user_id
 
 def category_breakdown(username: str, year: int, month: int):
-    df = load_expenses(username)
-    if df.empty:
-        return pd.DataFrame(columns=["category", "amount"])
+    with connection(username) as conn:
+        rows = conn.execute("""
+            SELECT c.name AS category, t.total AS amount
+            FROM monthly_category_totals t
+            JOIN categories c ON c.id = t.category_id
+            WHERE t.user_id = ? AND t.year_month = ?
+        """, (user_id(username), year_month_key(year, month))).fetchall()
 
-    df["date"] = pd.to_datetime(df["date"])
-    mdf = df[(df["date"].dt.year == year) & (df["date"].dt.month == month)]
-
-    return mdf.groupby("category")["amount"].sum().reset_index()
+    df = pd.DataFrame([tuple(r) for r in rows], columns=["category", "amount"])
+    df["amount"] = df["amount"].astype("int64") / 100
+    return df
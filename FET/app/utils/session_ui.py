@@ -20,3 +20,38 @@ def show_logout_button(sidebar: bool = True, label: str = "🚪 Logout"):
 
             # NEW: Streamlit v1.32+ uses st.rerun()
             st.rerun()
+
+
+def expense_pager(username: str, key: str, page_size: int = 50):
+    """
+    Render one page of the user's expenses with Newer/Older buttons.
+
+    Pages are fetched by keyset (see db.load_expenses_page), and the
+    cursors of pages already visited are kept in session_state so only
+    `page_size` rows are ever read or sent to the browser.
+    Returns the rows shown.
+    """
+    import pandas as pd
+    from app.utils.db import load_expenses_page
+
+    stack_key = f"{key}_cursors"
+    stack = st.session_state.setdefault(stack_key, [None])
+
+    rows, next_cursor = load_expenses_page(username, before=stack[-1], limit=page_size)
+
+    if rows:
+        df = pd.DataFrame(rows).drop(columns=["split"], errors="ignore")
+        st.dataframe(df, use_container_width=True, hide_index=True)
+    elif len(stack) == 1:
+        st.info("No transactions yet.")
+
+    c1, c2, c3 = st.columns([1, 2, 1])
+    if c1.button("⬅ Newer", key=f"{key}_newer", disabled=len(stack) == 1):
+        stack.pop()
+        st.rerun()
+    c2.caption(f"Page {len(stack)}")
+    if c3.button("Older ➡", key=f"{key}_older", disabled=next_cursor is None):
+        stack.append(next_cursor)
+        st.rerun()
+
+    return rows
@@ -0,0 +1,25 @@
+# Run from the FET/ directory:  python -m pytest -q
+import os
+import sys
+import pathlib
+import tempfile
+
+# utils.db creates/migrates app.db at import; keep that away from app/instance/
+os.environ["FET_INSTANCE_DIR"] = tempfile.mkdtemp(prefix="fet-tests-")
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import pytest
+
+from app.utils import db as db_module
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """utils.db pointed at an empty app.db of its own."""
+    db_module.close_connections()
+    db_module.user_cache.clear()
+    monkeypatch.setattr(db_module, "DB_PATH", tmp_path / "app.db")
+    yield db_module
+    db_module.stop_writer()
+    db_module.close_connections()
+    db_module.user_cache.clear()
@@ -0,0 +1,77 @@
+"""
+save_family(): the roster is synced by diff, so member ids survive
+saves and only real changes reach change_log and the income totals.
+"""
+import pytest
+
+
+def family_changes(db, username, since):
+    return [(c.row_id, c.op) for c in db.changes_since(since, username) if c.table == "family"]
+
+
+@pytest.fixture
+def roster(db):
+    assert db.save_family("Rao", "asha", [
+        {"member_name": "Asha", "relation": "self", "monthly_income": 42000.5, "is_head": True},
+        {"member_name": "Ravi", "relation": "spouse", "monthly_income": 38000},
+        {"member_name": "Meera", "relation": "daughter", "age": 9},
+    ])
+    return db
+
+
+def ids(db, username="asha"):
+    return {m["member_name"]: m["id"] for m in db.load_family(username)}
+
+
+def test_unchanged_save_writes_nothing(roster):
+    db = roster
+    before, seq = ids(db), db.last_change("asha")
+
+    assert db.save_family("Rao", "asha", db.load_family("asha"))
+    assert ids(db) == before
+    assert family_changes(db, "asha", seq) == []
+
+
+def test_edits_keep_member_ids(roster):
+    db = roster
+    before, seq = ids(db), db.last_change("asha")
+    members = {m["member_name"]: m for m in db.load_family("asha")}
+
+    assert db.save_family("Rao", "asha", [
+        dict(members["Asha"], monthly_income=45000),
+        members["Meera"],
+        {"member_name": "Kiran", "relation": "son", "age": 4},
+    ])
+    after = ids(db)
+    assert after["Asha"] == before["Asha"] and after["Meera"] == before["Meera"]
+    assert "Ravi" not in after
+    assert sorted(family_changes(db, "asha", seq)) == sorted([
+        (before["Asha"], "U"), (before["Ravi"], "D"), (after["Kiran"], "I"),
+    ])
+    assert db.family_income_total("asha") == 45000.0
+
+
+def test_rows_without_ids_match_by_name_and_relation(roster):
+    db = roster
+    before, seq = ids(db), db.last_change("asha")
+    rows = [{k: v for k, v in m.items() if k != "id"} for m in reversed(db.load_family("asha"))]
+
+    assert db.save_family("Rao", "asha", rows)
+    assert ids(db) == before
+    assert family_changes(db, "asha", seq) == []
+
+
+def test_foreign_or_repeated_ids_never_steal_a_member(roster):
+    db = roster
+    db.save_family(None, "ravi", [{"member_name": "Ravi", "relation": "self"}])
+    theirs = ids(db, "ravi")["Ravi"]
+    asha = db.load_family("asha")
+
+    assert db.save_family("Rao", "asha", asha + [
+        {"id": theirs, "member_name": "Guest", "relation": "friend"},
+        dict(asha[0], member_name="Copy"),
+    ])
+    assert ids(db, "ravi") == {"Ravi": theirs}
+    after = ids(db)
+    assert {n: after[n] for n in ("Asha", "Ravi", "Meera")} == {m["member_name"]: m["id"] for m in asha}
+    assert len(set(after.values())) == 5 and theirs not in after.values()
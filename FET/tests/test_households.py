@@ -0,0 +1,60 @@
+"""
+Households: membership is by join code only, and the combined month is
+grouped by category name across accounts (and shard files).
+"""
+import pytest
+
+
+@pytest.fixture(params=["", "user"])
+def household(request, db, tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "SHARD_MODE", request.param)
+    monkeypatch.setattr(db, "SHARD_DIR", tmp_path / "shards")
+    for user, rent in (("asha", 2500), ("ravi", 1500), ("stranger", 999)):
+        db.add_expense(user, rent, "Rent", date="2025-03-02")
+        db.add_expense(user, 100.25, "Food", date="2025-03-09")
+        db.add_expense(user, 50, "Food", date="2025-04-01")
+        # the same family_name grants nothing
+        db.add_family_member(user, user.title(), "self", 30000, family_name="Rao")
+    db.set_budget("asha", 20000, {"Food": 3000})
+    db.set_budget("ravi", None, {"Food": 1000.5, "Fuel": 200})
+    return db
+
+
+def test_join_by_code_only(household):
+    db = household
+    hid = db.create_household("asha", "Raos")
+    assert db.create_household("asha") is None
+    code = db.get_household("asha")["join_code"]
+
+    assert db.join_household("ravi", "wrong") is None
+    assert db.get_household("stranger") is None
+    assert db.join_household("ravi", code) == hid
+    assert db.join_household("ravi", code) is None
+    assert [(m["username"], m["role"]) for m in db.get_household("ravi")["members"]] == [
+        ("asha", "head"), ("ravi", "member")
+    ]
+
+
+def test_household_month_groups_by_name(household):
+    db = household
+    db.create_household("asha")
+    db.join_household("ravi", db.get_household("asha")["join_code"])
+
+    month = db.household_month(db.get_household("asha"), 2025, 3)
+    assert month["categories"] == {"Rent": 4000.0, "Food": 200.5}
+    # ravi has no main budget: his family income stands in
+    assert month["main_budget"] == 50000.0
+    assert month["category_limits"] == {"Food": 4000.5, "Fuel": 200.0}
+
+
+def test_last_member_out_removes_household(household):
+    db = household
+    db.create_household("asha")
+    db.join_household("ravi", db.get_household("asha")["join_code"])
+
+    assert db.leave_household("asha")
+    assert [m["username"] for m in db.get_household("ravi")["members"]] == ["ravi"]
+    assert db.leave_household("ravi")
+    assert db.get_household("ravi") is None and not db.leave_household("ravi")
+    with db.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM households").fetchone()[0] == 0
@@ -0,0 +1,59 @@
+"""
+Bulk import: rows are validated, stored as half-up paise, and
+re-importing the same file (in any chunking) inserts nothing.
+"""
+import io
+
+import pytest
+
+from app.utils.importer import guess_mapping, import_file, iter_chunks
+
+CSV = """Txn Date,Narration,Debit,Category
+2025-01-03,Milk,₹45.50,Food
+2025-01-03,Milk,₹45.50,Food
+2025-01-04,Petrol,"Rs 1,234.565",
+2025-01-05,Refund,-20,Food
+not a date,Bad row,10,Food
+2025-01-06,Round me,1.005,Food
+2025-01-06,Zero,0.004,Food
+"""
+
+
+def run_import(username, chunksize):
+    mapping = guess_mapping(next(iter_chunks(io.StringIO(CSV), "bank.csv")).columns)
+    return import_file(username, io.StringIO(CSV), "bank.csv", mapping, chunksize=chunksize)
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 5000])
+def test_reimport_is_a_noop(db, chunksize):
+    first = run_import("asha", chunksize)
+    assert first == {"rows": 7, "inserted": 4, "duplicates": 0, "invalid": 3}
+    # identical rows in one file are both kept, across chunk boundaries too
+    assert sorted(r["amount"] for r in db.load_expenses("asha")) == [1.01, 45.5, 45.5, 1234.57]
+    assert {r["category"] for r in db.load_expenses("asha")} == {"Food", "Other"}
+
+    again = run_import("asha", 3)
+    assert again == {"rows": 7, "inserted": 0, "duplicates": 4, "invalid": 3}
+    assert len(db.load_expenses("asha")) == 4
+
+
+def test_bulk_and_single_add_store_the_same_paise(db):
+    amounts = ["1.005", 2.675, "0.285", 10]
+    res = db.add_expenses_bulk("asha", [
+        {"date": "2025-02-01", "amount": a, "category": "Food", "split": {"A": a, "B": 0}} for a in amounts
+    ])
+    assert res == {"inserted": 4, "duplicates": 0, "invalid": 0}
+    for a in amounts:
+        db.add_expense("ravi", a, "Food")
+
+    with db.connection() as conn:
+        stored = {u: sorted(r[0] for r in conn.execute(
+            "SELECT amount FROM expenses WHERE user_id = ?", (db.user_id(u),)))
+            for u in ("asha", "ravi")}
+        shares = sorted(r[0] for r in conn.execute("SELECT share FROM expense_splits WHERE member = 'A'"))
+    assert stored["asha"] == stored["ravi"] == shares == sorted(db.to_paise(a) for a in amounts)
+
+    # a second load of the same rows is recognised by hash
+    assert db.add_expenses_bulk("asha", [
+        {"date": "2025-02-01", "amount": a, "category": "Food"} for a in amounts
+    ])["duplicates"] == 4
@@ -0,0 +1,52 @@
+"""
+utils/maintenance.py: a pass returns freed pages to the filesystem and
+truncates the WAL without losing rows; old files convert on request.
+"""
+import sqlite3
+
+from app.utils.maintenance import maintain_file, run_maintenance
+
+
+def churn(db, username="asha", rows=3000):
+    db.add_expenses_bulk(username, [
+        {"date": "2025-01-01", "amount": i + 1, "category": "Food", "note": "x" * 200} for i in range(rows)
+    ])
+    with db.connection(username) as conn:
+        conn.execute("DELETE FROM expenses WHERE amount > 10000")  # paise
+
+
+def test_pass_vacuums_and_checkpoints(db):
+    churn(db)
+    report = maintain_file(db.DB_PATH, quiet=0.01, max_wait=1)
+
+    assert report["quiet"] and report["auto_vacuum"] == "INCREMENTAL"
+    assert report["before"]["freelist_count"] > 0
+    assert report["vacuumed_pages"] == report["before"]["freelist_count"]
+    assert report["after"]["freelist_count"] == 0
+    assert report["after"]["page_count"] < report["before"]["page_count"]
+    assert report["after"]["wal_bytes"] == 0
+    assert len(db.load_expenses("asha")) == 100
+
+
+def test_vacuum_respects_page_budget(db):
+    churn(db)
+    report = maintain_file(db.DB_PATH, max_vacuum_pages=5, quiet=0.01, max_wait=1)
+    assert report["vacuumed_pages"] == 5
+    assert report["after"]["freelist_count"] == report["before"]["freelist_count"] - 5
+
+
+def test_old_file_converts_only_when_asked(tmp_path):
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE t (x)")
+    conn.executemany("INSERT INTO t VALUES (?)", [("y" * 500,)] * 500)
+    conn.execute("DELETE FROM t")
+    conn.commit()
+    conn.close()
+
+    [kept] = run_maintenance([path], quiet=0.01, max_wait=1)
+    assert kept["auto_vacuum"] == "NONE" and kept["vacuumed_pages"] == 0
+
+    converted = maintain_file(path, convert=True, quiet=0.01, max_wait=1)
+    assert converted["auto_vacuum"] == "INCREMENTAL"
+    assert converted["after"]["page_count"] < converted["before"]["page_count"]
@@ -0,0 +1,52 @@
+"""
+Monthly summaries: one record per known user, delivered only to that
+user's own channels; failures are logged and counted.
+"""
+import logging
+
+import pytest
+
+from app.utils import monthly_summary, notify
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Record deliveries instead of calling Telegram / SMTP."""
+    log = []
+
+    def telegram(message, chat_id=None):
+        log.append(("telegram", chat_id))
+        return chat_id != "dead"
+
+    def email(to_email, subject, body_plain, body_html):
+        if to_email == "broken@example.com":
+            raise OSError("smtp down")
+        log.append(("email", to_email))
+        return True
+
+    monkeypatch.setattr(notify, "send_telegram_alert", telegram)
+    monkeypatch.setattr(notify, "send_email_alert", email)
+    return log
+
+
+def test_unknown_user_has_no_summary(db):
+    db.add_expense("asha", 10, "Food", date="2025-03-01")
+    assert db.get_user_monthly_expenses_summary("asha", 2025, 3).spent == 10.0
+    assert db.get_user_monthly_expenses_summary("asah", 2025, 3) is None
+    assert [s.username for s in db.iter_monthly_summaries(2025, 3, usernames=["asah", "asha"])] == ["asha"]
+
+
+def test_each_user_only_on_their_own_channels(db, sent, monkeypatch, caplog):
+    for user, email in (("asha", "asha@example.com"), ("ravi", None), ("meera", "broken@example.com"),
+                        ("kiran", None)):
+        db.register_user(user, email, "pw")
+        db.add_expense(user, 10, "Food", date="2025-03-01")
+    monkeypatch.setattr(db, "_telegram_chat_ids", lambda: {"asha": "111", "meera": "dead"})
+
+    with caplog.at_level(logging.WARNING):
+        counts = monthly_summary.send_monthly_summaries(2025, 3)
+
+    assert counts == {"sent": 1, "skipped": 2, "failed": 1}
+    assert sorted(sent) == [("email", "asha@example.com"), ("telegram", "111"), ("telegram", "dead")]
+    assert "email delivery to broken@example.com failed" in caplog.text
+    assert "monthly summary for meera not delivered" in caplog.text
@@ -0,0 +1,254 @@
+"""
+Schema checks: migrating a pre-migration app.db keeps its data, the hot
+queries stay on their indexes, and every trigger-maintained table
+(monthly rollup, family income totals, FTS index, change_log) agrees
+with a recomputation from the base tables.
+"""
+import json
+import sqlite3
+from datetime import date
+
+import pytest
+
+from app.utils.migrations import check_query_plans, latest_version, rebuild_monthly_totals, schema_version
+
+# app.db as utils/db.py created it before the first migration
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    email TEXT,
+    password_hash TEXT,
+    reset_token TEXT,
+    reset_expiry INTEGER
+);
+CREATE TABLE family (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    member_name TEXT,
+    relation TEXT,
+    monthly_income REAL DEFAULT 0,
+    age INTEGER DEFAULT 0,
+    notes TEXT,
+    is_head INTEGER DEFAULT 0,
+    family_name TEXT DEFAULT ''
+);
+CREATE TABLE expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    date TEXT,
+    amount REAL,
+    category TEXT,
+    assigned_member TEXT,
+    split_json TEXT,
+    note TEXT
+);
+CREATE TABLE budgets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    main_budget REAL,
+    category_limits_json TEXT
+);
+CREATE TABLE goals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    goal_name TEXT,
+    target_amount REAL,
+    months_to_complete INTEGER,
+    created_on TEXT
+);
+"""
+
+EXPENSES = [
+    # username, date, amount, category, member, split, note
+    ("asha", "2024-11-03", 120.5, "Food", "Asha", None, "veg market"),
+    ("asha", "2024-11-20", 2500.0, "Rent", "", None, "november rent"),
+    ("asha", "2025-01-07", 99.99, "Food", "Ravi", {"Ravi": 60, "Asha": 40}, "pizza night"),
+    ("asha", "2025-01-08", 0.1, None, "", None, ""),
+    ("ravi", "2025-01-09", 45.25, "Transport", "Ravi", None, "auto fare"),
+]
+
+
+@pytest.fixture
+def baseline(db):
+    """app.db in the baseline schema with a little of everything."""
+    conn = sqlite3.connect(str(db.DB_PATH))
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany("INSERT INTO users (username, email) VALUES (?, ?)",
+                     [("asha", "asha@example.com"), ("ravi", None)])
+    conn.executemany("""
+        INSERT INTO expenses (username, date, amount, category, assigned_member, split_json, note)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [(u, d, a, c, m, json.dumps(s) if s else "", n) for u, d, a, c, m, s, n in EXPENSES])
+    conn.executemany("""
+        INSERT INTO family (username, member_name, relation, monthly_income, age, is_head, family_name)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [("asha", "Asha", "self", 42000.5, 34, 1, "Rao"), ("asha", "Ravi", "spouse", 38000, 36, 0, "Rao")])
+    conn.execute("""
+        INSERT INTO budgets (username, main_budget, category_limits_json) VALUES (?, ?, ?)
+    """, ("asha", 30000, json.dumps({"Food": 4000.75, "Rent": 0})))
+    conn.execute("""
+        INSERT INTO goals (username, goal_name, target_amount, months_to_complete, created_on)
+        VALUES ('asha', 'Car', 250000.5, 24, '2025-01-01')
+    """)
+    conn.commit()
+    conn.close()
+    return db
+
+
+def test_baseline_migrates_without_losing_data(baseline):
+    db = baseline
+    with db.connection() as conn:
+        assert schema_version(conn) == latest_version()
+
+    rows = sorted(db.load_expenses("asha"), key=lambda r: r["date"])
+    assert [(r["date"], r["amount"], r["category"], r["assigned_member"], r["note"]) for r in rows] == [
+        (d, a, c or "", m, n) for u, d, a, c, m, _, n in EXPENSES if u == "asha"
+    ]
+    assert rows[2]["split"] == {"Ravi": 60, "Asha": 40}
+    assert [r["amount"] for r in db.load_expenses("ravi")] == [45.25]
+
+    assert [(m["member_name"], m["monthly_income"]) for m in db.load_family("asha")] == [
+        ("Asha", 42000.5), ("Ravi", 38000.0)
+    ]
+    budget = db.load_budget("asha")
+    assert budget["explicit_budget"] == 30000.0
+    assert budget["category_limits"] == {"Food": 4000.75}
+    assert budget["family_income"] == 80000.5
+    assert [(g["goal_name"], g["target_amount"]) for g in db.load_goals("asha")] == [("Car", 250000.5)]
+
+    assert db.category_breakdown("asha", 2024, 11) == {"Food": 120.5, "Rent": 2500.0}
+    assert db.search_expenses("asha", text="pizza")["total"] == 1
+    assert db.get_user_email("asha") == "asha@example.com"
+
+
+@pytest.mark.parametrize("rupees", [1.005, 2.675, 0.285, 1234.565, 99.99])
+def test_legacy_money_converts_like_to_paise(db, rupees):
+    conn = sqlite3.connect(str(db.DB_PATH))
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute("""
+        INSERT INTO expenses (username, date, amount, category) VALUES ('asha', '2025-01-01', ?, 'Food')
+    """, (rupees,))
+    conn.execute("INSERT INTO family (username, member_name, monthly_income) VALUES ('asha', 'Asha', ?)", (rupees,))
+    conn.execute("INSERT INTO budgets (username, main_budget, category_limits_json) VALUES ('asha', ?, ?)",
+                 (rupees, json.dumps({"Food": rupees})))
+    conn.commit()
+    conn.close()
+
+    paise = db.to_paise(rupees)
+    with db.connection() as conn:
+        assert conn.execute("SELECT amount FROM expenses").fetchone()[0] == paise
+        assert conn.execute("SELECT total FROM monthly_category_totals").fetchone()[0] == paise
+        assert conn.execute("SELECT monthly_income FROM family").fetchone()[0] == paise
+        assert conn.execute("SELECT main_budget FROM budgets").fetchone()[0] == paise
+        assert conn.execute("SELECT limit_amount FROM category_limits").fetchone()[0] == paise
+
+
+def test_migrations_are_idempotent(baseline):
+    db = baseline
+    before = db.load_expenses("asha")
+    db.close_connections()
+    db._schema_ready.discard(str(db.DB_PATH))
+    db.init_db()
+    assert db.load_expenses("asha") == before
+
+
+@pytest.mark.parametrize("fixture", ["db", "baseline"])
+def test_hot_queries_use_their_indexes(fixture, request):
+    db = request.getfixturevalue(fixture)
+    with db.connection() as conn:
+        plans = check_query_plans(conn)  # raises listing every scan / missed index
+    assert plans
+
+
+def _populate(db):
+    """Inserts, edits, deletes and archive moves through the public helpers."""
+    db.add_expenses_bulk("asha", [
+        {"date": f"20{y}-{m:02d}-{d:02d}", "amount": 10 * m + d / 100, "category": c,
+         "assigned_member": "Asha", "note": f"{c.lower()} {y}{m}{d}"}
+        for y in (23, 24, 25) for m in (1, 6, 12) for d in (1, 15) for c in ("Food", "Fuel")
+    ])
+    db.add_expense("ravi", 75.5, "Food", note="lunch")
+    db.add_expense("ravi", 12, "Tea", note="chai")
+    db.archive_closed_years("asha", before_year=2024)
+
+    with db.connection("asha") as conn:
+        uid = db.user_id("asha")
+        food = db.intern_categories(conn, uid, ["Food", "Groceries"])
+        ids = [r[0] for r in conn.execute(
+            "SELECT id FROM expenses WHERE user_id=? ORDER BY id", (uid,))]
+        conn.execute("UPDATE expenses SET amount = amount + 1 WHERE id=?", (ids[0],))
+        conn.execute("UPDATE expenses SET category_id=?, note='big shop' WHERE id=?",
+                     (food["Groceries"], ids[1]))
+        conn.execute("UPDATE expenses SET date='2025-02-02' WHERE id=?", (ids[2],))
+        conn.execute("DELETE FROM expenses WHERE id IN (?, ?)", (ids[3], ids[4]))
+
+    db.add_family_member("asha", "Asha", "self", 42000.5)
+    db.add_family_member("asha", "Ravi", "spouse", 38000)
+    db.add_family_member("ravi", "Ravi", "self", 1000)
+    members = db.load_family("asha")
+    db.save_family(None, "asha", [
+        dict(members[0], monthly_income=45000),
+        {"member_name": "Meera", "relation": "daughter", "monthly_income": 0},
+    ])
+    db.delete_family_member("ravi", db.load_family("ravi")[0]["id"])
+
+
+def test_trigger_maintained_totals_match_recomputation(db):
+    _populate(db)
+    with db.connection() as conn:
+        maintained = sorted(map(tuple, conn.execute("SELECT * FROM monthly_category_totals")))
+        rebuild_monthly_totals(conn)
+        rebuilt = sorted(map(tuple, conn.execute("SELECT * FROM monthly_category_totals")))
+        assert maintained and maintained == rebuilt
+
+        incomes = conn.execute("SELECT user_id, total, members FROM family_income_totals ORDER BY user_id")
+        expected = conn.execute("""
+            SELECT user_id, SUM(monthly_income), COUNT(*) FROM family GROUP BY user_id ORDER BY user_id
+        """)
+        assert [tuple(r) for r in incomes] == [tuple(r) for r in expected]
+
+    assert db.family_income_total("asha") == 45000.0
+    assert db.family_income_total("ravi") == 0.0
+
+
+def test_fts_index_matches_expenses(db):
+    _populate(db)
+    with db.connection() as conn:
+        indexed = conn.execute("SELECT rowid, note, category, user_id FROM expenses_fts ORDER BY rowid")
+        expected = conn.execute("""
+            SELECT e.id, e.note, c.name, e.user_id
+            FROM (SELECT id, note, category_id, user_id FROM expenses
+                  UNION ALL
+                  SELECT id, note, category_id, user_id FROM expenses_archive) e
+            JOIN categories c ON c.id = e.category_id
+            ORDER BY e.id
+        """)
+        assert [tuple(r) for r in indexed] == [tuple(r) for r in expected]
+
+    assert db.search_expenses("asha", text="big shop")["total"] == 1
+    assert db.search_expenses("asha", text="groceries")["total"] == 1
+
+
+def test_change_log_records_each_write(db):
+    db.add_expense("asha", 10, "Food")
+    seq = db.last_change("asha")
+    db.add_expense("asha", 20, "Fuel")
+    with db.connection("asha") as conn:
+        conn.execute("DELETE FROM expenses WHERE amount = 1000")
+    db.archive_closed_years("asha", before_year=date.today().year + 1)  # a move, not a change
+
+    changes = db.changes_since(seq)
+    assert [(c.table, c.op) for c in changes] == [("expenses", "I"), ("expenses", "D")]
+    rows, watermark = db.expense_changes("asha", 0)
+    assert [(r["op"], r.get("amount")) for r in rows] == [("I", 20.0), ("D", None)]
+    assert watermark == db.last_change("asha") > seq
+
+
+def test_single_writer_commits_queued_writes(db, monkeypatch):
+    monkeypatch.setattr(db, "WRITER_MODE", True)
+    assert db.add_expense("asha", 10, "Food")
+    assert db.add_family_member("asha", "Asha", "self", 500)
+    db.stop_writer()
+    assert [r["amount"] for r in db.load_expenses("asha")] == [10.0]
+    assert db.family_income_total("asha") == 500.0
@@ -0,0 +1,63 @@
+"""
+search_expenses(): full-text hits over hot and archived rows, facet
+counts that ignore their own filter, keyset paging and the hit cap.
+"""
+import pytest
+
+
+@pytest.fixture
+def ledger(db):
+    rows = []
+    for i in range(30):
+        rows.append({
+            "date": f"20{23 + i % 3}-0{1 + i % 9}-1{i % 10}",
+            "amount": 100 + i,
+            "category": ["Food", "Fuel", "Rent"][i % 3],
+            "assigned_member": ["Asha", "Ravi"][i % 2],
+            "note": ["pizza night", "petrol pump", "november rent"][i % 3] + f" #{i}",
+        })
+    db.add_expenses_bulk("asha", rows)
+    db.add_expense("ravi", 10, "Food", note="pizza")
+    db.archive_closed_years("asha", before_year=2025)
+    return db
+
+
+def test_text_hits_archived_rows_for_this_user_only(ledger):
+    db = ledger
+    res = db.search_expenses("asha", text="pizz", limit=100)
+    assert res["total"] == 10 and not res["capped"]
+    assert {r["note"].split(" #")[0] for r in res["rows"]} == {"pizza night"}
+    assert res["amount"] == sum(100 + i for i in range(0, 30, 3))
+    # words under FTS_MIN_PREFIX characters match whole words only
+    assert db.search_expenses("asha", text="pi")["total"] == 0
+
+
+def test_facets_ignore_their_own_filter(ledger):
+    db = ledger
+    res = db.search_expenses("asha", categories=["Food"], members=["Asha"])
+    assert res["total"] == 5
+    assert res["facets"]["category"] == {"Food": 5, "Fuel": 5, "Rent": 5}
+    assert res["facets"]["member"] == {"Asha": 5, "Ravi": 5}
+
+
+def test_keyset_pages_cover_everything_once(ledger):
+    db = ledger
+    seen, cursor = [], None
+    while True:
+        res = db.search_expenses("asha", before=cursor, limit=7)
+        seen += [(r["date"], r["id"]) for r in res["rows"]]
+        cursor = res["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 30
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_hit_cap_keeps_newest_hits(ledger, monkeypatch):
+    db = ledger
+    monkeypatch.setattr(db, "FTS_MAX_HITS", 4)
+    res = db.search_expenses("asha", text="pizza", limit=100)
+    assert res["capped"] and res["total"] == 4
+    newest = sorted((r["id"] for r in db.search_expenses("asha", categories=["Food"], limit=100)["rows"]),
+                    reverse=True)[:4]
+    assert sorted(r["id"] for r in res["rows"]) == sorted(newest)
@@ -0,0 +1,70 @@
+"""
+app/tools/shard_db.py: moving users out of app.db into shard files keeps
+every row, the search index and the rollups, and routing finds them.
+"""
+import runpy
+import sys
+from pathlib import Path
+
+import pytest
+
+SHARD_DB = Path(__file__).resolve().parent.parent / "app" / "tools" / "shard_db.py"
+
+
+def run_shard_db(db, monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["shard_db.py", *args])
+    runpy.run_path(str(SHARD_DB), run_name="__main__")
+    db.close_connections()
+    db.user_cache.clear()
+
+
+@pytest.fixture
+def populated(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "SHARD_MODE", "")
+    monkeypatch.setattr(db, "SHARD_DIR", tmp_path / "shards")
+    for user in ("asha", "ravi", "meera"):
+        db.add_expenses_bulk(user, [
+            {"date": "2023-03-04", "amount": 250, "category": "Food", "note": "pizza party"},
+            {"date": "2023-07-01", "amount": 99.5, "category": "Fuel", "assigned_member": user},
+            {"date": "2025-02-10", "amount": 120, "category": "Food", "note": "pizza night",
+             "split": {"A": 60, "B": 60}},
+            {"date": "2025-02-11", "amount": 40, "category": "Tea", "note": "chai"},
+        ])
+        db.archive_closed_years(user, before_year=2024)
+        db.add_family_member(user, user.title(), "self", 1000)
+    return db
+
+
+def snapshot(db, user):
+    return {
+        "expenses": db.load_expenses(user),
+        "search": db.search_expenses(user, text="pizza"),
+        "breakdown": db.category_breakdown(user, 2023, 3),
+        "family": db.family_income_total(user),
+    }
+
+
+@pytest.mark.parametrize("mode", ["user", "2"])
+def test_shard_move_keeps_data_and_search(populated, monkeypatch, mode):
+    db = populated
+    before = {u: snapshot(db, u) for u in ("asha", "ravi", "meera")}
+    assert before["asha"]["search"]["total"] == 2
+
+    run_shard_db(db, monkeypatch, mode)
+
+    with db.connection(path=db.DB_PATH) as conn:
+        for table in ("expenses", "expenses_archive", "expenses_fts", "family"):
+            assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0, table
+    assert {u: snapshot(db, u) for u in before} == before
+    assert len(list(db.SHARD_DIR.glob("*.db"))) == (3 if mode == "user" else 2)
+
+
+def test_shard_copy_is_rerunnable(populated, monkeypatch):
+    db = populated
+    before = snapshot(db, "asha")
+    run_shard_db(db, monkeypatch, "user", "--keep")
+    run_shard_db(db, monkeypatch, "user", "--keep")
+    assert snapshot(db, "asha") == before
+
+    monkeypatch.setattr(db, "SHARD_MODE", "")
+    assert snapshot(db, "asha") == before          # --keep left app.db intact
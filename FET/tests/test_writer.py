@@ -0,0 +1,73 @@
+"""
+Single writer (FET_WRITER=1): concurrent sessions' writes all land, and
+a failing command is rolled back alone, even when its helper swallows
+the error.
+"""
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def writer(db, monkeypatch):
+    monkeypatch.setattr(db, "WRITER_MODE", True)
+    return db
+
+
+def notes(db, username="asha"):
+    return sorted(r["note"] for r in db.load_expenses(username))
+
+
+def test_concurrent_sessions_all_commit(writer):
+    db = writer
+
+    def session(n):
+        for i in range(25):
+            assert db.add_expense("asha", 1 + i, "Food", note=f"{n}-{i}")
+        db.close_connections()
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(notes(db)) == 200
+    with db.connection() as conn:
+        assert conn.execute("SELECT SUM(count) FROM monthly_category_totals").fetchone()[0] == 200
+
+
+def test_failed_command_is_rolled_back_alone(writer):
+    db = writer
+
+    def fails(username):
+        with db.connection(username) as conn:
+            conn.execute("""
+                INSERT INTO expenses (user_id, date, amount, category_id, note)
+                VALUES (?, '2025-01-01', 100, 1, 'raised')
+            """, (db.user_id(username),))
+            raise ValueError("boom")
+
+    def swallows(username):
+        try:
+            with db.connection(username):
+                db.add_expense(username, 1, "Food", note="swallowed")
+                raise ValueError("hidden")
+        except ValueError:
+            return False
+
+    db.add_expense("asha", 1, "Food", note="first")      # interns category 1
+    w = db.get_writer()
+    futures = [
+        w.submit("asha", db.add_expense, "asha", 5, "Food", note="before"),
+        w.submit("asha", fails, "asha"),
+        w.submit("asha", swallows, "asha"),
+        w.submit("asha", db.add_expense, "asha", 6, "Food", note="after"),
+    ]
+    assert futures[0].result() is True
+    with pytest.raises(ValueError, match="boom"):
+        futures[1].result()
+    assert futures[2].result() is False
+    assert futures[3].result() is True
+
+    assert notes(db) == ["after", "before", "first"]